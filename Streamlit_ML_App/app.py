@@ -3,10 +3,21 @@ import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
-import pickle
+from plotly.subplots import make_subplots
 import shap
 import matplotlib.pyplot as plt
+import io
 import os
+import sys
+from prediction_service import PredictionService, FEATURES
+from data_reduction import StreamingHistogram, StreamingCorrelation, StreamingLTTB, BinnedMeans, iter_csv_chunks, read_csv_rows
+
+# shap_store.py lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shap_store import data_hash_chunks, load_manifest, load_shap
+
+# Written by `python train_models.py` (or `--shap-only`)
+SHAP_DIR = 'shap_values'
 
 # --- Page Config ---
 st.set_page_config(page_title="Shear Capacity Analysis", layout="wide", page_icon="🏗️")
@@ -38,39 +49,132 @@ else:
     def load_metrics():
         return pd.read_csv('model_metrics.csv', index_col=0)
 
+DATA_PATH = 'synthetic_beam_dataset.csv'
+# Rows of the dataset in memory at a time while summarizing it
+CHUNK_ROWS = 200_000
+# Rows drawn in the SHAP plots (a fixed random sample of the stored rows)
+SHAP_PLOT_ROWS = 5000
+
+def dataset_stamp():
+    """
+    (path, mtime, size) of the dataset: the cache key of everything derived
+    from it, cheap to hash and changed whenever the file is regenerated.
+    """
+    try:
+        stat = os.stat(DATA_PATH)
+    except OSError:
+        return DATA_PATH, None, None
+    return DATA_PATH, stat.st_mtime_ns, stat.st_size
+
+# Plot resolution: what reaches the browser is bounded by these, not by the row count
+TRACE_POINTS = 500
+HIST_BINS = 60
+CONTOUR_BINS = 40
+CORR_COLUMNS = ['FEA_Shear_Capacity_kN', 'Ultimate_Load_kN', 'Depth_D_mm', 'Yield_Strength_fy_MPa', 'Opening_Ratio', 'Web_Thickness_tw_mm']
+COMPARISON_TRACES = [('FEA_Shear_Capacity_kN', 'FEA Capacity'), ('Eurocode_Capacity_kN', 'Eurocode'),
+                     ('With_Tension_Field_kN', 'Tension Field')]
+
+# Keyed on dataset_stamp(), not on a DataFrame, which st.cache_data would hash on every rerun
 @st.cache_data
-def load_data():
-    if os.path.exists('synthetic_beam_dataset.csv'):
-        return pd.read_csv('synthetic_beam_dataset.csv')
-    return pd.DataFrame()
+def plot_summaries(path, mtime, size):
+    """
+    Binned / downsampled data of every dataset plot, or None without a dataset.
+    Reads the CSV in CHUNK_ROWS chunks, twice: once for the value ranges that
+    fix the bins, once to fill them.
+    """
+    if mtime is None:
+        return None
+    binned = ['Ultimate_Load_kN', 'Opening_Ratio', 'Depth_D_mm']
+    low, high = {}, {}
+    for chunk in iter_csv_chunks(path, binned, CHUNK_ROWS):
+        for column in binned:
+            low[column] = min(low.get(column, np.inf), chunk[column].min())
+            high[column] = max(high.get(column, -np.inf), chunk[column].max())
+    if not low:
+        return None
 
+    hist = StreamingHistogram.from_range(low['Ultimate_Load_kN'], high['Ultimate_Load_kN'], HIST_BINS)
+    corr = StreamingCorrelation(CORR_COLUMNS)
+    contour = BinnedMeans((low['Opening_Ratio'], high['Opening_Ratio']),
+                          (low['Depth_D_mm'], high['Depth_D_mm']), CONTOUR_BINS, CONTOUR_BINS)
+    traces = {name: StreamingLTTB(TRACE_POINTS) for _, name in COMPARISON_TRACES}
+    columns = list(dict.fromkeys(CORR_COLUMNS + binned + ['FEA_Shear_Capacity_kN']
+                                 + [column for column, _ in COMPARISON_TRACES]))
+    rows = 0
+    for chunk in iter_csv_chunks(path, columns, CHUNK_ROWS):
+        hist.update(chunk['Ultimate_Load_kN'])
+        corr.update(chunk)
+        contour.update(chunk['Opening_Ratio'], chunk['Depth_D_mm'], chunk['FEA_Shear_Capacity_kN'])
+        row = np.arange(rows, rows + len(chunk))
+        for column, name in COMPARISON_TRACES:
+            traces[name].update(row, chunk[column].to_numpy())
+        rows += len(chunk)
+
+    q1, median, q3 = hist.quantiles([0.25, 0.5, 0.75])
+    load_min, load_max = low['Ultimate_Load_kN'], high['Ultimate_Load_kN']
+    return {
+        'rows': rows,
+        'hist': (hist.centers, hist.counts, hist.edges[1] - hist.edges[0]),
+        'box': {'q1': q1, 'median': median, 'q3': q3, 'lowerfence': max(load_min, q1 - 1.5 * (q3 - q1)),
+                'upperfence': min(load_max, q3 + 1.5 * (q3 - q1))},
+        'corr': corr.corr(),
+        'contour': contour.grid(),
+        'traces': {name: trace.points() for name, trace in traces.items()},
+    }
+
+# Key of the SHAP store: stored values only explain this exact data
+@st.cache_data
+def dataset_hash(path, mtime, size):
+    if mtime is None:
+        return None
+    chunks = (chunk[FEATURES] for chunk in iter_csv_chunks(path, FEATURES, CHUNK_ROWS))
+    return data_hash_chunks(FEATURES, chunks)
+
+# One service (models, scaler, thread pool, per-input memo) shared by every session
 @st.cache_resource
-def load_models():
-    models = {}
-    model_names = ['Decision Tree', 'Random Forest', 'KNN', 'Gradient Boosting', 'XGBoost', 'LightGBM', 'CatBoost', 'SVR', 'MLP']
-    for name in model_names:
-        try:
-            with open(f'{name.replace(" ", "_")}_model.pkl', 'rb') as f:
-                models[name] = pickle.load(f)
-        except:
-            pass
-    try:
-        with open('scaler.pkl', 'rb') as f:
-            scaler = pickle.load(f)
-    except:
-        scaler = None
-    return models, scaler
+def load_service():
+    return PredictionService.from_directory('.')
+
+@st.cache_data
+def shap_figures(model_name, created_at, rows):
+    """
+    PNG bytes of the summary and Opening_Ratio dependence plots from the
+    stored SHAP values of up to SHAP_PLOT_ROWS of the store's `rows` rows.
+    """
+    # created_at is only part of the cache key: a recomputed store draws new figures
+    values, _, features = load_shap(SHAP_DIR, model_name)
+    sample = np.arange(rows)
+    if rows > SHAP_PLOT_ROWS:
+        sample = np.sort(np.random.default_rng(0).choice(rows, SHAP_PLOT_ROWS, replace=False))
+    # Only the sampled rows of the memory-mapped values and of the dataset are read
+    values = np.asarray(values[sample])
+    X = read_csv_rows(DATA_PATH, sample, features, CHUNK_ROWS)[features]
+
+    def to_png():
+        buffer = io.BytesIO()
+        plt.gcf().savefig(buffer, format='png', bbox_inches='tight')
+        plt.close('all')
+        return buffer.getvalue()
+
+    plt.subplots()
+    shap.summary_plot(values, X, show=False)
+    summary_png = to_png()
+    fig, ax = plt.subplots()
+    shap.dependence_plot("Opening_Ratio", values, X, show=False, ax=ax)
+    return summary_png, to_png()
 
-df = load_data()
+# Reruns only the predictor when its form is submitted instead of the whole
+# script (SHAP plots included); older Streamlit versions rerun everything
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda fn: fn)
+
+summaries = plot_summaries(*dataset_stamp())
 if os.path.exists('model_metrics.csv'):
     metrics_df = load_metrics()
-models, scaler = load_models()
-
-tabs = st.tabs(["Predictor", "Beam Visualizer", "Failure Modes", "Analysis Graphs", "Applications"])
+service = load_service()
+models = service.models
 
-# --- Predictor Tab ---
-with tabs[0]:
-    st.markdown("### 💡 Shear Capacity Predictor")
+@fragment
+def predictor():
     with st.form("predictor_form"):
         col1, col2 = st.columns(2)
         with col1:
@@ -84,29 +188,53 @@ with tabs[0]:
             v = st.number_input("POISSON RATIO", min_value=0.2, max_value=0.4, value=0.3)
             ratio = st.number_input("OPENING RATIO (d/D) [0 to 0.8]", min_value=0.0, max_value=0.8, value=0.2)
         submit = st.form_submit_button("Predict Shear Capacity")
-        
+
     if submit:
-        st.success("Predictions Generated!")
-        # Create input df
-        input_data = pd.DataFrame([[D, tw, B, L, fy, E, v, ratio]], 
-                                  columns=['Depth_D_mm', 'Web_Thickness_tw_mm', 'Flange_B_mm', 'Length_L_mm', 
-                                           'Yield_Strength_fy_MPa', 'Youngs_Modulus_E_GPa', 'Poisson_Ratio', 'Opening_Ratio'])
-        
-        preds = {}
-        for name, m in models.items():
-            if name in ['SVR', 'MLP', 'KNN'] and scaler:
-                pred = m.predict(scaler.transform(input_data))[0]
-            else:
-                pred = m.predict(input_data)[0]
-            preds[name] = pred
-        
+        preds = service.predict_one([D, tw, B, L, fy, E, v, ratio])
         if len(preds) == 0:
             st.warning("Models are still training!")
         else:
+            st.success("Predictions Generated!")
             cols = st.columns(4)
             for i, (name, pred) in enumerate(preds.items()):
                 cols[i%4].metric(label=f"{name} (kN)", value=f"{pred:.2f}")
 
+@fragment
+def batch_predictor():
+    st.markdown("#### 📋 Batch Predictions")
+    st.write("Paste or upload a sweep with the columns " + ", ".join(FEATURES) + " to get every model's prediction per row.")
+    with st.form("batch_form"):
+        uploaded = st.file_uploader("CSV or Excel file", type=['csv', 'xlsx', 'xls'])
+        pasted = st.text_area("...or paste CSV rows (with the header line)", height=150)
+        run = st.form_submit_button("Predict All Rows")
+
+    if run:
+        try:
+            if uploaded is not None:
+                batch = pd.read_csv(uploaded) if uploaded.name.lower().endswith('.csv') else pd.read_excel(uploaded)
+            elif pasted.strip():
+                batch = pd.read_csv(io.StringIO(pasted))
+            else:
+                st.warning("Upload a file or paste rows first.")
+                return
+            result = service.predict_batch(batch)
+        except Exception as e:
+            st.error(f"Could not predict this table: {e}")
+            return
+        st.success(f"Predicted {len(result)} rows with {len(service.models)} models.")
+        st.dataframe(result, use_container_width=True)
+        st.download_button("Download Predictions (CSV)", result.to_csv(index=False).encode(),
+                           file_name="batch_predictions.csv", mime="text/csv")
+
+tabs = st.tabs(["Predictor", "Beam Visualizer", "Failure Modes", "Analysis Graphs", "Applications"])
+
+# --- Predictor Tab ---
+with tabs[0]:
+    st.markdown("### 💡 Shear Capacity Predictor")
+    predictor()
+    st.divider()
+    batch_predictor()
+
 # --- Beam Visualizer Tab ---
 with tabs[1]:
     st.markdown("### 📊 Beam Geometry Visualization")
@@ -123,13 +251,12 @@ with tabs[2]:
     st.info("Theoretical Models Comparison: Tension Field Action, Eurocode, Vierendeel Mechanism.")
     st.write("ML Models accurately capture shear buckling and tension field variations induced by perforations.")
     # Plot comparing FEA vs Eurocode vs TF
-    if not df.empty:
-        sample_df = df.sample(min(100, len(df)))
+    if summaries is not None:
+        # Every row, downsampled to TRACE_POINTS per trace
         fig2 = go.Figure()
-        fig2.add_trace(go.Scatter(x=sample_df.index, y=sample_df['FEA_Shear_Capacity_kN'], name='FEA Capacity'))
-        fig2.add_trace(go.Scatter(x=sample_df.index, y=sample_df['Eurocode_Capacity_kN'], name='Eurocode'))
-        fig2.add_trace(go.Scatter(x=sample_df.index, y=sample_df['With_Tension_Field_kN'], name='Tension Field'))
-        fig2.update_layout(template="plotly_dark", title="Theoretical vs FEA Capacities")
+        for name, (x, y) in summaries['traces'].items():
+            fig2.add_trace(go.Scatter(x=x, y=y, name=name))
+        fig2.update_layout(template="plotly_dark", title="Theoretical vs FEA Capacities", xaxis_title="Sample")
         st.plotly_chart(fig2, use_container_width=True)
 
 # --- Analysis Graphs Tab ---
@@ -151,49 +278,54 @@ with tabs[3]:
         
     with g_tabs[1]:
         st.write("#### Distributions and Ultimate Load vs Shear Capacity")
-        if not df.empty:
+        if summaries is not None:
             colA, colB = st.columns(2)
             with colA:
-                fig_hist = px.histogram(df, x="Ultimate_Load_kN", marginal="box", title="Distribution of Ultimate Load Tests", template="plotly_dark", color_discrete_sequence=['#fb7185'])
+                # Pre-binned histogram with a box marginal drawn from precomputed quartiles
+                centers, counts, width = summaries['hist']
+                fig_hist = make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+                fig_hist.add_trace(go.Box(y=["Ultimate_Load_kN"], orientation='h', marker_color='#fb7185',
+                                          **{key: [value] for key, value in summaries['box'].items()}), row=1, col=1)
+                fig_hist.add_trace(go.Bar(x=centers, y=counts, width=width, marker_color='#fb7185'), row=2, col=1)
+                fig_hist.update_layout(title="Distribution of Ultimate Load Tests", template="plotly_dark", showlegend=False,
+                                       bargap=0, yaxis=dict(showticklabels=False), yaxis2_title="count",
+                                       xaxis2_title="Ultimate_Load_kN")
                 st.plotly_chart(fig_hist, use_container_width=True)
             with colB:
-                corr = df[['FEA_Shear_Capacity_kN', 'Ultimate_Load_kN', 'Depth_D_mm', 'Yield_Strength_fy_MPa', 'Opening_Ratio', 'Web_Thickness_tw_mm']].corr()
+                corr = summaries['corr']
                 fig_corr = px.imshow(corr, text_auto=True, title="Correlation Matrix", color_continuous_scale="RdBu_r", template="plotly_dark")
                 st.plotly_chart(fig_corr, use_container_width=True)
             
     with g_tabs[2]:
-        st.write("#### SHAP Feature Importance & Plots (CatBoost)")
-        if 'CatBoost' in models and not df.empty:
-            cat_model = models['CatBoost']
-            features = ['Depth_D_mm', 'Web_Thickness_tw_mm', 'Flange_B_mm', 'Length_L_mm', 
-                        'Yield_Strength_fy_MPa', 'Youngs_Modulus_E_GPa', 'Poisson_Ratio', 'Opening_Ratio']
-            explainer = shap.TreeExplainer(cat_model)
-            sample_X = df[features].sample(min(100, len(df)))
-            shap_values = explainer.shap_values(sample_X)
-            
+        st.write("#### SHAP Feature Importance & Plots")
+        manifest = load_manifest(SHAP_DIR)
+        if manifest and manifest['models'] and manifest['data_hash'] == dataset_hash(*dataset_stamp()):
+            stored = list(manifest['models'])
+            model_name = st.selectbox("Model", stored, index=stored.index('CatBoost') if 'CatBoost' in stored else 0)
+            summary_png, dependence_png = shap_figures(model_name, manifest['created_at'], manifest['rows'])
+
             scol1, scol2 = st.columns(2)
             with scol1:
-                st.write("**SHAP Summary Plot**")
-                fig_shap, ax = plt.subplots()
-                shap.summary_plot(shap_values, sample_X, show=False)
-                st.pyplot(fig_shap)
+                st.write(f"**SHAP Summary Plot ({min(manifest['rows'], SHAP_PLOT_ROWS)} of {manifest['rows']} rows)**")
+                st.image(summary_png)
             with scol2:
                 st.write("**SHAP Dependence Plot (Opening Ratio)**")
-                fig_dep, ax = plt.subplots()
-                shap.dependence_plot("Opening_Ratio", shap_values, sample_X, show=False, ax=ax)
-                st.pyplot(fig_dep)
+                st.image(dependence_png)
         else:
-            st.warning("CatBoost model not found or data missing. Still training.")
-            
+            st.warning("No SHAP values for the current dataset yet. Run `python train_models.py --shap-only`.")
+
     with g_tabs[3]:
         st.write("#### Contour Plot: Shear Capacity vs Depth & Opening Ratio")
-        if not df.empty:
+        if summaries is not None:
+            # Mean capacity per cell of a CONTOUR_BINS x CONTOUR_BINS grid
+            x_centers, y_centers, means = summaries['contour']
             fig_contour = go.Figure(data=
                 go.Contour(
-                    z=df['FEA_Shear_Capacity_kN'],
-                    x=df['Opening_Ratio'],
-                    y=df['Depth_D_mm'],
-                    colorscale='Viridis'
+                    z=means,
+                    x=x_centers,
+                    y=y_centers,
+                    colorscale='Viridis',
+                    connectgaps=True
                 ))
             fig_contour.update_layout(title="Contour Plot of Shear Capacity", xaxis_title="Opening Ratio", yaxis_title="Depth (D) [mm]", template="plotly_dark")
             st.plotly_chart(fig_contour, use_container_width=True)
@@ -0,0 +1,196 @@
+"""
+Server-side data reduction for the app's plots.
+
+Every plot gets a summary whose size depends only on its resolution (bins,
+grid cells, points), never on the number of rows, so the page sent to the
+browser stays the same size for a thousand rows or a hundred million.
+
+- StreamingHistogram: counts over fixed bin edges, plus the quantiles a box
+  marginal needs.
+- StreamingCorrelation: Pearson correlation matrix from running means and
+  co-moments, merged chunk by chunk (Chan et al.'s pairwise update, which is
+  stable where the sum-of-products formula cancels).
+- BinnedMeans: mean of z on a regular (x, y) grid, for contour plots.
+- lttb: Largest-Triangle-Three-Buckets downsampling of a line or scatter
+  trace to a fixed number of points that keeps its visual shape;
+  StreamingLTTB applies it chunk by chunk.
+
+The accumulators take data in chunks (`update`), so the same code summarizes
+an in-memory DataFrame in bounded slices or a CSV read `chunk_rows` rows at a
+time (iter_csv_chunks) without ever holding the whole dataset.
+"""
+import numpy as np
+import pandas as pd
+
+
+def iter_chunks(df, chunk_rows=1_000_000):
+    """Row slices of `df` (views, not copies) of at most `chunk_rows` rows."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def iter_csv_chunks(path, columns=None, chunk_rows=200_000):
+    """DataFrames of `columns` of the CSV at `path`, read `chunk_rows` rows at a time."""
+    yield from pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+
+
+def read_csv_rows(path, rows, columns=None, chunk_rows=200_000):
+    """The rows at the sorted positions `rows` (0 = first data row) of the CSV at `path`, streamed in chunks."""
+    rows = np.asarray(rows, dtype=np.int64)
+    parts = []
+    start = 0
+    for chunk in iter_csv_chunks(path, columns, chunk_rows):
+        end = start + len(chunk)
+        lo, hi = np.searchsorted(rows, [start, end])
+        if hi > lo:
+            parts.append(chunk.iloc[rows[lo:hi] - start])
+        if hi == len(rows):
+            break
+        start = end
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+
+
+class StreamingHistogram:
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+
+    @classmethod
+    def from_range(cls, low, high, bins=50):
+        if not high > low:
+            high = low + 1.0
+        return cls(np.linspace(low, high, bins + 1))
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.counts += np.histogram(values[np.isfinite(values)], bins=self.edges)[0]
+        return self
+
+    @property
+    def centers(self):
+        return (self.edges[:-1] + self.edges[1:]) / 2
+
+    def quantiles(self, qs):
+        """Quantiles interpolated within bins (exact to one bin width)."""
+        cumulative = np.concatenate([[0], np.cumsum(self.counts)])
+        if cumulative[-1] == 0:
+            return np.full(len(qs), np.nan)
+        return np.interp(np.asarray(qs) * cumulative[-1], cumulative, self.edges)
+
+
+class StreamingCorrelation:
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+
+    def update(self, block):
+        """Add the rows of `block` (DataFrame with `columns`, or an array in that order); rows with NaN are skipped."""
+        if isinstance(block, pd.DataFrame):
+            block = block[self.columns].to_numpy(dtype=np.float64)
+        block = np.asarray(block, dtype=np.float64)
+        block = block[np.isfinite(block).all(axis=1)]
+        m = len(block)
+        if m == 0:
+            return self
+        block_mean = block.mean(axis=0)
+        centered = block - block_mean
+        delta = block_mean - self.mean
+        total = self.n + m
+        self.comoment += centered.T @ centered + np.outer(delta, delta) * (self.n * m / total)
+        self.mean += delta * (m / total)
+        self.n = total
+        return self
+
+    def corr(self):
+        std = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix = self.comoment / np.outer(std, std)
+        return pd.DataFrame(matrix, index=self.columns, columns=self.columns)
+
+
+class BinnedMeans:
+    def __init__(self, x_range, y_range, x_bins=40, y_bins=40):
+        self.x_edges = np.linspace(x_range[0], x_range[1], x_bins + 1)
+        self.y_edges = np.linspace(y_range[0], y_range[1], y_bins + 1)
+        self.sums = np.zeros(x_bins * y_bins)
+        self.counts = np.zeros(x_bins * y_bins, dtype=np.int64)
+
+    def update(self, x, y, z):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        x_bins, y_bins = len(self.x_edges) - 1, len(self.y_edges) - 1
+        # The upper edge belongs to the last bin, as in np.histogram
+        ix = np.minimum(np.searchsorted(self.x_edges, x, side='right') - 1, x_bins - 1)
+        iy = np.minimum(np.searchsorted(self.y_edges, y, side='right') - 1, y_bins - 1)
+        keep = ((x >= self.x_edges[0]) & (x <= self.x_edges[-1]) & (y >= self.y_edges[0])
+                & (y <= self.y_edges[-1]) & np.isfinite(z))
+        flat = iy[keep] * x_bins + ix[keep]
+        self.sums += np.bincount(flat, weights=z[keep], minlength=len(self.sums))
+        self.counts += np.bincount(flat, minlength=len(self.counts))
+        return self
+
+    def grid(self):
+        """(x centers, y centers, means of shape (y bins, x bins)); empty cells are NaN."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(self.counts > 0, self.sums / self.counts, np.nan)
+        x_centers = (self.x_edges[:-1] + self.x_edges[1:]) / 2
+        y_centers = (self.y_edges[:-1] + self.y_edges[1:]) / 2
+        return x_centers, y_centers, means.reshape(len(y_centers), len(x_centers))
+
+
+def lttb(x, y, threshold):
+    """Indices of `threshold` points of (x, y), x ascending, picked by Largest-Triangle-Three-Buckets."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # First and last points are kept; the rest is split into threshold - 2 buckets
+    bounds = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i in range(threshold - 2):
+        start, end = bounds[i], bounds[i + 1]
+        # Third vertex: the mean of the next bucket (the last point for the last bucket)
+        if i + 2 < len(bounds):
+            next_start, next_end = bounds[i + 1], bounds[i + 2]
+            avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # Twice the triangle area; the constant factor does not change the argmax
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        indices[i + 1] = previous
+    return indices
+
+
+class StreamingLTTB:
+    """lttb over chunks: every chunk is reduced to `threshold` points as it arrives, the survivors once more at the end."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self._x = []
+        self._y = []
+
+    def update(self, x, y):
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        keep = lttb(x, y, self.threshold)
+        self._x.append(x[keep])
+        self._y.append(y[keep])
+        return self
+
+    def points(self):
+        """(x, y) of at most `threshold` points."""
+        if not self._x:
+            return np.empty(0), np.empty(0)
+        x, y = np.concatenate(self._x), np.concatenate(self._y)
+        keep = lttb(x, y, self.threshold)
+        return x[keep], y[keep]
@@ -1,43 +1,59 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import pandas as pd
 import numpy as np
 
-def generate_beam_data(num_samples=1000):
-    np.random.seed(42)
-    
+CAPACITY_COLUMNS = ['FEA_Shear_Capacity_kN', 'Ultimate_Load_kN', 'Eurocode_Capacity_kN', 'With_Tension_Field_kN', 'Without_Tension_Field_kN']
+MIN_CAPACITY_KN = 5.0
+# Random draws sample_beams makes per beam (one stream each when given a list)
+NUM_DRAWS = 13
+
+def sample_beams(rng, num_samples):
+    """
+    Draw `num_samples` synthetic beams from `rng` and return a dict of column
+    arrays. `rng` is one np.random.Generator or RandomState shared by all
+    draws, or a list of NUM_DRAWS generators, one per draw: each stream then
+    continues where the previous call left it, so drawing 3000 + 7000 beams
+    gives the same beams as drawing 10000 at once.
+    """
+    rngs = list(rng) if isinstance(rng, (list, tuple)) else [rng] * NUM_DRAWS
+
     # Beam geometries
-    D = np.random.uniform(100, 300, num_samples) # Depth
-    tw = np.random.uniform(1.2, 3.0, num_samples) # Web thickness
-    B = np.random.uniform(50, 100, num_samples) # Flange
-    L = np.random.uniform(1000, 3000, num_samples) # Length
-    
+    D = rngs[0].uniform(100, 300, num_samples) # Depth
+    tw = rngs[1].uniform(1.2, 3.0, num_samples) # Web thickness
+    B = rngs[2].uniform(50, 100, num_samples) # Flange
+    L = rngs[3].uniform(1000, 3000, num_samples) # Length
+
     # Material properties
-    fy = np.random.uniform(250, 550, num_samples) # Yield strength
-    E = np.random.normal(200, 5, num_samples) # Young's modulus E in GPa
-    poisson = np.random.normal(0.3, 0.01, num_samples) # Poisson ratio
-    
+    fy = rngs[4].uniform(250, 550, num_samples) # Yield strength
+    E = rngs[5].normal(200, 5, num_samples) # Young's modulus E in GPa
+    poisson = rngs[6].normal(0.3, 0.01, num_samples) # Poisson ratio
+
     # Perforation configuration
-    opening_ratio = np.random.uniform(0.0, 0.8, num_samples) # a/d1 or d0/D
-    
+    opening_ratio = rngs[7].uniform(0.0, 0.8, num_samples) # a/d1 or d0/D
+
     # Non-linear synthetic relations to get reasonable capacities
-    area = (D + 2 * B) * tw
     web_area = (D - 2 * tw) * tw
     tau_y = fy / np.sqrt(3) # Shear yield stress
-    
+
     # Theoretical capacities
     base_shear = web_area * tau_y / 1000 # in kN
     reduction_factor = 1.0 - (1.1 * opening_ratio) + 0.2 * (opening_ratio ** 2)
     reduction_factor = np.clip(reduction_factor, 0.2, 1.0) # avoid negative or too small
-    
+
     # Introduce some non-linear dependencies
-    V_FEA = base_shear * reduction_factor * (1.0 + 0.05 * np.sin(D/50)) + np.random.normal(0, 5, num_samples)
-    V_Ultimate = V_FEA * np.random.uniform(1.05, 1.15, num_samples)
-    
-    V_Eurocode = base_shear * reduction_factor * 0.9 + np.random.normal(0, 2, num_samples)
-    V_TensionField = base_shear * reduction_factor * 1.1 + np.random.normal(0, 3, num_samples)
-    V_WithoutTF = base_shear * reduction_factor * 0.85 + np.random.normal(0, 2, num_samples)
-    
-    # Assemble dataframe
-    df = pd.DataFrame({
+    V_FEA = base_shear * reduction_factor * (1.0 + 0.05 * np.sin(D/50)) + rngs[8].normal(0, 5, num_samples)
+    V_Ultimate = V_FEA * rngs[9].uniform(1.05, 1.15, num_samples)
+
+    V_Eurocode = base_shear * reduction_factor * 0.9 + rngs[10].normal(0, 2, num_samples)
+    V_TensionField = base_shear * reduction_factor * 1.1 + rngs[11].normal(0, 3, num_samples)
+    V_WithoutTF = base_shear * reduction_factor * 0.85 + rngs[12].normal(0, 2, num_samples)
+
+    columns = {
         'Depth_D_mm': D,
         'Web_Thickness_tw_mm': tw,
         'Flange_B_mm': B,
@@ -51,14 +67,101 @@ def generate_beam_data(num_samples=1000):
         'Eurocode_Capacity_kN': V_Eurocode,
         'With_Tension_Field_kN': V_TensionField,
         'Without_Tension_Field_kN': V_WithoutTF
-    })
-    
+    }
+
     # Ensure no negative capacities
-    for col in ['FEA_Shear_Capacity_kN', 'Ultimate_Load_kN', 'Eurocode_Capacity_kN', 'With_Tension_Field_kN', 'Without_Tension_Field_kN']:
-        df[col] = df[col].apply(lambda x: max(x, 5.0))
-        
+    for col in CAPACITY_COLUMNS:
+        np.maximum(columns[col], MIN_CAPACITY_KN, out=columns[col])
+    return columns
+
+def generate_beam_data(num_samples=1000):
+    # Legacy single-CSV dataset used by the Streamlit app; same values as before
+    df = pd.DataFrame(sample_beams(np.random.RandomState(42), num_samples))
+
     df.to_csv('synthetic_beam_dataset.csv', index=False)
     print(f"Generated synthetic dataset with {len(df)} samples using provided theoretical formulas/properties.")
 
+# --- Sharded, out-of-core generation ---
+# Every shard gets its own SeedSequence spawned from the seed, so shard i is
+# identical however many workers run and in whichever order they finish.
+# Within a shard each random draw has its own stream (spawned from the shard's
+# SeedSequence), so the values depend only on the seed and the shard size,
+# not on chunk_rows. Each worker holds at most `chunk_rows` rows in memory and
+# appends them to its shard file as one Parquet row group / Arrow record batch.
+
+def write_shard(path, seed_seq, num_samples, chunk_rows, file_format, compression):
+    """Generate one shard in chunks and write it to `path`. Returns (path, rows)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rngs = [np.random.Generator(np.random.PCG64(child)) for child in seed_seq.spawn(NUM_DRAWS)]
+    writer = None
+    tmp_path = path + '.tmp'
+    try:
+        for start in range(0, num_samples, chunk_rows):
+            table = pa.table(sample_beams(rngs, min(chunk_rows, num_samples - start)))
+            if writer is None:
+                if file_format == 'parquet':
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression=compression)
+                else:
+                    options = pa.ipc.IpcWriteOptions(compression=compression)
+                    writer = pa.ipc.new_file(tmp_path, table.schema, options=options)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    # Only complete shards get their final name
+    os.replace(tmp_path, path)
+    return path, num_samples
+
+def generate_sharded(num_samples, out_dir, shard_size=1_000_000, chunk_rows=250_000, workers=None,
+                     seed=42, file_format='parquet', compression='zstd'):
+    """Write `num_samples` beams as independent seeded shards to `out_dir`, in parallel."""
+    os.makedirs(out_dir, exist_ok=True)
+    num_shards = -(-num_samples // shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(num_shards)
+    extension = 'parquet' if file_format == 'parquet' else 'feather'
+    workers = workers or min(num_shards, os.cpu_count() or 1)
+
+    start = time.perf_counter()
+    print(f"Generating {num_samples} samples in {num_shards} shards on {workers} workers...")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = []
+        for index, seed_seq in enumerate(seeds):
+            rows = min(shard_size, num_samples - index * shard_size)
+            path = os.path.join(out_dir, f'shard-{index:05d}.{extension}')
+            futures.append(pool.submit(write_shard, path, seed_seq, rows, chunk_rows, file_format, compression))
+        written = 0
+        for future in as_completed(futures):
+            path, rows = future.result()
+            written += rows
+            print(f"  [{time.perf_counter() - start:7.2f}s] {os.path.basename(path)}: {rows} rows ({written}/{num_samples})")
+
+    # Record how the shards were made so a dataset can be regenerated exactly
+    # (the leading underscore keeps pd.read_parquet(out_dir) from reading it)
+    with open(os.path.join(out_dir, '_manifest.json'), 'w') as f:
+        json.dump({
+            'num_samples': num_samples, 'num_shards': num_shards, 'shard_size': shard_size,
+            'chunk_rows': chunk_rows, 'seed': seed, 'format': file_format, 'compression': compression,
+            'columns': list(sample_beams(np.random.default_rng(0), 0)),
+        }, f, indent=2)
+    print(f"Generated {num_samples} samples in {out_dir} in {time.perf_counter() - start:.2f}s.")
+
 if __name__ == '__main__':
-    generate_beam_data()
+    parser = argparse.ArgumentParser(description="Generate the synthetic beam dataset.")
+    parser.add_argument('--samples', type=int, default=1000)
+    parser.add_argument('--out-dir', default=None,
+                        help="Write sharded Parquet/Feather files here instead of synthetic_beam_dataset.csv")
+    parser.add_argument('--shard-size', type=int, default=1_000_000)
+    parser.add_argument('--chunk-rows', type=int, default=250_000, help="Rows held in memory per worker")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--format', choices=['parquet', 'feather'], default='parquet')
+    parser.add_argument('--compression', default='zstd')
+    args = parser.parse_args()
+
+    if args.out_dir:
+        generate_sharded(args.samples, args.out_dir, args.shard_size, args.chunk_rows, args.workers,
+                         args.seed, args.format, args.compression)
+    else:
+        generate_beam_data(args.samples)
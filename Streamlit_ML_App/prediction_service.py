@@ -0,0 +1,116 @@
+"""
+Prediction service behind the Streamlit predictor tab.
+
+One PredictionService holds every trained model and the scaler (the app
+keeps a single instance per process with st.cache_resource). For a set of
+input rows it
+- scales the rows once and hands the same scaled array to every model that
+  was trained on scaled inputs (SVR, MLP, KNN),
+- runs the models concurrently on a thread pool (XGBoost, LightGBM, CatBoost
+  and the sklearn tree ensembles do most of their work in native code without
+  the GIL); a single row runs them one after another, since handing a few
+  microseconds of work to a thread costs more than it saves,
+- memoizes single-row results per input tuple, so resubmitting the form or
+  going back to an earlier input costs a dict lookup.
+
+`predict_batch` returns every model's prediction for a whole sweep (a pasted
+or uploaded table) in one call per model.
+"""
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+FEATURES = ['Depth_D_mm', 'Web_Thickness_tw_mm', 'Flange_B_mm', 'Length_L_mm',
+            'Yield_Strength_fy_MPa', 'Youngs_Modulus_E_GPa', 'Poisson_Ratio', 'Opening_Ratio']
+MODEL_NAMES = ['Decision Tree', 'Random Forest', 'KNN', 'Gradient Boosting', 'XGBoost', 'LightGBM',
+               'CatBoost', 'SVR', 'MLP']
+# Models trained on StandardScaler output (see train_models.py)
+SCALED_MODELS = ('SVR', 'MLP', 'KNN')
+
+
+class PredictionService:
+    def __init__(self, models, scaler=None, max_workers=None, cache_size=1024, parallel_min_rows=2):
+        self.models = dict(models)
+        self.scaler = scaler
+        self.cache_size = cache_size
+        self.parallel_min_rows = parallel_min_rows
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or min(len(self.models), os.cpu_count() or 1) or 1,
+                                            thread_name_prefix='predict')
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_directory(cls, path='.', **kwargs):
+        """Load `<Model_Name>_model.pkl` and scaler.pkl from `path`, skipping models that fail to load."""
+        models = {}
+        for name in MODEL_NAMES:
+            try:
+                with open(os.path.join(path, f'{name.replace(" ", "_")}_model.pkl'), 'rb') as f:
+                    models[name] = pickle.load(f)
+            except Exception:
+                pass
+        try:
+            with open(os.path.join(path, 'scaler.pkl'), 'rb') as f:
+                scaler = pickle.load(f)
+        except Exception:
+            scaler = None
+        return cls(models, scaler, **kwargs)
+
+    def _predict_model(self, name, X, X_scaled):
+        if name in SCALED_MODELS and X_scaled is not None:
+            return np.asarray(self.models[name].predict(X_scaled), dtype=np.float64).ravel()
+        return np.asarray(self.models[name].predict(X), dtype=np.float64).ravel()
+
+    def predict_frame(self, X):
+        """{model name: predictions array} for the rows of `X` (a DataFrame with FEATURES)."""
+        X = X[FEATURES].astype(np.float64)
+        X_scaled = self.scaler.transform(X) if self.scaler is not None else None
+        if len(X) < self.parallel_min_rows or len(self.models) < 2:
+            return {name: self._predict_model(name, X, X_scaled) for name in self.models}
+        futures = {name: self._executor.submit(self._predict_model, name, X, X_scaled) for name in self.models}
+        return {name: future.result() for name, future in futures.items()}
+
+    def predict_one(self, values):
+        """{model name: prediction} for one input row, given in FEATURES order."""
+        key = tuple(float(value) for value in values)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return dict(cached)
+            self.misses += 1
+        X = pd.DataFrame([key], columns=FEATURES)
+        preds = {name: float(values[0]) for name, values in self.predict_frame(X).items()}
+        with self._lock:
+            self._cache[key] = preds
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return dict(preds)
+
+    def predict_batch(self, df):
+        """`df` with one `<model> (kN)` column per model appended; raises ValueError on missing columns."""
+        missing = [col for col in FEATURES if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}. Columns found: {df.columns.tolist()}")
+        X = df[FEATURES].apply(pd.to_numeric, errors='coerce')
+        valid = X.notna().all(axis=1).to_numpy()
+        result = df.copy()
+        preds = self.predict_frame(X[valid]) if valid.any() else {name: np.empty(0) for name in self.models}
+        for name, values in preds.items():
+            column = np.full(len(df), np.nan)
+            column[valid] = values
+            result[f'{name} (kN)'] = column
+        return result
+
+    def stats(self):
+        with self._lock:
+            return {'models': list(self.models), 'cached_inputs': len(self._cache),
+                    'hits': self.hits, 'misses': self.misses}
@@ -2,6 +2,9 @@ import pandas as pd
 import numpy as np
 import pickle
 import os
+import sys
+import time
+import argparse
 from sklearn.model_selection import train_test_split, KFold, GridSearchCV
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error, mean_absolute_percentage_error
@@ -14,13 +17,34 @@ from xgboost import XGBRegressor
 from lightgbm import LGBMRegressor
 from catboost import CatBoostRegressor
 
-def train_and_save_models():
+# Shared successive-halving search lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from halving_search import halving_search
+from shap_store import compute_shap_store, data_hash
+import incremental_training
+
+FEATURES = ['Depth_D_mm', 'Web_Thickness_tw_mm', 'Flange_B_mm', 'Length_L_mm',
+            'Yield_Strength_fy_MPa', 'Youngs_Modulus_E_GPa', 'Poisson_Ratio', 'Opening_Ratio']
+# SHAP values of every tree model on the full dataset, read by the app's SHAP tab
+SHAP_DIR = 'shap_values'
+# Models, scaler and metrics trained from shards (--shards), kept apart from
+# the app's own: its SVR and KNN were fitted with the previous scaler
+SHARD_MODELS_DIR = 'shard_models'
+
+def tune(model, params, X, y, cv, search):
+    """Return the best estimator from an exhaustive grid search or a successive-halving search."""
+    if search == 'halving':
+        return halving_search(model, params, X, y, cv=cv, scoring='r2', n_jobs=-1, random_state=42)[1]
+    grid = GridSearchCV(model, params, cv=cv, scoring='r2', n_jobs=-1)
+    grid.fit(X, y)
+    return grid.best_estimator_
+
+def train_and_save_models(search='grid', compare_search=False, shap=True):
     print("Loading data...")
     df = pd.read_csv('synthetic_beam_dataset.csv')
     
     # Features and Target
-    features = ['Depth_D_mm', 'Web_Thickness_tw_mm', 'Flange_B_mm', 'Length_L_mm', 
-                'Yield_Strength_fy_MPa', 'Youngs_Modulus_E_GPa', 'Poisson_Ratio', 'Opening_Ratio']
+    features = FEATURES
     target = 'FEA_Shear_Capacity_kN'
     
     X = df[features]
@@ -44,13 +68,14 @@ def train_and_save_models():
         'Gradient Boosting': (GradientBoostingRegressor(random_state=42), {'n_estimators': [50, 100], 'learning_rate': [0.05, 0.1]}),
         'XGBoost': (XGBRegressor(random_state=42, objective='reg:squarederror'), {'n_estimators': [50, 100], 'learning_rate': [0.05, 0.1]}),
         'LightGBM': (LGBMRegressor(random_state=42), {'n_estimators': [50, 100], 'learning_rate': [0.05, 0.1]}),
-        'CatBoost': (CatBoostRegressor(random_state=42, verbose=0), {'iterations': [100, 200], 'learning_rate': [0.05, 0.1], 'depth': [4, 6]}),
+        'CatBoost': (CatBoostRegressor(random_state=42, verbose=0, allow_writing_files=False), {'iterations': [100, 200], 'learning_rate': [0.05, 0.1], 'depth': [4, 6]}),
         'SVR': (SVR(), {'C': [1.0, 10.0], 'kernel': ['rbf']}),
         'MLP': (MLPRegressor(random_state=42, max_iter=500), {'hidden_layer_sizes': [(50,), (100,)], 'alpha': [0.0001, 0.001]})
     }
     
     results = {}
     best_models = {}
+    comparison = {}
     
     for name, (model, params) in models.items():
         print(f"Training {name} with 10-fold CV and Hyperparameter Tuning...")
@@ -60,10 +85,20 @@ def train_and_save_models():
         train_x = X_train if is_tree else X_train_scaled
         test_x = X_test if is_tree else X_test_scaled
         
-        grid = GridSearchCV(model, params, cv=cv, scoring='r2', n_jobs=-1)
-        grid.fit(train_x, y_train)
+        if compare_search:
+            for candidate in ('grid', 'halving'):
+                start = time.perf_counter()
+                candidate_model = tune(model, params, train_x, y_train, cv, candidate)
+                comparison.setdefault(name, {})[f'{candidate} seconds'] = time.perf_counter() - start
+                comparison[name][f'{candidate} Test R2'] = r2_score(y_test, candidate_model.predict(test_x))
+            entry = comparison[name]
+            entry['Time Saved %'] = 100 * (1 - entry['halving seconds'] / entry['grid seconds'])
+            entry['Test R2 Diff'] = entry['halving Test R2'] - entry['grid Test R2']
+            print(f"  grid {entry['grid seconds']:.2f}s, halving {entry['halving seconds']:.2f}s "
+                  f"({entry['Time Saved %']:.1f}% saved), Test R2 diff {entry['Test R2 Diff']:+.4f}")
+            continue
         
-        best_model = grid.best_estimator_
+        best_model = tune(model, params, train_x, y_train, cv, search)
         y_pred_train = best_model.predict(train_x)
         y_pred_test = best_model.predict(test_x)
         
@@ -81,11 +116,112 @@ def train_and_save_models():
         with open(f'{name.replace(" ", "_")}_model.pkl', 'wb') as f:
             pickle.dump(best_model, f)
             
+    if compare_search:
+        comparison_df = pd.DataFrame(comparison).T
+        comparison_df.to_csv('search_comparison.csv')
+        print(comparison_df)
+        return
+    
     # Save results
     results_df = pd.DataFrame(results).T
     results_df.to_csv('model_metrics.csv')
     print("Models trained and saved successfully!")
     print(results_df)
 
+    if shap:
+        print("Computing SHAP values of the tree models...")
+        # Tree models were trained on the unscaled features
+        compute_shap_store(best_models, X, SHAP_DIR, features, data_hash(X))
+
+# Models that can learn one chunk at a time, with the parameters they are
+# trained with from shards (no search over data that does not fit in memory)
+STREAM_PARAMS = {
+    'MLP': {'hidden_layer_sizes': (100,), 'alpha': 0.0001, 'random_state': 42, 'max_iter': 500},
+    'XGBoost': {'n_estimators': 100, 'learning_rate': 0.1, 'random_state': 42, 'objective': 'reg:squarederror'},
+    'LightGBM': {'n_estimators': 100, 'learning_rate': 0.1, 'random_state': 42, 'verbose': -1},
+}
+
+def train_from_shards(path, chunk_rows=100_000, scaler_fit='two-pass', out_dir=SHARD_MODELS_DIR):
+    """
+    Train the STREAM_PARAMS models from Parquet/Feather/CSV shards (e.g.
+    dataset_generator.py --out-dir) into out_dir, with their own scaler and
+    model_metrics.csv (loadable with PredictionService.from_directory).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    target = 'FEA_Shear_Capacity_kN'
+    source = incremental_training.ShardSource(path, FEATURES, target, chunk_rows=chunk_rows)
+    print(f"Streaming {len(source.paths)} shard(s) from {path} in chunks of {chunk_rows} rows...")
+    scaler = incremental_training.fit_scaler(source, scaler_fit)
+    with open(os.path.join(out_dir, 'scaler.pkl'), 'wb') as f:
+        pickle.dump(scaler, f)
+
+    results = {}
+    for name, params in STREAM_PARAMS.items():
+        start = time.perf_counter()
+        # Tree models get unscaled features, as in the in-memory path
+        if name == 'MLP':
+            model = incremental_training.train_mlp(source, scaler, params)
+            model_scaler = scaler
+        elif name == 'XGBoost':
+            model = incremental_training.train_xgboost(source, params, feature_names=FEATURES)
+            model_scaler = None
+        else:
+            model = incremental_training.train_lightgbm(source, params, feature_names=FEATURES)
+            model_scaler = None
+        train_scores = incremental_training.evaluate(model, source, model_scaler, part='train')
+        test_scores = incremental_training.evaluate(model, source, model_scaler)
+        results[name] = {
+            'Train R2': train_scores['r2'],
+            'Test R2': test_scores['r2'],
+            'Test MAE': test_scores['mae'],
+            'Test MSE': test_scores['mse'],
+            'Test MAPE': test_scores['mape'],
+        }
+        with open(os.path.join(out_dir, f'{name}_model.pkl'), 'wb') as f:
+            pickle.dump(model, f)
+        print(f"  {name}: Test R2 {test_scores['r2']:.4f} ({time.perf_counter() - start:.2f}s, "
+              f"peak RSS {incremental_training.peak_rss_mb():.0f} MB)")
+
+    results_df = pd.DataFrame(results).T
+    results_df.to_csv(os.path.join(out_dir, 'model_metrics.csv'))
+    print(results_df)
+    print(f"Models, scaler and metrics saved to {out_dir}/. SHAP values are not computed from shards.")
+
+def compute_saved_shap():
+    """Recompute the SHAP store from the saved models without retraining."""
+    df = pd.read_csv('synthetic_beam_dataset.csv')
+    models = {}
+    for name in ['Decision Tree', 'Random Forest', 'Gradient Boosting', 'XGBoost', 'LightGBM', 'CatBoost']:
+        try:
+            with open(f'{name.replace(" ", "_")}_model.pkl', 'rb') as f:
+                models[name] = pickle.load(f)
+        except Exception as e:
+            print(f"Skipping {name}: {e}")
+    compute_shap_store(models, df[FEATURES], SHAP_DIR, FEATURES, data_hash(df[FEATURES]))
+
 if __name__ == '__main__':
-    train_and_save_models()
+    parser = argparse.ArgumentParser(description="Train and save the Streamlit app's models.")
+    parser.add_argument('--search', choices=['grid', 'halving'], default='grid',
+                        help="Hyperparameter search: exhaustive grid, or successive halving with early stopping")
+    parser.add_argument('--compare-search', action='store_true',
+                        help="Run both searches per model and report time saved and Test R2 difference")
+    parser.add_argument('--no-shap', action='store_true', help="Skip precomputing SHAP values of the tree models")
+    parser.add_argument('--shap-only', action='store_true',
+                        help="Recompute the SHAP values of the saved tree models without retraining")
+    parser.add_argument('--shards', default=None,
+                        help="Train MLP / XGBoost / LightGBM incrementally from a directory or glob of Parquet/Feather/CSV shards")
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help="Rows read into memory at a time with --shards")
+    parser.add_argument('--scaler-fit', choices=['two-pass', 'partial-fit'], default='two-pass',
+                        help="Exact two-pass scaler fit, or one pass of StandardScaler.partial_fit (with --shards)")
+    parser.add_argument('--out-dir', default=SHARD_MODELS_DIR,
+                        help="Directory of the models, scaler and metrics trained with --shards")
+    args = parser.parse_args()
+    if args.shards and os.path.abspath(args.out_dir) == os.path.abspath('.'):
+        parser.error(f"--out-dir must not be the app directory: --shards retrains only {', '.join(STREAM_PARAMS)}, "
+                     "and its scaler would break the SVR and KNN models there")
+    if args.shap_only:
+        compute_saved_shap()
+    elif args.shards:
+        train_from_shards(args.shards, args.chunk_rows, args.scaler_fit, args.out_dir)
+    else:
+        train_and_save_models(args.search, args.compare_search, not args.no_shap)
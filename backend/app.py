@@ -1,12 +1,40 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Depends, Header, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse, FileResponse, PlainTextResponse
+from pydantic import BaseModel, field_validator
+from typing import Dict, List, Optional
 from fastapi.middleware.cors import CORSMiddleware
-import joblib
-import pandas as pd
-import json
+from contextlib import asynccontextmanager
+from concurrent.futures.process import BrokenProcessPool
+import numpy as np
+import io
 import os
+import sys
+import time
+
+# Make sibling modules importable whether we run as `app` or `backend.app`
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from batching import PredictionBatcher
+from registry import ModelRegistry
+from ensemble import EnsemblePredictor, EnsembleUnavailable
+from cache import PredictionCache
+from design_formulas import DESIGN_COLUMNS, design_capacities_from_features
+from features import FEATURE_COLUMNS
+from lookup_table import LookupTable
+from jobs import JobManager, JobQueueFull
+from metrics import Metrics, MetricsMiddleware
+from profiling import RequestProfiler, ProfilingMiddleware
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load and warm the model before uvicorn starts accepting requests
+    await run_in_threadpool(startup)
+    yield
+    registry.stop_watching()
+    jobs.shutdown()
 
-app = FastAPI(title="Shear Capacity Predictor")
+app = FastAPI(title="Shear Capacity Predictor", lifespan=lifespan)
 
 # Enable CORS
 app.add_middleware(
@@ -17,19 +45,136 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load Model and Scaler
-try:
-    scaler = joblib.load('../models/scaler.pkl')
-    
-    with open('../models/best_model_info.json', 'r') as f:
-        info = json.load(f)
-    best_model_name = info['best_model_name']
-    model = joblib.load(f'../models/{best_model_name}_best.pkl')
-    print(f"Loaded model: {best_model_name}")
-except Exception as e:
-    print(f"Error loading models: {e}")
-    scaler = None
-    model = None
+# Prometheus metrics on /metrics: request counts and latency per route,
+# per-stage timings, rows and batch sizes (REQUEST_METRICS=0 turns them off)
+metrics = Metrics(enabled=os.environ.get('REQUEST_METRICS', '1').lower() in ('1', 'true', 'yes'))
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+predict_source = metrics.counter('predict_source_total', "/predict answers by source: cache, lookup table or model.",
+                                 ('source',))
+
+# Model registry: versioned scaler + model bundles, swappable at runtime
+# PREDICTOR=compiled          serve scaler-fused predictors exported by compiled.py
+# MODEL_MMAP=1                memory-map model arrays so uvicorn workers share them
+# PRELOAD_MODELS=all|SVR,MLP  load extra bundles at startup (default: best only)
+# MODEL_WATCH_INTERVAL=5      poll models/ for changes every N seconds (0 = off)
+# ADMIN_TOKEN=...             required in X-Admin-Token for /admin endpoints if set
+MODELS_DIR = os.environ.get('MODELS_DIR', '../models')
+registry = ModelRegistry(
+    MODELS_DIR,
+    FEATURE_COLUMNS,
+    metrics_path=os.environ.get('METRICS_PATH', '../results/model_comparison_metrics.csv'),
+    use_compiled=os.environ.get('PREDICTOR', 'sklearn').lower() == 'compiled',
+    mmap=os.environ.get('MODEL_MMAP', '0').lower() in ('1', 'true', 'yes'),
+)
+
+WARMUP_ROWS = int(os.environ.get('WARMUP_ROWS', '256'))
+readiness = {'ready': False, 'startup_seconds': None, 'error': None}
+
+# A typical section (about the training means), so warm-up takes the same
+# code paths as real requests without unpickling the scaler to find one
+WARMUP_ROW = [96.4, 241.0, 2.25, 78.0, 250.0, 349.106627, 210000.0, 1.0]
+
+def warm_up(bundle):
+    """Run dummy predictions so lazy initialization in sklearn/NumPy happens before the first request."""
+    # Same shapes as /predict (one row as a list) and the batch endpoints (an array)
+    bundle.predict([WARMUP_ROW])
+    bundle.predict(np.tile(np.asarray(WARMUP_ROW, dtype=np.float64), (WARMUP_ROWS, 1)))
+
+def startup():
+    """
+    Load the best model (and PRELOAD_MODELS), warm them up and mark the app
+    ready. Run by the lifespan hook; scripts that import the app call it
+    directly. Safe to call more than once.
+    """
+    if readiness['ready']:
+        return
+    start = time.perf_counter()
+    try:
+        preload = os.environ.get('PRELOAD_MODELS', '')
+        if preload:
+            registry.preload(None if preload == 'all' else [n.strip() for n in preload.split(',')])
+        best_model_name = registry.best_model_name()
+        registry.activate(best_model_name)
+        print(f"Loaded model: {best_model_name}")
+        for bundle in list(registry.bundles.values()):
+            warm_up(bundle)
+    except Exception as e:
+        readiness['error'] = str(e)
+        print(f"Error loading models: {e}")
+        return
+
+    watch_interval = float(os.environ.get('MODEL_WATCH_INTERVAL', '0'))
+    if watch_interval > 0:
+        registry.watch(watch_interval)
+
+    readiness.update(ready=True, startup_seconds=time.perf_counter() - start, error=None)
+    print(f"Ready in {readiness['startup_seconds']:.2f}s")
+
+# Shared pool for /predict_ensemble; ENSEMBLE_THREADS defaults to Python's choice
+ensemble = EnsemblePredictor(
+    registry,
+    max_workers=int(os.environ['ENSEMBLE_THREADS']) if os.environ.get('ENSEMBLE_THREADS') else None,
+)
+
+def predict_rows(X, bundle=None, endpoint='predict'):
+    """Scale and predict an (n, 8) block of features in one vectorized call."""
+    bundle = bundle or registry.active
+    if bundle.compiled is not None:
+        # The scaler is fused into the compiled predictor
+        with metrics.stage(endpoint, 'predict'):
+            predictions = bundle.compiled.predict(X)
+    else:
+        with metrics.stage(endpoint, 'scale'):
+            X = bundle.scaler.transform(X)
+        with metrics.stage(endpoint, 'predict'):
+            predictions = bundle.model.predict(X)
+    metrics.observe_rows(endpoint, bundle.version, len(predictions))
+    return predictions
+
+def active_bundle():
+    bundle = registry.active
+    if bundle is None:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    return bundle
+
+# Optional request coalescing for /predict (off by default)
+# PREDICT_BATCHING=1 PREDICT_BATCH_WINDOW_MS=2 PREDICT_BATCH_MAX_ROWS=256
+batcher = None
+if os.environ.get('PREDICT_BATCHING', '0').lower() in ('1', 'true', 'yes'):
+    batcher = PredictionBatcher(
+        predict_rows,
+        window_ms=float(os.environ.get('PREDICT_BATCH_WINDOW_MS', '2')),
+        max_rows=int(os.environ.get('PREDICT_BATCH_MAX_ROWS', '256')),
+    )
+    print(f"Request batching enabled: {batcher.window * 1000:g} ms / {batcher.max_rows} rows")
+
+# Optional LRU/TTL cache for /predict, keyed on model version + quantized features
+# PREDICTION_CACHE_SIZE=4096 (0 = off) PREDICTION_CACHE_TTL=600 PREDICTION_CACHE_TOLERANCE=1e-6
+prediction_cache = None
+if int(os.environ.get('PREDICTION_CACHE_SIZE', '0')) > 0:
+    prediction_cache = PredictionCache(
+        maxsize=int(os.environ['PREDICTION_CACHE_SIZE']),
+        ttl=float(os.environ.get('PREDICTION_CACHE_TTL', '0')),
+        tolerance=float(os.environ.get('PREDICTION_CACHE_TOLERANCE', '1e-6')),
+    )
+    # Entries of a replaced model can never be hit again, so drop them on every swap
+    registry.add_listener(lambda old, new: prediction_cache.clear())
+    print(f"Prediction cache enabled: {prediction_cache.maxsize} entries")
+
+# Optional lookup-table mode for /predict: multilinear interpolation on a grid
+# precomputed by lookup_table.py, falling back to the model outside the grid,
+# above the error bound, or when the table was built from another model version
+# LOOKUP_TABLE=../models/SVR_lookup.json LOOKUP_MAX_ERROR=0.5 (kN, default: no bound)
+lookup_table = None
+if os.environ.get('LOOKUP_TABLE'):
+    try:
+        lookup_table = LookupTable.load(
+            os.environ['LOOKUP_TABLE'],
+            max_error=float(os.environ['LOOKUP_MAX_ERROR']) if os.environ.get('LOOKUP_MAX_ERROR') else None,
+        )
+        print(f"Lookup table enabled for {lookup_table.version}: grid {lookup_table.grid.shape}")
+    except Exception as e:
+        print(f"Error loading lookup table: {e}")
 
 class BeamInput(BaseModel):
     dwh_d1: float
@@ -41,19 +186,9 @@ class BeamInput(BaseModel):
     E: float
     a_d: float
 
-@app.get("/")
-def read_root():
-    return {"message": "Shear Capacity Prediction API is running"}
-
-@app.post("/predict")
-def predict(input_data: BeamInput):
-    if model is None or scaler is None:
-        raise HTTPException(status_code=500, detail="Model not loaded")
-    
-    # Feature order must match training:
-    # 'Depth of Web opening(dwh/d1)', 'd1', 'tw', 'flange width(mm)', 'total depth D (mm)', 'fyw', 'E', 'a/d'
-    
-    features = [
+def beam_features(input_data):
+    # Same order as FEATURE_COLUMNS
+    return [
         input_data.dwh_d1,
         input_data.d1,
         input_data.tw,
@@ -63,38 +198,161 @@ def predict(input_data: BeamInput):
         input_data.E,
         input_data.a_d
     ]
+
+@app.get("/")
+def read_root():
+    return {"message": "Shear Capacity Prediction API is running"}
+
+@app.get("/ready")
+def ready():
+    """Readiness probe: 503 until the model is loaded and warmed up."""
+    if not readiness['ready']:
+        raise HTTPException(status_code=503, detail=readiness['error'] or "Starting up")
+    return {"ready": True, "model": registry.active.version, "startup_seconds": readiness['startup_seconds']}
+
+@app.post("/predict")
+async def predict(input_data: BeamInput):
+    bundle = active_bundle()
+    
+    features = beam_features(input_data)
+    
+    if prediction_cache is not None:
+        with metrics.stage('predict', 'cache'):
+            cache_key = prediction_cache.key(bundle.version, features)
+            cached = prediction_cache.get(cache_key)
+        if cached is not None:
+            predict_source.inc('cache')
+            return {"shear_capacity_kN": cached}
     
-    # Scale
-    features_scaled = scaler.transform([features])
+    if lookup_table is not None and lookup_table.version == bundle.version:
+        with metrics.stage('predict', 'lookup'):
+            interpolated = lookup_table.lookup(features)
+        if interpolated is not None:
+            predict_source.inc('lookup')
+            return {"shear_capacity_kN": interpolated}
     
-    # Predict
-    prediction = model.predict(features_scaled)
+    if batcher is not None:
+        # Coalesced with other in-flight requests into one scale + predict
+        prediction = await batcher.submit(features)
+    else:
+        # Scale + predict this row on its own, off the event loop
+        prediction = (await run_in_threadpool(predict_rows, [features], bundle))[0]
+    predict_source.inc('model')
     
-    return {"shear_capacity_kN": float(prediction[0])}
+    if prediction_cache is not None:
+        prediction_cache.put(cache_key, float(prediction))
+    
+    return {"shear_capacity_kN": float(prediction)}
 
-from fastapi import UploadFile, File
-from fastapi.responses import StreamingResponse
-import io
+def run_ensemble(rows, endpoint):
+    try:
+        with metrics.stage(endpoint, 'ensemble'):
+            result = ensemble.predict(rows)
+    except EnsembleUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    for version in result[3].values():
+        metrics.observe_rows(endpoint, version, len(rows))
+    return result
+
+@app.post("/predict_ensemble")
+async def predict_ensemble(input_data: BeamInput):
+    predictions, weighted_mean, weights, versions, errors = await run_in_threadpool(run_ensemble, [beam_features(input_data)], 'predict_ensemble')
+    return {
+        "models_kN": {name: float(preds[0]) for name, preds in predictions.items()},
+        "weights": weights,
+        "weighted_mean_kN": float(weighted_mean[0]),
+        "versions": versions,
+        "errors": errors,
+    }
+
+@app.post("/predict_ensemble_batch")
+async def predict_ensemble_batch(inputs: List[BeamInput]):
+    if not inputs:
+        raise HTTPException(status_code=400, detail="No inputs given")
+    rows = [beam_features(input_data) for input_data in inputs]
+    predictions, weighted_mean, weights, versions, errors = await run_in_threadpool(run_ensemble, rows, 'predict_ensemble_batch')
+    return {
+        "models_kN": {name: preds.tolist() for name, preds in predictions.items()},
+        "weights": weights,
+        "weighted_mean_kN": weighted_mean.tolist(),
+        "versions": versions,
+        "errors": errors,
+    }
+
+@app.post("/design_check")
+def design_check(input_data: BeamInput):
+    """AS/NZS 4600, DSM and tension-field code capacities for one section."""
+    results = design_capacities_from_features([beam_features(input_data)])
+    return {col: float(results[col][0]) for col in DESIGN_COLUMNS}
+
+@app.post("/design_check_batch")
+def design_check_batch(inputs: List[BeamInput]):
+    """Code capacities for many sections in one vectorized pass, one list per column."""
+    if not inputs:
+        raise HTTPException(status_code=400, detail="No inputs given")
+    results = design_capacities_from_features([beam_features(input_data) for input_data in inputs])
+    return {col: results[col].tolist() for col in DESIGN_COLUMNS}
+
+# pandas (~0.3s to import) is imported inside the batch handlers that use it,
+# so it is not on the cold-start path of /predict
+
+# Rows per chunk in the streaming CSV mode of /predict_batch
+STREAM_CHUNK_ROWS = int(os.environ.get('STREAM_CHUNK_ROWS', '50000'))
+
+def open_csv_stream(fileobj):
+    """Start a chunked CSV reader and validate the header from its first chunk."""
+    import pandas as pd  # off the cold-start path of /predict (see above)
+    try:
+        reader = pd.read_csv(fileobj, chunksize=STREAM_CHUNK_ROWS)
+        first_chunk = next(reader, None)
+    except pd.errors.EmptyDataError:
+        first_chunk = None
+    if first_chunk is None:
+        raise HTTPException(status_code=400, detail="Uploaded CSV has no header row")
+    missing_cols = [col for col in FEATURE_COLUMNS if col not in first_chunk.columns]
+    if missing_cols:
+        raise HTTPException(status_code=400, detail=f"Missing required columns in uploaded spreadsheet: {missing_cols}. Columns found: {first_chunk.columns.tolist()}")
+    return reader, first_chunk
+
+def iter_csv_predictions(reader, first_chunk, bundle):
+    """Predict each chunk in one vectorized call and yield it as CSV text."""
+    chunk = first_chunk
+    header = True
+    while chunk is not None:
+        chunk['Predicted_Shear_Capacity_kN'] = predict_rows(chunk[FEATURE_COLUMNS].fillna(0), bundle, 'predict_batch_stream')
+        with metrics.stage('predict_batch_stream', 'serialize'):
+            text = chunk.to_csv(index=False, header=header)
+        yield text
+        header = False
+        chunk = next(reader, None)
 
 @app.post("/predict_batch")
-async def predict_batch(file: UploadFile = File(...)):
-    if model is None or scaler is None:
-        raise HTTPException(status_code=500, detail="Model not loaded")
+async def predict_batch(file: UploadFile = File(...), stream: bool = False):
+    bundle = active_bundle()
     
     if not file.filename.endswith(('.xlsx', '.csv', '.xls')):
         raise HTTPException(status_code=400, detail="Must be an Excel or CSV file")
+    
+    if stream:
+        # Chunked mode: memory stays flat and rows leave as soon as they are predicted
+        if not file.filename.endswith('.csv'):
+            raise HTTPException(status_code=400, detail="Streaming mode only supports CSV files")
+        reader, first_chunk = await run_in_threadpool(open_csv_stream, file.file)
+        headers = {
+            'Content-Disposition': f'attachment; filename="predictions_{file.filename}"'
+        }
+        return StreamingResponse(iter_csv_predictions(reader, first_chunk, bundle), headers=headers, media_type="text/csv")
         
     try:
+        import pandas as pd  # off the cold-start path of /predict (see above)
         content = await file.read()
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(content))
-        else:
-            df = pd.read_excel(io.BytesIO(content))
+        with metrics.stage('predict_batch', 'parse'):
+            if file.filename.endswith('.csv'):
+                df = pd.read_csv(io.BytesIO(content))
+            else:
+                df = pd.read_excel(io.BytesIO(content))
             
-        required_cols = [
-            'Depth of Web opening(dwh/d1)', 'd1', 'tw', 
-            'flange width(mm)', 'total depth D (mm)', 'fyw', 'E', 'a/d'
-        ]
+        required_cols = FEATURE_COLUMNS
         
         # Check for missing columns 
         # (Be slightly flexible: find columns that exist, or do exact match)
@@ -107,31 +365,30 @@ async def predict_batch(file: UploadFile = File(...)):
         if missing_cols:
             raise HTTPException(status_code=400, detail=f"Missing required columns in uploaded spreadsheet: {missing_cols}. Columns found: {df.columns.tolist()}")
             
-        # Extract features
-        X = df[required_cols]
-        # Fill missing values with 0
-        if X.isnull().values.any():
-            X = X.fillna(0)
+        with metrics.stage('predict_batch', 'validate'):
+            # Extract features
+            X = df[required_cols]
+            # Fill missing values with 0
+            if X.isnull().values.any():
+                X = X.fillna(0)
             
-        # Scale inputs
-        X_scaled = scaler.transform(X)
-        
-        # Predict
-        predictions = model.predict(X_scaled)
+        # Scale inputs and predict
+        predictions = predict_rows(X, bundle, 'predict_batch')
         
         # Add to dataframe
         df['Predicted_Shear_Capacity_kN'] = predictions
         
         # Save to buffer
         output = io.BytesIO()
-        if file.filename.endswith('.csv'):
-            df.to_csv(output, index=False)
-            media_type = "text/csv"
-            out_filename = "predictions_" + file.filename
-        else:
-            df.to_excel(output, index=False, engine='openpyxl')
-            media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            out_filename = "predictions_" + file.filename
+        with metrics.stage('predict_batch', 'serialize'):
+            if file.filename.endswith('.csv'):
+                df.to_csv(output, index=False)
+                media_type = "text/csv"
+                out_filename = "predictions_" + file.filename
+            else:
+                df.to_excel(output, index=False, engine='openpyxl')
+                media_type = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                out_filename = "predictions_" + file.filename
             
         output.seek(0)
         
@@ -144,6 +401,304 @@ async def predict_batch(file: UploadFile = File(...)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing file: {str(e)}")
 
+def parse_npy_features(body):
+    """
+    View a .npy payload of shape (n, 8), little-endian float64, as an array
+    without copying it. Either C order (row-major) or Fortran order (columnar)
+    is accepted; columns follow the BeamInput field order.
+    """
+    # BytesIO over bytes shares the buffer; it is only used to read the header
+    header = io.BytesIO(body)
+    try:
+        version = np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Body is not a valid .npy array: {e}")
+    
+    if dtype != np.dtype('<f8'):
+        raise HTTPException(status_code=400, detail=f"Expected little-endian float64 ('<f8'), got '{dtype.str}'")
+    if len(shape) != 2 or shape[1] != len(FEATURE_COLUMNS):
+        raise HTTPException(status_code=400, detail=f"Expected shape (n, {len(FEATURE_COLUMNS)}), got {shape}")
+    
+    offset = header.tell()
+    if len(body) - offset != shape[0] * shape[1] * dtype.itemsize:
+        raise HTTPException(status_code=400, detail="Payload size does not match the .npy header")
+    
+    X = np.frombuffer(body, dtype=dtype, count=shape[0] * shape[1], offset=offset)
+    return X.reshape(shape, order='F' if fortran_order else 'C')
+
+@app.post("/predict_batch_npy")
+async def predict_batch_npy(request: Request):
+    """Binary batch prediction for machine clients: .npy features in, .npy predictions out."""
+    bundle = active_bundle()
+    
+    body = await request.body()
+    with metrics.stage('predict_batch_npy', 'parse'):
+        X = parse_npy_features(body)
+    predictions = await run_in_threadpool(predict_rows, X, bundle, 'predict_batch_npy')
+    
+    output = io.BytesIO()
+    with metrics.stage('predict_batch_npy', 'serialize'):
+        np.lib.format.write_array(output, np.ascontiguousarray(predictions, dtype='<f8'), allow_pickle=False)
+    headers = {
+        'Content-Disposition': 'attachment; filename="predictions.npy"'
+    }
+    return Response(content=output.getvalue(), headers=headers, media_type="application/octet-stream")
+
+class DOERequest(BaseModel):
+    method: str = 'lhs'
+    n: Optional[int] = None
+    levels: int = 5
+    seed: int = 42
+    bounds: Optional[Dict[str, List[float]]] = None
+
+    @field_validator('bounds')
+    @classmethod
+    def check_bounds(cls, bounds):
+        # Keyed on the BeamInput field names (doe.DOE_FEATURES), each [lower, upper]
+        for name, value in (bounds or {}).items():
+            if name not in BeamInput.model_fields:
+                raise ValueError(f"Unknown feature '{name}', expected one of {list(BeamInput.model_fields)}")
+            if len(value) != 2 or value[0] > value[1]:
+                raise ValueError(f"Bounds of '{name}' must be [lower, upper] with lower <= upper, got {value}")
+        return bounds
+
+def iter_doe_predictions(first_chunk, chunks, bundle):
+    """Predict each design chunk in one vectorized call and yield it as CSV text."""
+    import pandas as pd  # ~0.3s to import, kept off the cold-start path of /predict
+    X = first_chunk
+    header = True
+    while X is not None:
+        df = pd.DataFrame(X, columns=FEATURE_COLUMNS)
+        df['Predicted_Shear_Capacity_kN'] = predict_rows(X, bundle, 'predict_doe')
+        with metrics.stage('predict_doe', 'serialize'):
+            text = df.to_csv(index=False, header=header)
+        yield text
+        header = False
+        with metrics.stage('predict_doe', 'design'):
+            X = next(chunks, None)
+
+@app.post("/predict_doe")
+async def predict_doe(request: DOERequest):
+    """
+    Generate a Latin hypercube, Sobol or full-factorial design and stream its
+    predictions as CSV, one chunk at a time (see doe.py).
+    """
+    from doe import design_chunks  # scipy.stats.qmc, only needed here
+    
+    bundle = active_bundle()
+    try:
+        chunks = design_chunks(request.method, request.n, bounds=request.bounds, chunk_rows=STREAM_CHUNK_ROWS,
+                               levels=request.levels, seed=request.seed)
+        # Draw the first chunk up front so infeasible bounds fail with a 400, not mid-stream
+        first_chunk = await run_in_threadpool(next, chunks, None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if first_chunk is None:
+        raise HTTPException(status_code=400, detail="The design has no feasible points")
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename="doe_{request.method}.csv"'
+    }
+    return StreamingResponse(iter_doe_predictions(first_chunk, chunks, bundle), headers=headers, media_type="text/csv")
+
+# --- Background batch jobs ---
+# POST /jobs returns a job id at once; spawned worker processes predict the
+# file in chunks, /jobs/{id} reports progress and /jobs/{id}/result downloads it
+# JOB_WORKERS=1 (jobs running at once) JOB_MAX_PENDING=16 (queued + running)
+# JOB_DIR=../results/jobs JOB_CHUNK_ROWS=10000 JOB_TTL_HOURS=24 JOB_NICE=10
+
+jobs = JobManager(
+    os.environ.get('JOB_DIR', '../results/jobs'),
+    MODELS_DIR,
+    FEATURE_COLUMNS,
+    use_compiled=registry.use_compiled,
+    mmap=registry.mmap_mode is not None,
+    max_workers=int(os.environ.get('JOB_WORKERS', '1')),
+    max_pending=int(os.environ.get('JOB_MAX_PENDING', '16')),
+    chunk_rows=int(os.environ.get('JOB_CHUNK_ROWS', '10000')),
+    ttl=float(os.environ.get('JOB_TTL_HOURS', '24')) * 3600,
+    nice=int(os.environ.get('JOB_NICE', '10')),
+)
+
+@app.post("/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...)):
+    """Queue a CSV/Excel file for batch prediction and return its job id without waiting."""
+    bundle = active_bundle()
+    try:
+        job = await run_in_threadpool(jobs.submit, file.file, file.filename, bundle.name, bundle.version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except BrokenProcessPool:
+        # The pool broke again right after being replaced; the next submit starts another
+        raise HTTPException(status_code=503, detail="Batch workers are restarting; try again")
+    return {**job, "status_url": f"/jobs/{job['id']}", "result_url": f"/jobs/{job['id']}/result"}
+
+@app.get("/jobs")
+def list_jobs():
+    return {**jobs.stats(), "jobs": jobs.list()}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    try:
+        path, filename = jobs.result(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    media_type = "text/csv" if filename.endswith('.csv') else "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    return FileResponse(path, media_type=media_type, filename=filename)
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: str):
+    """Cancel a queued or running job; a finished job is deleted with its files."""
+    try:
+        return jobs.cancel(job_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No job {job_id}")
+
+@app.get("/lookup/stats")
+def lookup_stats():
+    if lookup_table is None:
+        return {"enabled": False}
+    bundle = registry.active
+    return {
+        "enabled": True,
+        "active": bundle is not None and lookup_table.version == bundle.version,
+        **lookup_table.stats(),
+    }
+
+@app.get("/cache/stats")
+def cache_stats():
+    if prediction_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **prediction_cache.stats()}
+
+# --- Prometheus metrics ---
+
+metrics.callback('ready', "1 once the model is loaded and warmed up.", lambda: int(readiness['ready']))
+metrics.callback('startup_seconds', "Time from startup() to ready.", lambda: readiness['startup_seconds'])
+metrics.callback(
+    'model_info', "Loaded model bundles; active=\"true\" marks the one serving /predict.",
+    lambda: [((b.name, b.version, str(b.compiled is not None).lower(), str(b is registry.active).lower()), 1)
+             for b in list(registry.bundles.values())],
+    ('name', 'version', 'compiled', 'active'),
+)
+if prediction_cache is not None:
+    metrics.callback('prediction_cache_hits_total', "Prediction cache hits.",
+                     lambda: prediction_cache.hits, kind='counter')
+    metrics.callback('prediction_cache_misses_total', "Prediction cache misses (including expired entries).",
+                     lambda: prediction_cache.misses, kind='counter')
+    metrics.callback('prediction_cache_hit_ratio', "Prediction cache hits / lookups since startup.",
+                     lambda: prediction_cache.stats()['hit_rate'])
+    metrics.callback('prediction_cache_entries', "Entries in the prediction cache.",
+                     lambda: prediction_cache.stats()['size'])
+if lookup_table is not None:
+    metrics.callback('lookup_table_hits_total', "/predict answers interpolated from the lookup table.",
+                     lambda: lookup_table.hits, kind='counter')
+    metrics.callback('lookup_table_fallbacks_total', "Lookup-table misses that fell back to the model, by reason.",
+                     lambda: [(('outside_grid',), lookup_table.outside), (('error_bound',), lookup_table.over_error)],
+                     ('reason',), kind='counter')
+
+@app.get("/metrics")
+def prometheus_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (REQUEST_METRICS=0)")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# --- Model administration ---
+
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/models")
+def list_models():
+    return registry.describe()
+
+@app.post("/admin/models/{name}/activate", dependencies=[Depends(require_admin)])
+async def activate_model(name: str, reload: bool = False):
+    if name not in registry.available():
+        raise HTTPException(status_code=404, detail=f"No model named {name} in {MODELS_DIR}")
+    try:
+        # Loading runs in a worker thread; traffic keeps using the old bundle until the swap
+        if reload:
+            await run_in_threadpool(registry.load, name, True)
+        bundle = await run_in_threadpool(registry.activate, name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load {name}: {e}")
+    return {"active": bundle.version}
+
+@app.post("/admin/models/{name}/preload", dependencies=[Depends(require_admin)])
+async def preload_model(name: str):
+    if name not in registry.available():
+        raise HTTPException(status_code=404, detail=f"No model named {name} in {MODELS_DIR}")
+    try:
+        bundle = await run_in_threadpool(registry.load, name, True)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not load {name}: {e}")
+    return {"loaded": bundle.version}
+
+# --- Request profiling ---
+# A request is stack-sampled when it sends X-Profile: 1 (with X-Admin-Token if
+# ADMIN_TOKEN is set) or falls under the sample rate; its profile id comes back
+# in X-Profile-Id and the folded stacks download from /admin/profiles/{id}
+# PROFILE_SAMPLE_RATE=0.01 (default 0 = header only) PROFILE_INTERVAL_MS=5 PROFILE_KEEP=20
+
+profiler = RequestProfiler(
+    sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', '0')),
+    interval=float(os.environ.get('PROFILE_INTERVAL_MS', '5')) / 1000,
+    keep=int(os.environ.get('PROFILE_KEEP', '20')),
+)
+app.add_middleware(ProfilingMiddleware, profiler=profiler, admin_token=ADMIN_TOKEN)
+
+@app.get("/admin/profiles", dependencies=[Depends(require_admin)])
+def list_profiles():
+    return {**profiler.stats(), "profiles": profiler.recent()}
+
+@app.post("/admin/profiles/config", dependencies=[Depends(require_admin)])
+def configure_profiling(sample_rate: Optional[float] = None, interval_ms: Optional[float] = None):
+    """Change the sampled fraction of requests (0 turns sampling off) or the sampling interval."""
+    try:
+        profiler.configure(sample_rate, interval_ms / 1000 if interval_ms is not None else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return profiler.stats()
+
+@app.get("/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+def download_profile(profile_id: str, path: Optional[str] = None):
+    """
+    Folded stacks of one profile, or of every kept profile with id 'merged'
+    (optionally only those for `path`), for flamegraph.pl or speedscope.
+    """
+    if profile_id == 'merged':
+        folded = profiler.merged(path)
+    else:
+        profile = profiler.get(profile_id)
+        if profile is None:
+            raise HTTPException(status_code=404, detail=f"No kept profile {profile_id}")
+        folded = profile.folded()
+    headers = {
+        'Content-Disposition': f'attachment; filename="profile-{profile_id}.folded"',
+        # Stacks of every thread while the request ran, not only the request's own
+        'X-Profile-Scope': 'process',
+    }
+    return PlainTextResponse(folded, headers=headers)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,73 @@
+"""
+Request coalescing for the /predict endpoint.
+
+Single-row requests are queued for a short window (or until enough rows are
+waiting), stacked into one 2-D array and pushed through a single vectorized
+scale + predict call. Each waiting handler then receives its own row of the
+result.
+"""
+import asyncio
+
+import numpy as np
+
+
+class PredictionBatcher:
+    def __init__(self, predict_fn, window_ms=2.0, max_rows=256):
+        # predict_fn takes an (n, n_features) array and returns n predictions
+        self.predict_fn = predict_fn
+        self.window = window_ms / 1000.0
+        self.max_rows = max(1, int(max_rows))
+        self._queue = None
+        self._full = None
+        self._worker = None
+
+    def _start(self):
+        self._queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, features):
+        """Queue one feature row and wait for its prediction."""
+        if self._worker is None or self._worker.done():
+            self._start()
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((features, future))
+        if self._queue.qsize() >= self.max_rows:
+            self._full.set()
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+
+        # Wait out the window unless a full batch is already queued
+        if self.window > 0 and self._queue.qsize() < self.max_rows - 1:
+            self._full.clear()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+
+        while len(batch) < self.max_rows and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            rows = np.asarray([features for features, _ in batch], dtype=np.float64)
+
+            try:
+                # Keep the event loop free while sklearn/numpy do the work
+                predictions = await loop.run_in_executor(None, self.predict_fn, rows)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), prediction in zip(batch, predictions):
+                # A handler may have been cancelled (client disconnect)
+                if not future.done():
+                    future.set_result(float(prediction))
@@ -0,0 +1,349 @@
+"""
+Compiled (scaler-fused) predictors for the served model.
+
+The StandardScaler is an affine map per feature, so it can be folded into the
+first stage of the models that are currently winning:
+
+- SVR (RBF kernel): x -> (x - mean) / scale * sqrt(gamma) becomes one
+  multiply-add per feature, and the support vectors are pre-multiplied by
+  sqrt(gamma), so the kernel is exp(-||z - sv||^2).
+- MLP: the first layer becomes W / scale and b - (mean / scale) @ W.
+- Decision trees, random forests and gradient boosting: every tree's nodes
+  are flattened into shared arrays and walked for all trees at once. The
+  scaler is applied as-is (not folded into the thresholds) because sklearn
+  compares float32-rounded scaled features against the thresholds.
+
+The result is a small pure-NumPy object with a predict(X) method taking raw
+(unscaled) features, stored next to the pickles either as an .npz or as an
+uncompressed .joblib whose arrays load with mmap_mode='r', so every worker
+process shares one page-cache copy.
+
+Run from the backend directory to export and verify the best model:
+    python compiled.py [name ...] [--format joblib]
+"""
+import hashlib
+
+import numpy as np
+
+
+def file_digest(*paths):
+    """Short SHA-1 of the files' contents (the registry's bundle versions and the exports' source digests)."""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:10]
+
+
+def _scaler_affine(scaler, n_features):
+    mean = scaler.mean_ if getattr(scaler, 'with_mean', True) and scaler.mean_ is not None else np.zeros(n_features)
+    scale = scaler.scale_ if getattr(scaler, 'with_std', True) and scaler.scale_ is not None else np.ones(n_features)
+    return np.asarray(mean, dtype=np.float64), np.asarray(scale, dtype=np.float64)
+
+
+class CompiledSVR:
+    kind = 'svr'
+
+    def __init__(self, weight, bias, support, support_sq, dual_coef, intercept):
+        self.weight = weight
+        self.bias = bias
+        self.support = support
+        self.support_sq = support_sq
+        self.dual_coef = dual_coef
+        self.intercept = intercept
+
+    @classmethod
+    def from_sklearn(cls, scaler, model):
+        if model.kernel != 'rbf':
+            raise ValueError(f"Only RBF-kernel SVR can be compiled, got kernel={model.kernel!r}")
+        mean, scale = _scaler_affine(scaler, model.support_vectors_.shape[1])
+        root_gamma = np.sqrt(model._gamma)
+        weight = root_gamma / scale
+        support = np.ascontiguousarray(model.support_vectors_ * root_gamma)
+        return cls(
+            weight=weight,
+            bias=-mean * weight,
+            support=support,
+            support_sq=np.einsum('ij,ij->i', support, support),
+            dual_coef=np.ascontiguousarray(model.dual_coef_.ravel()),
+            intercept=float(model.intercept_[0]),
+        )
+
+    def arrays(self):
+        return {
+            'weight': self.weight, 'bias': self.bias, 'support': self.support,
+            'support_sq': self.support_sq, 'dual_coef': self.dual_coef,
+            'intercept': np.array(self.intercept),
+        }
+
+    def predict(self, X):
+        Z = np.asarray(X, dtype=np.float64) * self.weight + self.bias
+        sq_dist = np.einsum('ij,ij->i', Z, Z)[:, None] - 2.0 * (Z @ self.support.T) + self.support_sq
+        np.maximum(sq_dist, 0.0, out=sq_dist)
+        np.exp(-sq_dist, out=sq_dist)
+        return sq_dist @ self.dual_coef + self.intercept
+
+
+_ACTIVATIONS = {
+    'identity': lambda a: a,
+    'relu': lambda a: np.maximum(a, 0.0, out=a),
+    'tanh': lambda a: np.tanh(a, out=a),
+    'logistic': lambda a: np.divide(1.0, 1.0 + np.exp(-a, out=a), out=a),
+}
+
+
+class CompiledMLP:
+    kind = 'mlp'
+
+    def __init__(self, weights, biases, activation):
+        self.weights = weights
+        self.biases = biases
+        self.activation = activation
+
+    @classmethod
+    def from_sklearn(cls, scaler, model):
+        if model.activation not in _ACTIVATIONS:
+            raise ValueError(f"Unsupported MLP activation: {model.activation!r}")
+        mean, scale = _scaler_affine(scaler, model.coefs_[0].shape[0])
+        weights = [np.array(w, dtype=np.float64) for w in model.coefs_]
+        biases = [np.array(b, dtype=np.float64) for b in model.intercepts_]
+        # Fold (x - mean) / scale into the first layer
+        biases[0] = biases[0] - (mean / scale) @ weights[0]
+        weights[0] = weights[0] / scale[:, None]
+        return cls(weights, biases, model.activation)
+
+    def arrays(self):
+        out = {'activation': np.array(self.activation)}
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            out[f'W{i}'] = w
+            out[f'b{i}'] = b
+        return out
+
+    def predict(self, X):
+        a = np.asarray(X, dtype=np.float64)
+        act = _ACTIVATIONS[self.activation]
+        last = len(self.weights) - 1
+        for i, (w, b) in enumerate(zip(self.weights, self.biases)):
+            a = a @ w
+            a += b
+            if i != last:
+                a = act(a)
+        # MLPRegressor uses an identity output layer
+        return a.ravel()
+
+
+class CompiledTrees:
+    """
+    prediction = bias + tree_weight * sum of leaf values over all trees.
+
+    Nodes of every tree live in flat arrays; leaves point to themselves, so
+    walking `depth` steps from the roots lands every row on its leaf without
+    per-step leaf checks.
+    """
+    kind = 'trees'
+    chunk_rows = 4096
+
+    def __init__(self, mean, scale, feature, threshold, left, right, value, roots, depth, bias, tree_weight):
+        self.mean = mean
+        self.scale = scale
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.depth = int(depth)
+        self.bias = float(bias)
+        self.tree_weight = float(tree_weight)
+
+    @classmethod
+    def from_sklearn(cls, scaler, model):
+        name = type(model).__name__
+        if name == 'DecisionTreeRegressor':
+            trees, bias, tree_weight = [model], 0.0, 1.0
+        elif name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+            trees, bias, tree_weight = list(model.estimators_), 0.0, 1.0 / len(model.estimators_)
+        elif name == 'GradientBoostingRegressor':
+            if model.loss != 'squared_error':
+                raise ValueError(f"Only squared-error gradient boosting can be compiled, got loss={model.loss!r}")
+            if model.init_ == 'zero':
+                bias = 0.0
+            elif type(model.init_).__name__ == 'DummyRegressor':
+                bias = float(np.ravel(model.init_.constant_)[0])
+            else:
+                raise ValueError("Only the default (mean) or 'zero' gradient boosting init can be compiled")
+            trees, tree_weight = list(model.estimators_[:, 0]), float(model.learning_rate)
+        else:
+            raise ValueError(f"Cannot compile {name} as trees")
+
+        feature, threshold, left, right, value, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in trees:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            leaf = tree.children_left == -1
+            roots.append(offset)
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(np.where(leaf, np.inf, tree.threshold))
+            left.append(np.where(leaf, nodes, tree.children_left) + offset)
+            right.append(np.where(leaf, nodes, tree.children_right) + offset)
+            value.append(tree.value[:, 0, 0])
+            depth = max(depth, tree.max_depth)
+            offset += tree.node_count
+
+        mean, scale = _scaler_affine(scaler, model.n_features_in_)
+        return cls(
+            mean=mean, scale=scale,
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            left=np.concatenate(left).astype(np.intp),
+            right=np.concatenate(right).astype(np.intp),
+            value=np.concatenate(value).astype(np.float64),
+            roots=np.asarray(roots, dtype=np.intp),
+            depth=depth, bias=bias, tree_weight=tree_weight,
+        )
+
+    def arrays(self):
+        return {
+            'mean': self.mean, 'scale': self.scale, 'feature': self.feature, 'threshold': self.threshold,
+            'left': self.left, 'right': self.right, 'value': self.value, 'roots': self.roots,
+            'depth': np.array(self.depth), 'bias': np.array(self.bias), 'tree_weight': np.array(self.tree_weight),
+        }
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        # sklearn trees compare float32 features against float64 thresholds
+        Xs = ((X - self.mean) / self.scale).astype(np.float32).astype(np.float64)
+        out = np.empty(len(Xs))
+        for start in range(0, len(Xs), self.chunk_rows):
+            block = Xs[start:start + self.chunk_rows]
+            rows = np.arange(len(block))[:, None]
+            node = np.broadcast_to(self.roots, (len(block), len(self.roots)))
+            for _ in range(self.depth):
+                node = np.where(block[rows, self.feature[node]] <= self.threshold[node], self.left[node], self.right[node])
+            out[start:start + len(block)] = self.value[node].sum(axis=1)
+        return self.bias + self.tree_weight * out
+
+
+_TREE_MODELS = ('DecisionTreeRegressor', 'RandomForestRegressor', 'ExtraTreesRegressor', 'GradientBoostingRegressor')
+
+
+def compile_predictor(scaler, model):
+    """Fold a fitted StandardScaler into a fitted SVR, MLPRegressor or sklearn tree model."""
+    name = type(model).__name__
+    if name == 'SVR':
+        return CompiledSVR.from_sklearn(scaler, model)
+    if name == 'MLPRegressor':
+        return CompiledMLP.from_sklearn(scaler, model)
+    if name in _TREE_MODELS:
+        return CompiledTrees.from_sklearn(scaler, model)
+    raise ValueError(f"Cannot compile {name}: only SVR, MLPRegressor and sklearn trees are supported")
+
+
+def save_compiled(predictor, path, feature_names=None, source_digest=None):
+    """
+    Write an .npz, or an uncompressed .joblib whose arrays can be memory-mapped.
+    `feature_names` (the scaler's feature_names_in_) lets the registry check
+    the column order without unpickling the scaler, and `source_digest`
+    (file_digest of the scaler and model pickles) lets it reject an export
+    left over from before the model was retrained.
+    """
+    arrays = predictor.arrays()
+    if feature_names is not None:
+        arrays['feature_names'] = np.asarray([str(name) for name in feature_names])
+    if source_digest is not None:
+        arrays['source_digest'] = np.array(source_digest)
+    if path.endswith('.joblib'):
+        import joblib
+        joblib.dump({'kind': predictor.kind, **arrays}, path)
+    else:
+        np.savez(path, kind=np.array(predictor.kind), **arrays)
+
+
+def _from_arrays(data, keys):
+    predictor = _build(data, keys)
+    predictor.feature_names = [str(name) for name in data['feature_names']] if 'feature_names' in keys else None
+    predictor.source_digest = str(data['source_digest']) if 'source_digest' in keys else None
+    return predictor
+
+
+def _build(data, keys):
+    kind = str(data['kind'])
+    if kind == 'svr':
+        return CompiledSVR(
+            weight=data['weight'], bias=data['bias'], support=data['support'],
+            support_sq=data['support_sq'], dual_coef=data['dual_coef'],
+            intercept=float(data['intercept']),
+        )
+    if kind == 'mlp':
+        n_layers = sum(1 for key in keys if key.startswith('W'))
+        return CompiledMLP(
+            weights=[data[f'W{i}'] for i in range(n_layers)],
+            biases=[data[f'b{i}'] for i in range(n_layers)],
+            activation=str(data['activation']),
+        )
+    if kind == 'trees':
+        return CompiledTrees(
+            mean=data['mean'], scale=data['scale'], feature=data['feature'], threshold=data['threshold'],
+            left=data['left'], right=data['right'], value=data['value'], roots=data['roots'],
+            depth=int(data['depth']), bias=float(data['bias']), tree_weight=float(data['tree_weight']),
+        )
+    raise ValueError(f"Unknown compiled predictor kind: {kind!r}")
+
+
+def load_compiled(path, mmap_mode=None):
+    """Load an .npz or .joblib predictor; mmap_mode='r' maps a .joblib's arrays instead of reading them."""
+    if path.endswith('.joblib'):
+        import joblib
+        data = joblib.load(path, mmap_mode=mmap_mode)
+        return _from_arrays(data, list(data))
+    with np.load(path, allow_pickle=False) as data:
+        return _from_arrays(data, data.files)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+
+    import joblib
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description="Export scaler-fused predictors next to the model pickles.")
+    parser.add_argument('names', nargs='*', help="Models to export (default: the best model)")
+    parser.add_argument('--format', choices=['npz', 'joblib'], default='npz',
+                        help="joblib writes an uncompressed file that MODEL_MMAP=1 memory-maps")
+    parser.add_argument('--models-dir', default='../models')
+    args = parser.parse_args()
+
+    models_dir = args.models_dir
+    with open(f'{models_dir}/best_model_info.json', 'r') as f:
+        best_model_name = json.load(f)['best_model_name']
+
+    scaler = joblib.load(f'{models_dir}/scaler.pkl')
+    # Check against the scaler + model pipeline on the training data
+    df = pd.read_csv('../cleaned_data.csv')
+    X = df.drop(columns=['VU(FEA)']).to_numpy(dtype=np.float64)
+
+    failed = False
+    for name in args.names or [best_model_name]:
+        model = joblib.load(f'{models_dir}/{name}_best.pkl')
+        predictor = compile_predictor(scaler, model)
+
+        expected = model.predict(scaler.transform(X))
+        actual = predictor.predict(X)
+        max_abs = np.max(np.abs(actual - expected))
+        print(f"{name}: max |compiled - pipeline| = {max_abs:.3e} kN over {len(X)} rows")
+        if not np.allclose(actual, expected, rtol=1e-9, atol=1e-9):
+            print(f"{name}: compiled predictor does not match the original pipeline; not saving.")
+            failed = True
+            continue
+
+        out_path = f'{models_dir}/{name}_compiled.{args.format}'
+        save_compiled(predictor, out_path, feature_names=getattr(scaler, 'feature_names_in_', None),
+                      source_digest=file_digest(f'{models_dir}/scaler.pkl', f'{models_dir}/{name}_best.pkl'))
+        print(f"Saved compiled predictor to {out_path}")
+    if failed:
+        sys.exit(1)
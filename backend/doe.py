@@ -0,0 +1,236 @@
+"""
+Space-filling designs of experiments over the eight backend features, for
+parametric studies with the trained surrogate.
+
+Three designs are supported:
+- 'lhs': Latin hypercube. Streamed as consecutive LHS blocks of `chunk_rows`
+  points, each stratified on its own, so a sweep never needs a full n x 8
+  table.
+- 'sobol': scrambled Sobol sequence, continued chunk by chunk (chunks are
+  rounded up to a power of two to keep its balance properties).
+- 'factorial': full-factorial grid, enumerated chunk by chunk from the flat
+  grid index.
+
+Features whose lower and upper bounds are equal are held constant and are not
+design dimensions (fyw, E and a/d are constant in cleaned_data.csv).
+Engineering constraints are vectorized predicates on the (m, 8) feature
+array; points that violate any of them are dropped, and LHS/Sobol keep
+sampling until `n` points have been accepted.
+
+As in the training data, the dwh_d1 feature holds the opening depth dwh in mm;
+the opening ratio is dwh_d1 / d1.
+
+Run from the backend directory, e.g.:
+    python doe.py --method sobol --n 1000000 --out ../results/doe_sobol.parquet
+    python doe.py --method lhs --n 100000 --url http://localhost:8000
+"""
+import io
+import time
+import argparse
+
+import numpy as np
+from scipy.stats import qmc
+
+from features import FEATURE_COLUMNS
+
+# BeamInput field order (same order as FEATURE_COLUMNS)
+DOE_FEATURES = ['dwh_d1', 'd1', 'tw', 'flange_width', 'total_depth', 'fyw', 'E', 'a_d']
+
+# (lower, upper) per feature: the ranges covered by cleaned_data.csv
+DEFAULT_BOUNDS = {
+    'dwh_d1': (0.0, 275.2),
+    'd1': (138.0, 344.0),
+    'tw': (1.5, 3.0),
+    'flange_width': (60.0, 120.0),
+    'total_depth': (150.0, 350.0),
+    'fyw': (349.106627, 349.106627),
+    'E': (210000.0, 210000.0),
+    'a_d': (1.0, 1.0),
+}
+
+MAX_OPENING_RATIO = 0.8
+METHODS = ('lhs', 'sobol', 'factorial')
+
+
+def default_constraints(max_opening_ratio=MAX_OPENING_RATIO):
+    """[(description, predicate)], each predicate mapping an (m, 8) array to a boolean mask."""
+    return [
+        ('d1 < total_depth', lambda X: X[:, 1] < X[:, 4]),
+        (f'dwh / d1 <= {max_opening_ratio}', lambda X: X[:, 0] <= max_opening_ratio * X[:, 1]),
+    ]
+
+
+def resolve_bounds(bounds=None):
+    """Merge `bounds` over DEFAULT_BOUNDS and return (lower, upper) arrays in DOE_FEATURES order."""
+    merged = dict(DEFAULT_BOUNDS)
+    for name, value in (bounds or {}).items():
+        if name not in merged:
+            raise ValueError(f"Unknown feature '{name}', expected one of {DOE_FEATURES}")
+        if np.shape(value) != (2,):
+            raise ValueError(f"Bounds of '{name}' must be [lower, upper], got {value!r}")
+        merged[name] = value
+    lower = np.array([float(merged[name][0]) for name in DOE_FEATURES])
+    upper = np.array([float(merged[name][1]) for name in DOE_FEATURES])
+    if np.any(upper < lower):
+        raise ValueError("Every upper bound must be >= its lower bound")
+    return lower, upper
+
+
+def apply_constraints(X, constraints):
+    mask = np.ones(len(X), dtype=bool)
+    for _, predicate in constraints:
+        mask &= predicate(X)
+    return X[mask]
+
+
+def _unit_sampler(method, dims, seed, scramble):
+    if method == 'lhs':
+        return qmc.LatinHypercube(dims, seed=seed)
+    return qmc.Sobol(dims, scramble=scramble, seed=seed)
+
+
+def _sampled_chunks(method, n, lower, upper, constraints, chunk_rows, seed, scramble):
+    varying = np.flatnonzero(upper > lower)
+    if len(varying) == 0:
+        raise ValueError("At least one feature needs a range to build a design")
+    if method == 'sobol':
+        # Sobol points are balanced in blocks of 2^m
+        chunk_rows = 1 << int(np.ceil(np.log2(max(chunk_rows, 1))))
+    sampler = _unit_sampler(method, len(varying), seed, scramble)
+
+    accepted = 0
+    while accepted < n:
+        X = np.tile(lower, (chunk_rows, 1))
+        X[:, varying] = qmc.scale(sampler.random(chunk_rows), lower[varying], upper[varying])
+        X = apply_constraints(X, constraints)
+        if len(X) == 0:
+            raise ValueError("The constraints rejected every point of a whole chunk; check the bounds")
+        X = X[:n - accepted]
+        accepted += len(X)
+        yield X
+
+
+def _factorial_chunks(n, lower, upper, constraints, chunk_rows, levels):
+    varying = np.flatnonzero(upper > lower)
+    if len(varying) == 0:
+        raise ValueError("At least one feature needs a range to build a design")
+    if isinstance(levels, dict):
+        level_counts = [levels.get(DOE_FEATURES[i], 5) for i in varying]
+    else:
+        level_counts = [levels] * len(varying)
+    values = [
+        np.asarray(count, dtype=np.float64) if np.ndim(count) else np.linspace(lower[i], upper[i], int(count))
+        for i, count in zip(varying, level_counts)
+    ]
+    shape = tuple(len(v) for v in values)
+    total = int(np.prod(shape))
+
+    accepted = 0
+    for start in range(0, total, chunk_rows):
+        if n is not None and accepted >= n:
+            break
+        index = np.unravel_index(np.arange(start, min(start + chunk_rows, total)), shape)
+        X = np.tile(lower, (len(index[0]), 1))
+        for column, level_index, level_values in zip(varying, index, values):
+            X[:, column] = level_values[level_index]
+        X = apply_constraints(X, constraints)
+        if n is not None:
+            X = X[:n - accepted]
+        accepted += len(X)
+        if len(X):
+            yield X
+
+
+def design_chunks(method, n=None, bounds=None, constraints=None, chunk_rows=50000,
+                  levels=5, seed=42, scramble=True):
+    """
+    Yield feasible design points as (m, 8) float64 arrays in BeamInput order.
+
+    `n` is the number of points for LHS/Sobol; for a factorial design it
+    optionally caps the number of grid points, which otherwise covers the whole
+    grid. `levels` is the number of factorial levels per varying feature, or a
+    dict of feature -> count or explicit list of values.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown design '{method}', expected one of {METHODS}")
+    lower, upper = resolve_bounds(bounds)
+    constraints = default_constraints() if constraints is None else constraints
+    if method == 'factorial':
+        return _factorial_chunks(n, lower, upper, constraints, chunk_rows, levels)
+    if not n or n < 1:
+        raise ValueError(f"'{method}' designs need a positive number of points n")
+    return _sampled_chunks(method, int(n), lower, upper, constraints, chunk_rows, seed, scramble)
+
+
+def predict_design(chunks, predict_fn):
+    """Run each design chunk through `predict_fn` in one vectorized call; yields (X, predictions)."""
+    for X in chunks:
+        yield X, np.asarray(predict_fn(X), dtype=np.float64)
+
+
+def http_predict_fn(url, timeout=600):
+    """predict_fn that posts each chunk to the backend's /predict_batch_npy endpoint."""
+    import urllib.request
+
+    endpoint = url.rstrip('/') + '/predict_batch_npy'
+
+    def predict(X):
+        body = io.BytesIO()
+        np.save(body, np.ascontiguousarray(X, dtype='<f8'), allow_pickle=False)
+        request = urllib.request.Request(endpoint, data=body.getvalue(),
+                                         headers={'Content-Type': 'application/octet-stream'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return np.load(io.BytesIO(response.read()), allow_pickle=False)
+
+    return predict
+
+
+def write_results(results, path, columns):
+    """Append (X, predictions) chunks to a CSV or Parquet file; returns the row count."""
+    import pandas as pd
+
+    rows = 0
+    writer = None
+    try:
+        for X, predictions in results:
+            df = pd.DataFrame(X, columns=columns)
+            df['Predicted_Shear_Capacity_kN'] = predictions
+            if path.endswith('.parquet'):
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(path, table.schema, compression='zstd')
+                writer.write_table(table)
+            else:
+                df.to_csv(path, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a design-of-experiments sweep through the surrogate model.")
+    parser.add_argument('--method', choices=METHODS, default='lhs')
+    parser.add_argument('--n', type=int, default=None, help="Points for lhs/sobol (cap for factorial)")
+    parser.add_argument('--levels', type=int, default=5, help="Factorial levels per varying feature")
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', default=None, help="Predict through a running backend instead of loading the model locally")
+    parser.add_argument('--out', default='../results/doe_predictions.csv', help=".csv or .parquet")
+    args = parser.parse_args()
+
+    if args.url:
+        predict_fn = http_predict_fn(args.url)
+    else:
+        # Load the active model exactly as the server would (MODELS_DIR, PREDICTOR, ...)
+        from app import registry, startup
+        startup()
+        predict_fn = registry.active.predict
+
+    start = time.perf_counter()
+    chunks = design_chunks(args.method, args.n, chunk_rows=args.chunk_rows, levels=args.levels, seed=args.seed)
+    rows = write_results(predict_design(chunks, predict_fn), args.out, FEATURE_COLUMNS)
+    print(f"{args.method}: {rows} points predicted and written to {args.out} in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,93 @@
+"""
+Multi-model ensemble over every bundle loaded in the registry.
+
+The inputs are scaled once (all bundles trained in one run share
+models/scaler.pkl), then each model predicts on a shared thread pool, so the
+latency is roughly that of the slowest model rather than the sum. The
+weighted mean uses each model's Test R2 from the training metrics, clipped
+at zero and normalized over the models that produced a prediction; models
+that fail to load or predict are reported in `errors` instead.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class EnsembleUnavailable(RuntimeError):
+    """No model of the ensemble produced a prediction."""
+
+
+class EnsemblePredictor:
+    def __init__(self, registry, max_workers=None):
+        self.registry = registry
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ensemble')
+        self._preloaded = False
+        self._preload_lock = threading.Lock()
+
+    def ensure_loaded(self):
+        """
+        Load every model on disk the first time the ensemble is used (at
+        startup with PRELOAD_MODELS=all); concurrent first requests wait for
+        one load instead of each loading every model.
+        """
+        if self._preloaded:
+            return
+        with self._preload_lock:
+            if not self._preloaded:
+                missing = [name for name in self.registry.available() if name not in self.registry.bundles]
+                self.registry.preload(missing)
+                self._preloaded = True
+
+    def bundles(self):
+        return sorted(self.registry.bundles.values(), key=lambda b: b.name)
+
+    @staticmethod
+    def weights(bundles):
+        raw = {b.name: max(b.metrics.get('Test R2', 0.0), 0.0) for b in bundles}
+        total = sum(raw.values())
+        if total == 0:
+            # No metrics available: fall back to a plain mean
+            return {name: 1.0 / len(raw) for name in raw}
+        return {name: w / total for name, w in raw.items()}
+
+    def _predict(self, bundle, X, scaled):
+        if bundle.compiled is not None:
+            return bundle.compiled.predict(X)
+        return bundle.model.predict(scaled[id(bundle.scaler)].result())
+
+    def predict(self, X):
+        """
+        Return ({model: predictions}, weighted_mean, {model: weight},
+        {model: version}, {model: error}) over the models that predicted;
+        raises EnsembleUnavailable if none did.
+        """
+        self.ensure_loaded()
+        errors = {name: f"Could not load: {error}" for name, error in list(self.registry.errors.items())
+                  if name not in self.registry.bundles}
+        bundles = self.bundles()
+        if not bundles:
+            raise EnsembleUnavailable(f"No models loaded: {errors}" if errors else "No models loaded")
+
+        X = np.asarray(X, dtype=np.float64)
+        # Scale once per distinct scaler instance (normally just one); compiled
+        # predictors take raw features and scale internally
+        scaled = {}
+        for bundle in bundles:
+            if bundle.compiled is None and id(bundle.scaler) not in scaled:
+                scaled[id(bundle.scaler)] = self.executor.submit(bundle.scaler.transform, X)
+        futures = {bundle.name: self.executor.submit(self._predict, bundle, X, scaled) for bundle in bundles}
+
+        predictions = {}
+        for name, future in futures.items():
+            try:
+                predictions[name] = np.asarray(future.result(), dtype=np.float64)
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+        if not predictions:
+            raise EnsembleUnavailable(f"Every model failed: {errors}")
+        predicted = [bundle for bundle in bundles if bundle.name in predictions]
+        weights = self.weights(predicted)
+        weighted_mean = sum(weights[name] * preds for name, preds in predictions.items())
+        versions = {bundle.name: bundle.version for bundle in predicted}
+        return predictions, weighted_mean, weights, versions, errors
@@ -0,0 +1,10 @@
+"""
+Model input features, shared by the app and the scripts that must not import
+it (the app loads the model at startup).
+"""
+
+# Feature order must match training
+FEATURE_COLUMNS = [
+    'Depth of Web opening(dwh/d1)', 'd1', 'tw',
+    'flange width(mm)', 'total depth D (mm)', 'fyw', 'E', 'a/d'
+]
@@ -0,0 +1,446 @@
+"""
+Background batch-prediction jobs.
+
+POST /jobs stores the upload under `storage_dir/<job id>/` and returns at
+once; a process pool then reads the file in chunks, predicts each chunk with
+the model that was active at submission and appends it to the result file,
+recording progress in the job's status.json after every chunk.
+
+- Jobs run in separate processes (spawned, not forked, since the server has
+  threads running), so parsing and serializing a large spreadsheet never
+  holds the serving process's GIL. Workers also lower their CPU priority
+  (`nice`), so /predict keeps its latency while jobs run.
+- At most `max_workers` jobs run at a time and at most `max_pending` are
+  queued or running; further submissions are refused (HTTP 429).
+- Status lives on disk, not in memory, so any uvicorn worker can answer a
+  poll and finished jobs survive a restart until they expire (`ttl`).
+- CSV is read with pandas in chunks, .xlsx is streamed row by row with
+  openpyxl in read-only mode and written in write-only mode, so memory stays
+  flat for both; legacy .xls files are read in one go and the result is
+  written as .xlsx.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+FORMATS = ('.csv', '.xlsx', '.xls')
+FINISHED = ('done', 'failed', 'cancelled')
+_JOB_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+def _write_json(path, data):
+    tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+# --- Worker process side ---
+
+_worker = {}
+
+
+def _init_worker(models_dir, feature_columns, use_compiled, mmap, nice):
+    if nice and hasattr(os, 'nice'):
+        os.nice(nice)
+    from registry import ModelRegistry
+    _worker['feature_columns'] = feature_columns
+    _worker['registry'] = ModelRegistry(models_dir, feature_columns, use_compiled=use_compiled, mmap=mmap)
+
+
+def _load_bundle(name, version):
+    """The bundle for `name`, reloaded if the cached one is not `version`."""
+    registry = _worker['registry']
+    bundle = registry.load(name)
+    if bundle.version != version:
+        bundle = registry.load(name, force=True)
+    return bundle
+
+
+def _count_csv_rows(path):
+    # Newlines minus the header; quoted multi-line cells make this an estimate
+    count = 0
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            count += block.count(b'\n')
+    return max(count - 1, 0)
+
+
+def _csv_chunks(path, chunk_rows):
+    import pandas as pd
+    return _count_csv_rows(path), pd.read_csv(path, chunksize=chunk_rows)
+
+
+def _xlsx_chunks(path, chunk_rows):
+    import openpyxl
+    import pandas as pd
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    sheet = workbook.active
+    total = sheet.max_row - 1 if sheet.max_row else None
+
+    def chunks():
+        try:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+            buffer = []
+            for row in rows:
+                buffer.append(row)
+                if len(buffer) == chunk_rows:
+                    yield pd.DataFrame(buffer, columns=header)
+                    buffer = []
+            if buffer:
+                yield pd.DataFrame(buffer, columns=header)
+        finally:
+            workbook.close()
+    return total, chunks()
+
+
+def _xls_chunks(path, chunk_rows):
+    import pandas as pd
+    df = pd.read_excel(path)
+    return len(df), iter([df])
+
+
+class _CsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.header = True
+
+    def write(self, df):
+        df.to_csv(self.path, mode='w' if self.header else 'a', header=self.header, index=False)
+        self.header = False
+
+    def close(self):
+        pass
+
+
+class _XlsxWriter:
+    def __init__(self, path):
+        import openpyxl
+        self.path = path
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.header = True
+
+    def write(self, df):
+        if self.header:
+            self.sheet.append([str(column) for column in df.columns])
+            self.header = False
+        # Empty cells instead of NaN, as DataFrame.to_excel writes them
+        for row in df.astype(object).where(df.notna(), None).itertuples(index=False):
+            self.sheet.append(list(row))
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+def run_job(job_dir, chunk_rows):
+    """Process one job (runs in a worker process); progress and outcome go to status.json."""
+    status_path = os.path.join(job_dir, 'status.json')
+    status = _read_json(status_path)
+    if os.path.exists(os.path.join(job_dir, 'cancel')):
+        status.update(status='cancelled', finished_at=time.time())
+        _write_json(status_path, status)
+        return status
+
+    status.update(status='running', started_at=time.time())
+    _write_json(status_path, status)
+    input_path = os.path.join(job_dir, status['input_file'])
+    result_path = os.path.join(job_dir, status['result_file'])
+    feature_columns = _worker['feature_columns']
+    writer = None
+    try:
+        bundle = _load_bundle(status['model_name'], status['model_version'])
+        status['model_version'] = bundle.version
+
+        ext = os.path.splitext(status['input_file'])[1].lower()
+        reader = {'.csv': _csv_chunks, '.xlsx': _xlsx_chunks, '.xls': _xls_chunks}[ext]
+        status['rows_total'], chunks = reader(input_path, chunk_rows)
+        writer = _CsvWriter(result_path) if ext == '.csv' else _XlsxWriter(result_path)
+
+        for chunk in chunks:
+            missing_cols = [col for col in feature_columns if col not in chunk.columns]
+            if missing_cols:
+                raise ValueError(f"Missing required columns in uploaded spreadsheet: {missing_cols}. "
+                                 f"Columns found: {chunk.columns.tolist()}")
+            X = chunk[feature_columns].astype(np.float64).fillna(0)
+            chunk['Predicted_Shear_Capacity_kN'] = bundle.predict(X)
+            writer.write(chunk)
+            status['rows_done'] += len(chunk)
+            status['updated_at'] = time.time()
+            _write_json(status_path, status)
+            if os.path.exists(os.path.join(job_dir, 'cancel')):
+                status.update(status='cancelled', finished_at=time.time())
+                _write_json(status_path, status)
+                return status
+
+        writer.close()
+        writer = None
+        status['rows_total'] = status['rows_done']
+        status.update(status='done', finished_at=time.time())
+    except Exception as e:
+        status.update(status='failed', error=f"{type(e).__name__}: {e}", finished_at=time.time())
+    finally:
+        if writer is not None and status['status'] != 'done':
+            # Leave no half-written result behind
+            try:
+                os.remove(result_path)
+            except OSError:
+                pass
+    _write_json(status_path, status)
+    return status
+
+
+# --- Server side ---
+
+class JobManager:
+    def __init__(self, storage_dir, models_dir, feature_columns, use_compiled=False, mmap=False,
+                 max_workers=1, max_pending=16, chunk_rows=10000, ttl=24 * 3600, nice=10):
+        self.storage_dir = storage_dir
+        self.models_dir = os.path.abspath(models_dir)
+        self.feature_columns = list(feature_columns)
+        self.use_compiled = use_compiled
+        self.mmap = mmap
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.ttl = ttl
+        self.nice = nice
+        self._executor = None
+        self._futures = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        # Created on first use, so importing the app never spawns processes
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=mp.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.models_dir, self.feature_columns, self.use_compiled, self.mmap, self.nice),
+                )
+            return self._executor
+
+    def _discard_pool(self, executor):
+        """Drop a broken pool (a worker died) so the next submit starts a fresh one."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        # Its queued and running jobs have already failed with BrokenProcessPool
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _job_dir(self, job_id):
+        if not _JOB_ID.match(job_id or ''):
+            return None
+        path = os.path.join(self.storage_dir, job_id)
+        return path if os.path.isdir(path) else None
+
+    def pending(self):
+        with self._lock:
+            return sum(1 for future in self._futures.values() if not future.done())
+
+    def submit(self, fileobj, filename, model_name, model_version):
+        """Store an upload and queue it; returns the job's status."""
+        ext = os.path.splitext(filename)[1].lower()
+        if ext not in FORMATS:
+            raise ValueError("Must be an Excel or CSV file")
+        self.purge_expired()
+        with self._lock:
+            if sum(1 for future in self._futures.values() if not future.done()) >= self.max_pending:
+                raise JobQueueFull(f"{self.max_pending} jobs are already queued or running; try again later")
+            job_id = uuid.uuid4().hex
+            # Reserve the slot before the (possibly slow) upload copy
+            self._futures[job_id] = _Reserved()
+
+        try:
+            job_dir = os.path.join(self.storage_dir, job_id)
+            os.makedirs(job_dir)
+            input_file = 'input' + ext
+            with open(os.path.join(job_dir, input_file), 'wb') as f:
+                shutil.copyfileobj(fileobj, f, 1 << 20)
+            base = os.path.splitext(os.path.basename(filename))[0]
+            status = {
+                'id': job_id,
+                'filename': os.path.basename(filename),
+                'input_file': input_file,
+                'result_file': f"predictions_{base}{'.csv' if ext == '.csv' else '.xlsx'}",
+                'status': 'queued',
+                'model_name': model_name,
+                'model_version': model_version,
+                'rows_total': None,
+                'rows_done': 0,
+                'error': None,
+                'submitted_at': time.time(),
+                'started_at': None,
+                'updated_at': None,
+                'finished_at': None,
+            }
+            _write_json(os.path.join(job_dir, 'status.json'), status)
+            executor = self._pool()
+            try:
+                future = executor.submit(run_job, job_dir, self.chunk_rows)
+            except BrokenProcessPool:
+                # A worker died since the pool was last used and nothing noticed yet
+                self._discard_pool(executor)
+                executor = self._pool()
+                future = executor.submit(run_job, job_dir, self.chunk_rows)
+        except BaseException:
+            with self._lock:
+                self._futures.pop(job_id, None)
+            raise
+        with self._lock:
+            self._futures[job_id] = future
+        future.add_done_callback(lambda f, job_dir=job_dir, executor=executor: self._finished(job_dir, f, executor))
+        return self.describe(status)
+
+    def _finished(self, job_dir, future, executor):
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            # Every job in the pool fails with it; later jobs get a new pool
+            self._discard_pool(executor)
+        # A crashed or cancelled worker cannot record its own outcome
+        status_path = os.path.join(job_dir, 'status.json')
+        status = _read_json(status_path)
+        if status is None or status['status'] in FINISHED:
+            return
+        if future.cancelled():
+            status.update(status='cancelled', finished_at=time.time())
+        else:
+            error = future.exception()
+            if isinstance(error, BrokenProcessPool):
+                error = "the worker process died (killed or out of memory)"
+            status.update(status='failed', error=f"Worker failed: {error}", finished_at=time.time())
+        _write_json(status_path, status)
+
+    def describe(self, status):
+        """Public view of a status record, with progress and throughput."""
+        now = time.time()
+        started = status.get('started_at')
+        end = status.get('finished_at') or now
+        elapsed = end - started if started else None
+        rows_done = status.get('rows_done') or 0
+        rows_total = status.get('rows_total')
+        rate = rows_done / elapsed if elapsed else None
+        remaining = None
+        if status['status'] == 'running' and rate and rows_total:
+            remaining = max(rows_total - rows_done, 0) / rate
+        return {
+            'id': status['id'],
+            'status': status['status'],
+            'filename': status['filename'],
+            'model_version': status['model_version'],
+            'rows_done': rows_done,
+            'rows_total': rows_total,
+            'progress': min(rows_done / rows_total, 1.0) if rows_total else None,
+            'rows_per_s': rate,
+            'elapsed_seconds': elapsed,
+            'eta_seconds': remaining,
+            'queued_seconds': (started or now) - status['submitted_at'],
+            'error': status.get('error'),
+            'submitted_at': status['submitted_at'],
+            'finished_at': status.get('finished_at'),
+        }
+
+    def status(self, job_id):
+        job_dir = self._job_dir(job_id)
+        status = _read_json(os.path.join(job_dir, 'status.json')) if job_dir else None
+        return self.describe(status) if status else None
+
+    def list(self):
+        self.purge_expired()
+        if not os.path.isdir(self.storage_dir):
+            return []
+        jobs = [self.status(name) for name in os.listdir(self.storage_dir)]
+        return sorted((job for job in jobs if job), key=lambda job: job['submitted_at'], reverse=True)
+
+    def result(self, job_id):
+        """(path, download name) of a finished job's result; raises KeyError / ValueError."""
+        job_dir = self._job_dir(job_id)
+        status = _read_json(os.path.join(job_dir, 'status.json')) if job_dir else None
+        if status is None:
+            raise KeyError(job_id)
+        if status['status'] != 'done':
+            raise ValueError(f"Job {job_id} is {status['status']}")
+        return os.path.join(job_dir, status['result_file']), status['result_file']
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job, or delete a finished one with its files."""
+        job_dir = self._job_dir(job_id)
+        status = _read_json(os.path.join(job_dir, 'status.json')) if job_dir else None
+        if status is None:
+            raise KeyError(job_id)
+        if status['status'] in FINISHED:
+            shutil.rmtree(job_dir, ignore_errors=True)
+            with self._lock:
+                self._futures.pop(job_id, None)
+            return {'id': job_id, 'status': 'deleted'}
+        # A running worker checks for this file between chunks
+        open(os.path.join(job_dir, 'cancel'), 'w').close()
+        with self._lock:
+            future = self._futures.get(job_id)
+        if future is not None and future.cancel():
+            status.update(status='cancelled', finished_at=time.time())
+            _write_json(os.path.join(job_dir, 'status.json'), status)
+        return self.status(job_id)
+
+    def purge_expired(self):
+        """Delete finished jobs older than `ttl` seconds."""
+        if not self.ttl or not os.path.isdir(self.storage_dir):
+            return
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.storage_dir):
+            job_dir = self._job_dir(name)
+            status = _read_json(os.path.join(job_dir, 'status.json')) if job_dir else None
+            if status and status['status'] in FINISHED and (status.get('finished_at') or 0) < cutoff:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                with self._lock:
+                    self._futures.pop(name, None)
+
+    def stats(self):
+        return {
+            'max_workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'pending': self.pending(),
+            'storage_dir': os.path.abspath(self.storage_dir),
+        }
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+class _Reserved:
+    """Placeholder future holding a pending slot while an upload is copied."""
+
+    def done(self):
+        return False
+
+    def cancel(self):
+        return False
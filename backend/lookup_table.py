@@ -0,0 +1,247 @@
+"""
+Precomputed response surface for interactive /predict calls.
+
+An offline step evaluates the served model on a dense regular grid over the
+DOE feature domain (doe.DEFAULT_BOUNDS) and stores it as .npy files that are
+memory-mapped at load time:
+
+- {name}_lookup.npy: model predictions at every grid node, one axis per
+  varying feature.
+- {name}_lookup_error.npy: per-cell interpolation error, measured as
+  |model - interpolation| at the centre of each cell (where multilinear
+  interpolation is least accurate).
+- {name}_lookup.json: axes, constant features, the model version the grid
+  was built from and an error report on random LHS points of the feasible
+  domain.
+
+At serving time a point is answered by multilinear interpolation between the
+2^k corners of its cell. It falls back to the model (None is returned) when
+the point lies outside the grid, a constant feature differs from the grid's
+value, or the cell's measured error exceeds `max_error`. A table built from
+another model version is never used.
+
+Run from the backend directory to build a table for the active model:
+    python lookup_table.py --levels 17 --max-error 0.5
+"""
+import os
+import json
+import time
+import threading
+import argparse
+import bisect
+import itertools
+
+import numpy as np
+
+
+class LookupTable:
+    def __init__(self, meta, grid, cell_error, max_error=None):
+        self.meta = meta
+        self.version = meta['model_version']
+        self.varying = np.asarray(meta['varying'], dtype=np.intp)
+        self.constant = np.asarray(meta['constant'], dtype=np.intp)
+        self.constant_values = np.asarray(meta['constant_values'], dtype=np.float64)
+        self.axes = [np.asarray(axis, dtype=np.float64) for axis in meta['axes']]
+        self.grid = grid
+        self.cell_error = cell_error
+        self.max_error = max_error
+        self._corners = list(itertools.product((0, 1), repeat=len(self.axes)))
+        # Plain lists for the single-row path, where NumPy call overhead dominates
+        self._axis_lists = [axis.tolist() for axis in self.axes]
+        self._varying_list = self.varying.tolist()
+        self._constants = list(zip(self.constant.tolist(), self.constant_values.tolist()))
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.outside = 0
+        self.over_error = 0
+
+    @classmethod
+    def load(cls, meta_path, max_error=None):
+        """Open a table from its JSON metadata; the arrays stay memory-mapped."""
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        base = os.path.dirname(meta_path)
+        grid = np.load(os.path.join(base, meta['grid_file']), mmap_mode='r')
+        cell_error = np.load(os.path.join(base, meta['error_file']), mmap_mode='r') if meta.get('error_file') else None
+        return cls(meta, grid, cell_error, max_error)
+
+    def interpolate(self, X):
+        """
+        Return (values, inside, within_bound) for an (m, 8) array: the
+        multilinear interpolation, whether each row lies on the grid, and
+        whether its cell's measured error is within max_error (always True
+        without a bound). Values outside the grid are extrapolated from the
+        nearest cell and must not be used.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        inside = np.all(np.isclose(X[:, self.constant], self.constant_values, rtol=1e-9, atol=1e-9), axis=1)
+
+        cells = []
+        fractions = []
+        for axis, column in zip(self.axes, self.varying):
+            x = X[:, column]
+            inside &= (x >= axis[0]) & (x <= axis[-1])
+            cell = np.clip(np.searchsorted(axis, x, side='right') - 1, 0, len(axis) - 2)
+            cells.append(cell)
+            fractions.append(np.clip((x - axis[cell]) / (axis[cell + 1] - axis[cell]), 0.0, 1.0))
+
+        values = np.zeros(len(X))
+        for corner in self._corners:
+            weight = np.ones(len(X))
+            for offset, t in zip(corner, fractions):
+                weight *= t if offset else 1.0 - t
+            values += weight * self.grid[tuple(cell + offset for cell, offset in zip(cells, corner))]
+
+        within_bound = np.ones(len(X), dtype=bool)
+        if self.max_error is not None and self.cell_error is not None:
+            within_bound = self.cell_error[tuple(cells)] <= self.max_error
+        return values, inside, within_bound
+
+    def lookup(self, features):
+        """Interpolated value for one row of features, or None to use the model."""
+        outside = any(abs(features[column] - value) > 1e-9 * max(1.0, abs(value)) for column, value in self._constants)
+        cells = []
+        fractions = []
+        for axis, column in zip(self._axis_lists, self._varying_list):
+            x = features[column]
+            if outside or not axis[0] <= x <= axis[-1]:
+                outside = True
+                break
+            cell = min(bisect.bisect_right(axis, x) - 1, len(axis) - 2)
+            cells.append(cell)
+            fractions.append((x - axis[cell]) / (axis[cell + 1] - axis[cell]))
+
+        over_error = (not outside and self.max_error is not None and self.cell_error is not None
+                      and self.cell_error[tuple(cells)] > self.max_error)
+        with self._lock:
+            if outside:
+                self.outside += 1
+                return None
+            if over_error:
+                self.over_error += 1
+                return None
+            self.hits += 1
+
+        # Read the cell's 2^k corners in one slice, then interpolate one axis at a time
+        block = np.array(self.grid[tuple(slice(cell, cell + 2) for cell in cells)])
+        for t in fractions:
+            block = block[0] + t * (block[1] - block[0])
+        return float(block)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.outside + self.over_error
+            return {
+                'model_version': self.version,
+                'shape': list(self.grid.shape),
+                'max_error': self.max_error,
+                'hits': self.hits,
+                'fallback_outside_grid': self.outside,
+                'fallback_error_bound': self.over_error,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'report': self.meta.get('report', {}),
+            }
+
+
+def error_report(predict_fn, table, n=20000, seed=0):
+    """Interpolation error against the model on random LHS points of the feasible domain."""
+    from doe import DOE_FEATURES, design_chunks
+    bounds = dict(zip(DOE_FEATURES, zip(table.meta['lower'], table.meta['upper'])))
+    X = np.concatenate(list(design_chunks('lhs', n, bounds=bounds, seed=seed)))
+    expected = np.asarray(predict_fn(X), dtype=np.float64)
+    values = table.interpolate(X)[0]
+    err = np.abs(values - expected)
+    rel = err / np.maximum(np.abs(expected), 1e-9)
+    return {
+        'points': int(n),
+        'max_abs_error_kN': float(err.max()),
+        'mean_abs_error_kN': float(err.mean()),
+        'p99_abs_error_kN': float(np.percentile(err, 99)),
+        'max_rel_error': float(rel.max()),
+        'mean_rel_error': float(rel.mean()),
+    }
+
+
+def build_lookup_table(predict_fn, out_dir, name, version, levels=17, bounds=None,
+                       chunk_rows=50000, validation_points=20000):
+    """Evaluate `predict_fn` on the grid and cell centres, write the table and return its metadata path."""
+    # doe (scipy.stats.qmc) is only needed to build tables, not to serve them
+    from doe import DOE_FEATURES, design_chunks, resolve_bounds
+    lower, upper = resolve_bounds(bounds)
+    varying = np.flatnonzero(upper > lower)
+    constant = np.flatnonzero(upper == lower)
+    axes = [np.linspace(lower[i], upper[i], levels) for i in varying]
+    bounds = dict(zip(DOE_FEATURES, zip(lower, upper)))
+
+    meta = {
+        'model_name': name,
+        'model_version': version,
+        'features': DOE_FEATURES,
+        'lower': lower.tolist(),
+        'upper': upper.tolist(),
+        'varying': varying.tolist(),
+        'constant': constant.tolist(),
+        'constant_values': lower[constant].tolist(),
+        'axes': [axis.tolist() for axis in axes],
+        'grid_file': f'{name}_lookup.npy',
+        'error_file': f'{name}_lookup_error.npy',
+    }
+
+    def fill(path, levels_by_feature, shape, values_fn):
+        # Factorial chunks come out in C order, so they map onto the flat array
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=shape)
+        flat = out.reshape(-1)
+        start = 0
+        for X in design_chunks('factorial', bounds=bounds, constraints=[], chunk_rows=chunk_rows,
+                               levels=levels_by_feature):
+            flat[start:start + len(X)] = values_fn(X)
+            start += len(X)
+        out.flush()
+        del out
+
+    # Grid nodes, written straight to the memory-mapped file
+    grid_path = os.path.join(out_dir, meta['grid_file'])
+    fill(grid_path, {DOE_FEATURES[i]: axis for i, axis in zip(varying, axes)},
+         tuple(len(axis) for axis in axes), predict_fn)
+
+    # Cell centres: model vs interpolation, the per-cell error bound
+    table = LookupTable(meta, np.load(grid_path, mmap_mode='r'), None)
+    centres = [(axis[:-1] + axis[1:]) / 2 for axis in axes]
+    fill(os.path.join(out_dir, meta['error_file']), {DOE_FEATURES[i]: c for i, c in zip(varying, centres)},
+         tuple(len(c) for c in centres),
+         lambda X: np.abs(np.asarray(predict_fn(X), dtype=np.float64) - table.interpolate(X)[0]))
+
+    meta['report'] = error_report(predict_fn, table, n=validation_points)
+    meta_path = os.path.join(out_dir, f'{name}_lookup.json')
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute a lookup table for the active model.")
+    parser.add_argument('--levels', type=int, default=17, help="Grid nodes per varying feature")
+    parser.add_argument('--max-error', type=float, default=None,
+                        help="Report the share of feasible points whose cell error is within this bound (kN)")
+    parser.add_argument('--chunk-rows', type=int, default=50000)
+    args = parser.parse_args()
+
+    # Load the active model exactly as the server would (MODELS_DIR, PREDICTOR, ...)
+    from app import MODELS_DIR, registry, startup
+    from doe import design_chunks
+    startup()
+    bundle = registry.active
+
+    start = time.perf_counter()
+    meta_path = build_lookup_table(bundle.predict, MODELS_DIR, bundle.name, bundle.version,
+                                   levels=args.levels, chunk_rows=args.chunk_rows)
+    print(f"Built {meta_path} for {bundle.version} in {time.perf_counter() - start:.2f}s")
+
+    table = LookupTable.load(meta_path, max_error=args.max_error)
+    for key, value in table.meta['report'].items():
+        print(f"  {key}: {value:.6g}")
+    if args.max_error is not None:
+        X = np.concatenate(list(design_chunks('lhs', 20000, seed=1)))
+        _, inside, within_bound = table.interpolate(X)
+        usable = inside & within_bound
+        print(f"  served from the table at max_error={args.max_error} kN: {usable.mean():.1%} of feasible points")
@@ -0,0 +1,238 @@
+"""
+Request metrics in the Prometheus text exposition format (version 0.0.4).
+
+A small, dependency-free subset of what prometheus_client provides:
+
+- Counter and Histogram families with fixed label names; each observation is
+  a dict lookup, a bisect over the bucket bounds and a few additions under a
+  lock (a couple of microseconds).
+- Gauges and counters read at scrape time from callbacks, for values other
+  objects already track (cache and lookup-table hit counts, loaded models).
+- `stage(endpoint, name)`, a context manager that times one step of a
+  handler (parse, scale, predict, serialize, ...) into a histogram.
+- MetricsMiddleware, an ASGI middleware that counts requests and times them
+  per route template and status code, up to the last byte of a streamed
+  response.
+
+Every process keeps its own numbers, so with `uvicorn --workers N` each
+scrape sees one worker; run one worker per container (or scrape each worker)
+to get totals.
+"""
+import bisect
+import threading
+import time
+
+# Seconds, from a cached single-row /predict to a large spreadsheet
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Rows per prediction call
+ROW_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        # labels -> [count per bucket (last one is +Inf), sum]
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.bounds) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def snapshot(self, *labels):
+        """(cumulative bucket counts, count, sum) for one label set."""
+        with self._lock:
+            counts, total = self._values.get(labels, [[0] * (len(self.bounds) + 1), 0.0])
+            counts = list(counts)
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, running, total
+
+    def samples(self):
+        with self._lock:
+            keys = sorted(self._values)
+        for labels in keys:
+            cumulative, count, total = self.snapshot(*labels)
+            for bound, running in zip(self.bounds + (float('inf'),), cumulative):
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", _number(bound))])} {running}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {count}'
+
+
+class CallbackMetric:
+    """
+    Gauge or counter read at scrape time from `fn()`: a number, a list of
+    (label values, number) when there are label names, or None to skip it.
+    """
+
+    def __init__(self, name, documentation, fn, labelnames=(), kind='gauge'):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self.kind = kind
+
+    def samples(self):
+        value = self.fn()
+        if value is None:
+            return
+        rows = value if self.labelnames else [((), value)]
+        for labels, number in rows:
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(number)}'
+
+
+class _Stage:
+    __slots__ = ('metrics', 'endpoint', 'name', 'start')
+
+    def __init__(self, metrics, endpoint, name):
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.metrics.enabled:
+            self.metrics.stage_seconds.observe(time.perf_counter() - self.start, self.endpoint, self.name)
+        return False
+
+
+class Metrics:
+    """All metric families of one process, rendered together by /metrics."""
+
+    def __init__(self, namespace='shear', enabled=True):
+        self.namespace = namespace
+        self.enabled = enabled
+        self._families = []
+        self.requests = self.counter('http_requests_total', "HTTP requests by route, method and status.",
+                                     ('route', 'method', 'status'))
+        self.request_seconds = self.histogram('http_request_duration_seconds',
+                                              "HTTP request latency by route, up to the last response byte.",
+                                              ('route', 'method'))
+        self.stage_seconds = self.histogram('stage_duration_seconds', "Time spent in each stage of a handler.",
+                                            ('endpoint', 'stage'))
+        self.rows = self.counter('predicted_rows_total', "Rows predicted, by endpoint and model version.",
+                                 ('endpoint', 'model_version'))
+        self.batch_rows = self.histogram('batch_rows', "Rows per prediction call, by endpoint.",
+                                         ('endpoint',), buckets=ROW_BUCKETS)
+
+    def _add(self, family):
+        family.name = f'{self.namespace}_{family.name}'
+        self._families.append(family)
+        return family
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, fn, labelnames=(), kind='gauge'):
+        return self._add(CallbackMetric(name, documentation, fn, labelnames, kind))
+
+    def stage(self, endpoint, name):
+        """Context manager timing one stage of `endpoint` (a plain class: cheaper than @contextmanager)."""
+        return _Stage(self, endpoint, name)
+
+    def observe_rows(self, endpoint, model_version, n):
+        if self.enabled:
+            self.rows.inc(endpoint, model_version, amount=n)
+            self.batch_rows.observe(n, endpoint)
+
+    def render(self):
+        lines = []
+        for family in self._families:
+            try:
+                samples = list(family.samples())
+            except Exception:
+                # A broken callback must not take the whole scrape down
+                continue
+            lines.append(f'# HELP {family.name} {family.documentation}')
+            lines.append(f'# TYPE {family.name} {family.kind}')
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request counts and latency per route template."""
+
+    def __init__(self, app, metrics, skip=('/metrics',)):
+        self.app = app
+        self.metrics = metrics
+        self.skip = set(skip)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or not self.metrics.enabled or scope['path'] in self.skip:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # The router stores the matched route in the scope; unmatched paths
+            # share one label so scanners cannot blow up the series count
+            route = scope.get('route')
+            template = getattr(route, 'path', None) or 'unmatched'
+            method = scope.get('method', '')
+            self.metrics.request_seconds.observe(time.perf_counter() - start, template, method)
+            self.metrics.requests.inc(template, method, str(status[0]))
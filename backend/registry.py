@@ -0,0 +1,282 @@
+"""
+Versioned model bundles and an atomically swappable registry.
+
+A bundle keeps everything needed to serve one model together: the scaler,
+the model (or its compiled form), the feature order and the training
+metrics. The registry can hold several bundles at once and points at one
+"active" bundle. Loading happens outside the request path; activation is a
+single reference assignment, so request handlers that read
+``registry.active`` never wait on a load.
+
+With ``mmap=True`` the NumPy arrays inside the model pickles (SVR support
+vectors, MLP weights, KNN training data) and inside compiled ``.joblib``
+predictors are memory-mapped read-only instead of copied, so worker
+processes share one page-cache copy. sklearn trees copy their node arrays on
+unpickling; for tree models, export a compiled ``.joblib`` (compiled.py
+--format joblib) and serve with use_compiled=True.
+
+A compiled bundle needs neither pickle to predict, so its scaler and model
+are only unpickled if something asks for them. Serving compiled predictors
+therefore never imports sklearn (and the scipy.stats and pandas it pulls
+in), which is most of the backend's cold start.
+"""
+import csv
+import json
+import os
+import threading
+import time
+
+import joblib
+
+from compiled import file_digest, load_compiled
+
+
+def read_metrics(metrics_path):
+    """Per-model rows of results/model_comparison_metrics.csv, keyed by model name."""
+    if not metrics_path or not os.path.exists(metrics_path):
+        return {}
+    with open(metrics_path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    metrics = {}
+    for row in rows:
+        name = row.pop('Model')
+        row.pop('Best Params', None)
+        metrics[name] = {key: float(value) for key, value in row.items() if value != ''}
+    return metrics
+
+
+class ModelBundle:
+    """One servable model version."""
+
+    def __init__(self, name, version, scaler, model, feature_order, metrics=None, compiled=None, source=None):
+        # scaler and model may be zero-argument loaders, called on first access
+        self.name = name
+        self.version = version
+        self._scaler = scaler
+        self._model = model
+        self.feature_order = feature_order
+        self.metrics = metrics or {}
+        self.compiled = compiled
+        self.source = source
+        self.loaded_at = time.time()
+
+    @property
+    def scaler(self):
+        if callable(self._scaler):
+            self._scaler = self._scaler()
+        return self._scaler
+
+    @property
+    def model(self):
+        if callable(self._model):
+            self._model = self._model()
+        return self._model
+
+    def predict(self, X):
+        if self.compiled is not None:
+            return self.compiled.predict(X)
+        return self.model.predict(self.scaler.transform(X))
+
+    def describe(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'compiled': self.compiled is not None,
+            'feature_order': self.feature_order,
+            'metrics': self.metrics,
+            'loaded_at': self.loaded_at,
+        }
+
+
+class ModelRegistry:
+    def __init__(self, models_dir, feature_order, metrics_path=None, use_compiled=False, mmap=False):
+        self.models_dir = models_dir
+        self.feature_order = list(feature_order)
+        self.metrics_path = metrics_path
+        self.use_compiled = use_compiled
+        self.mmap_mode = 'r' if mmap else None
+        self.bundles = {}
+        self.errors = {}
+        # Bundles built from the same scaler file share one scaler instance
+        self._scalers = {}
+        self._active = None
+        # Serializes loads and swaps; readers of `active` never take it
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._watcher = None
+        self._stop_watching = threading.Event()
+
+    @property
+    def active(self):
+        return self._active
+
+    def add_listener(self, callback):
+        """Register callback(old_bundle, new_bundle), called after every swap."""
+        self._listeners.append(callback)
+
+    def available(self):
+        """Model names that have a *_best.pkl on disk."""
+        if not os.path.isdir(self.models_dir):
+            return []
+        return sorted(f[:-len('_best.pkl')] for f in os.listdir(self.models_dir) if f.endswith('_best.pkl'))
+
+    def best_model_name(self):
+        with open(os.path.join(self.models_dir, 'best_model_info.json'), 'r') as f:
+            return json.load(f)['best_model_name']
+
+    def source_digest(self, name):
+        """Digest of the scaler and model pickles on disk; a bundle's version is f'{name}-{digest}'."""
+        return file_digest(os.path.join(self.models_dir, 'scaler.pkl'), os.path.join(self.models_dir, f'{name}_best.pkl'))
+
+    def _load_bundle(self, name):
+        scaler_path = os.path.join(self.models_dir, 'scaler.pkl')
+        model_path = os.path.join(self.models_dir, f'{name}_best.pkl')
+        scaler_digest = file_digest(scaler_path)
+        source_digest = self.source_digest(name)
+
+        def load_scaler():
+            scaler = self._scalers.get(scaler_digest)
+            if scaler is None:
+                scaler = self._scalers[scaler_digest] = joblib.load(scaler_path)
+            return scaler
+
+        def load_model():
+            return joblib.load(model_path, mmap_mode=self.mmap_mode)
+
+        compiled = compiled_path = None
+        if self.use_compiled:
+            # Prefer the memory-mappable .joblib export over the .npz one
+            for ext in ('joblib', 'npz'):
+                compiled_path = os.path.join(self.models_dir, f'{name}_compiled.{ext}')
+                if os.path.exists(compiled_path):
+                    compiled = load_compiled(compiled_path, mmap_mode=self.mmap_mode)
+                    break
+            else:
+                print(f"No compiled predictor for {name}, using scaler + model")
+            if compiled is not None and compiled.source_digest != source_digest:
+                # Exported from another scaler / model (or before exports recorded their source)
+                print(f"{compiled_path} was not exported from the current {name} pickles, "
+                      f"using scaler + model (re-run compiled.py {name})")
+                compiled = None
+
+        if compiled is None:
+            scaler, model = load_scaler(), load_model()
+            feature_order = list(getattr(scaler, 'feature_names_in_', self.feature_order))
+        else:
+            # Both pickles stay on disk until something needs them
+            scaler, model = load_scaler, load_model
+            feature_order = compiled.feature_names or self.feature_order
+        if feature_order != self.feature_order:
+            raise ValueError(f"{name}: scaler feature order {feature_order} does not match {self.feature_order}")
+
+        return ModelBundle(
+            name=name,
+            # The export is checked against the pickles above, so they identify it too
+            version=f'{name}-{source_digest}',
+            scaler=scaler,
+            model=model,
+            feature_order=feature_order,
+            metrics=read_metrics(self.metrics_path).get(name, {}),
+            compiled=compiled,
+            source=model_path,
+        )
+
+    def load(self, name, force=False):
+        """Load (or reload from disk) a bundle without activating it."""
+        if not force and name in self.bundles:
+            return self.bundles[name]
+        bundle = self._load_bundle(name)
+        with self._lock:
+            self.bundles[name] = bundle
+            self.errors.pop(name, None)
+            # A reload of the active model takes effect immediately
+            if self._active is not None and self._active.name == name:
+                self._swap(bundle)
+        print(f"Loaded model bundle {bundle.version}")
+        return bundle
+
+    def preload(self, names=None):
+        """Load several bundles up front; failures are recorded, not raised."""
+        for name in names or self.available():
+            try:
+                self.load(name)
+            except Exception as e:
+                self.errors[name] = str(e)
+                print(f"Could not load {name}: {e}")
+
+    def activate(self, name):
+        bundle = self.load(name)
+        with self._lock:
+            self._swap(bundle)
+        return bundle
+
+    def _swap(self, bundle):
+        old, self._active = self._active, bundle
+        if old is not bundle:
+            for callback in self._listeners:
+                callback(old, bundle)
+
+    def describe(self):
+        return {
+            'active': self._active.version if self._active else None,
+            'loaded': [bundle.describe() for bundle in self.bundles.values()],
+            'available': self.available(),
+            'errors': self.errors,
+        }
+
+    def refresh(self, name):
+        """Activate `name`, reloading it first if its scaler or pickle changed since it was loaded."""
+        bundle = self.bundles.get(name)
+        if bundle is None or bundle.version != f'{name}-{self.source_digest(name)}':
+            bundle = self.load(name, force=True)
+        with self._lock:
+            self._swap(bundle)
+        return bundle
+
+    def watch(self, interval):
+        """
+        Poll best_model_info.json, scaler.pkl and the active model's pickle
+        every `interval` seconds. A changed best model is activated, and a
+        bundle whose scaler or pickle changed is reloaded before it serves.
+        """
+        if self._watcher is not None:
+            return
+        info_path = os.path.join(self.models_dir, 'best_model_info.json')
+        scaler_path = os.path.join(self.models_dir, 'scaler.pkl')
+
+        def stat(path):
+            try:
+                st = os.stat(path)
+                return st.st_mtime_ns, st.st_size
+            except OSError:
+                return None
+
+        def signature():
+            active = self._active
+            return stat(info_path), stat(scaler_path), stat(active.source) if active else None
+
+        def poll(seen):
+            while not self._stop_watching.wait(interval):
+                current = signature()
+                if current == seen:
+                    continue
+                try:
+                    if current[0] != seen[0] or self._active is None:
+                        self.refresh(self.best_model_name())
+                    else:
+                        self.refresh(self._active.name)
+                    seen = signature()
+                except Exception as e:
+                    # Retried on the next poll (e.g. a pickle still being written)
+                    print(f"Model watcher: {e}")
+
+        self._stop_watching.clear()
+        # Taken before the thread starts, so a change made right after watch() returns is seen
+        self._watcher = threading.Thread(target=poll, args=(signature(),), name='model-watcher', daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        watcher, self._watcher = self._watcher, None
+        if watcher is not None:
+            self._stop_watching.set()
+            watcher.join()
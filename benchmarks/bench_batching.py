@@ -0,0 +1,89 @@
+"""
+Load benchmark for POST /predict: per-request path vs. request coalescing.
+
+Runs the FastAPI app in-process over an ASGI transport and fires a fixed
+number of concurrent clients at /predict, reporting throughput and latency
+percentiles for each configuration.
+
+Usage (from the repo root):
+    python benchmarks/bench_batching.py --clients 64 --requests 2000
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+SAMPLE = {
+    "dwh_d1": 28.8, "d1": 144.0, "tw": 1.5, "flange_width": 60.0,
+    "total_depth": 150.0, "fyw": 349.1066271, "E": 210000.0, "a_d": 1.0
+}
+
+
+async def run_load(app, clients, total_requests):
+    import httpx
+
+    latencies = []
+    per_client = total_requests // clients
+
+    async def client_loop(client):
+        for _ in range(per_client):
+            start = time.perf_counter()
+            response = await client.post('/predict', json=SAMPLE)
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        # Warm up lazy initialization in sklearn/numpy before timing
+        for _ in range(20):
+            await client.post('/predict', json=SAMPLE)
+        latencies.clear()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    return {
+        'requests': len(lat_ms),
+        'throughput_rps': len(lat_ms) / elapsed,
+        'p50_ms': float(np.percentile(lat_ms, 50)),
+        'p99_ms': float(np.percentile(lat_ms, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--window-ms', type=float, default=2.0)
+    parser.add_argument('--max-rows', type=int, default=256)
+    args = parser.parse_args()
+
+    # app.py resolves ../models relative to the working directory
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+    backend.startup()
+    from batching import PredictionBatcher
+
+    configs = [
+        ('per-request', None),
+        (f'batched ({args.window_ms:g} ms / {args.max_rows} rows)',
+         PredictionBatcher(backend.predict_rows, window_ms=args.window_ms, max_rows=args.max_rows)),
+    ]
+
+    print(f"{'mode':<32}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for label, batcher in configs:
+        backend.batcher = batcher
+        stats = asyncio.run(run_load(backend.app, args.clients, args.requests))
+        print(f"{label:<32}{stats['throughput_rps']:>10.0f}{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+End-to-end batch prediction: CSV upload vs. binary .npy payload.
+
+Each path is timed from the client's point of view, including encoding the
+request (to_csv / np.save) and decoding the response (read_csv / np.load).
+The app runs in-process over an ASGI transport, so network cost is excluded.
+
+Usage (from the repo root):
+    python benchmarks/bench_binary_batch.py --rows 100000 1000000
+"""
+import argparse
+import asyncio
+import io
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cleaned_data.csv')
+
+
+async def time_csv(client, df, stream):
+    start = time.perf_counter()
+    payload = df.to_csv(index=False).encode()
+    response = await client.post(
+        '/predict_batch', params={'stream': stream},
+        files={'file': ('sweep.csv', payload, 'text/csv')},
+    )
+    response.raise_for_status()
+    predictions = pd.read_csv(io.BytesIO(response.content))['Predicted_Shear_Capacity_kN'].to_numpy()
+    return time.perf_counter() - start, predictions
+
+
+async def time_npy(client, X):
+    start = time.perf_counter()
+    buf = io.BytesIO()
+    np.save(buf, X)
+    response = await client.post('/predict_batch_npy', content=buf.getvalue())
+    response.raise_for_status()
+    predictions = np.load(io.BytesIO(response.content))
+    return time.perf_counter() - start, predictions
+
+
+async def run(app, feature_columns, n_rows):
+    import httpx
+
+    base = pd.read_csv(DATA_PATH)[feature_columns]
+    df = base.sample(n_rows, replace=True, random_state=42).reset_index(drop=True)
+    X = df.to_numpy(dtype='<f8')
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+        t_npy, p_npy = await time_npy(client, X)
+        t_stream, p_stream = await time_csv(client, df, stream=True)
+        t_csv, p_csv = await time_csv(client, df, stream=False)
+
+    # All three paths must agree before their timings mean anything
+    assert np.allclose(p_npy, p_csv) and np.allclose(p_npy, p_stream)
+    return {'csv': t_csv, 'csv (stream)': t_stream, 'npy': t_npy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    import app as backend
+    backend.startup()
+
+    print(f"{'rows':>10}{'path':>16}{'seconds':>10}{'rows/s':>12}")
+    for n_rows in args.rows:
+        timings = asyncio.run(run(backend.app, backend.FEATURE_COLUMNS, n_rows))
+        for path, seconds in timings.items():
+            print(f"{n_rows:>10}{path:>16}{seconds:>10.2f}{n_rows / seconds:>12.0f}")
+        print(f"{'':>10}{'npy speedup':>16}{timings['csv'] / timings['npy']:>10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Backend cold start: import-time breakdown and time to first response.
+
+1. Import profile: `python -X importtime` of `import app; app.startup()` in a
+   fresh process, summed per top-level package (self time) and listed per
+   top-level import (cumulative time).
+2. Phases in a fresh process: import app, startup() (model load + warm-up),
+   then the first and second /predict through the ASGI app.
+3. End to end: spawn `uvicorn app:app`, poll /ready until it answers 200, then
+   send the first /predict. This is what an autoscaler waits for.
+
+Phases and end-to-end timings are measured for the default sklearn pipeline
+and for PREDICTOR=compiled, which never unpickles the scaler or the model and
+so never imports sklearn (nor the scipy.stats and pandas it pulls in).
+
+Usage (from the repo root):
+    python benchmarks/bench_cold_start.py --runs 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+SAMPLE = {
+    'dwh_d1': 100.0, 'd1': 200.0, 'tw': 2.0, 'flange_width': 80.0,
+    'total_depth': 210.0, 'fyw': 349.106627, 'E': 210000.0, 'a_d': 1.0,
+}
+
+PHASES_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import app
+t_import = time.perf_counter()
+app.startup()
+t_startup = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(app.app)
+t_client = time.perf_counter()
+client.post('/predict', json=%(sample)r).raise_for_status()
+t_first = time.perf_counter()
+client.post('/predict', json=%(sample)r).raise_for_status()
+t_second = time.perf_counter()
+print(json.dumps({
+    'import app': t_import - start,
+    'startup (load + warm-up)': t_startup - t_import,
+    'first /predict': t_first - t_client,
+    'second /predict': t_second - t_first,
+}))
+"""
+
+
+def predictor_env(predictor):
+    return dict(os.environ, PREDICTOR=predictor)
+
+
+def import_profile(top):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app; app.startup()'],
+                            cwd=BACKEND_DIR, capture_output=True, text=True)
+    per_package = defaultdict(int)
+    direct = []
+    total = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # One separator space, then two spaces per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        name = name.strip()
+        per_package[name.split('.')[0]] += int(self_us)
+        if name == 'app':
+            total = int(cumulative_us)
+        elif depth == 1:
+            direct.append((int(cumulative_us), name))
+
+    print(f"import app: {total / 1e6:.2f}s (package self times include startup())")
+    print(f"\n{'top-level package':<28}{'self time':>10}")
+    for name, us in sorted(per_package.items(), key=lambda item: -item[1])[:top]:
+        print(f"{name:<28}{us / 1e6:>9.3f}s")
+    print(f"\n{'top-level imports':<28}{'cumulative':>10}")
+    for us, name in sorted(direct, reverse=True)[:top]:
+        print(f"{name:<28}{us / 1e6:>9.3f}s")
+
+
+def phases(runs, predictor):
+    samples = defaultdict(list)
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, '-c', PHASES_SCRIPT % {'sample': SAMPLE}], env=predictor_env(predictor),
+                                cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+        for phase, seconds in json.loads(result.stdout.strip().splitlines()[-1]).items():
+            samples[phase].append(seconds)
+    print(f"\n{'%s (median of %d)' % (predictor, runs):<28}{'seconds':>10}")
+    for phase, values in samples.items():
+        print(f"{phase:<28}{statistics.median(values):>10.3f}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def end_to_end(runs, predictor):
+    to_ready, to_first = [], []
+    body = json.dumps(SAMPLE).encode()
+    for _ in range(runs):
+        port = free_port()
+        base = f'http://127.0.0.1:{port}'
+        start = time.perf_counter()
+        server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'app:app', '--port', str(port), '--log-level', 'warning'],
+                                  env=predictor_env(predictor), cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while True:
+                try:
+                    with urllib.request.urlopen(base + '/ready', timeout=1) as response:
+                        if response.status == 200:
+                            break
+                except (urllib.error.URLError, ConnectionError):
+                    if server.poll() is not None:
+                        raise RuntimeError("uvicorn exited during startup")
+                    time.sleep(0.01)
+            ready = time.perf_counter()
+            request = urllib.request.Request(base + '/predict', data=body, headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request, timeout=10) as response:
+                response.read()
+            first = time.perf_counter()
+        finally:
+            server.terminate()
+            server.wait()
+        to_ready.append(ready - start)
+        to_first.append(first - start)
+
+    print(f"\n{'uvicorn, %s (median of %d)' % (predictor, runs):<28}{'seconds':>10}")
+    print(f"{'spawn -> /ready 200':<28}{statistics.median(to_ready):>10.3f}")
+    print(f"{'spawn -> first /predict':<28}{statistics.median(to_first):>10.3f}")
+    print(f"{'first /predict after ready':<28}{statistics.median(to_first) - statistics.median(to_ready):>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=12)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+    for predictor in ('sklearn', 'compiled'):
+        phases(args.runs, predictor)
+        end_to_end(args.runs, predictor)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Incremental (out-of-core) training vs. the in-memory path: peak memory and
+accuracy parity (incremental_training.py).
+
+For every dataset and model (MLP, XGBoost, LightGBM) it trains twice, each
+time in a fresh spawned process so ru_maxrss is that run's peak:
+
+- in-memory: every training row concatenated into one array and fitted with
+  the usual sklearn-API estimator (for the MLP, scaled by StandardScaler.fit);
+- incremental: streamed from the shards in --chunk-rows chunks (two-pass
+  scaler, MLP partial_fit, XGBoost ExtMemQuantileDMatrix, LightGBM Sequence).
+
+Both use the same train/test split and parameters, and report test R2,
+seconds and peak RSS. On the generated shards the MLP runs --mlp-epochs
+epochs in both modes (no early stop), so the comparison is per epoch of
+data; on the small existing datasets it trains to convergence (max_iter 500).
+
+Datasets: the existing Streamlit_ML_App/synthetic_beam_dataset.csv and
+cleaned_data.csv, plus --rows generated beams written as Parquet shards by
+Streamlit_ML_App/dataset_generator.py (0 to skip).
+
+Linux/macOS only (ru_maxrss). Usage (from the repo root):
+    python benchmarks/bench_incremental_training.py --rows 4000000 --chunk-rows 200000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'Streamlit_ML_App'))
+
+BEAM_FEATURES = ['Depth_D_mm', 'Web_Thickness_tw_mm', 'Flange_B_mm', 'Length_L_mm',
+                 'Yield_Strength_fy_MPa', 'Youngs_Modulus_E_GPa', 'Poisson_Ratio', 'Opening_Ratio']
+BEAM_TARGET = 'FEA_Shear_Capacity_kN'
+
+PARAMS = {
+    'MLP': {'hidden_layer_sizes': (100,), 'alpha': 0.0001, 'random_state': 42},
+    'XGBoost': {'n_estimators': 100, 'learning_rate': 0.1, 'random_state': 42, 'verbosity': 0},
+    'LightGBM': {'n_estimators': 100, 'learning_rate': 0.1, 'random_state': 42, 'verbose': -1},
+}
+
+
+def run(path, features, target, model_name, mode, chunk_rows, mlp_epochs):
+    """One training run (in its own process); returns test R2, seconds and peak RSS in MB."""
+    import numpy as np
+    from sklearn.metrics import r2_score
+    import incremental_training as it
+
+    source = it.ShardSource(path, features, target, chunk_rows=chunk_rows)
+    params = dict(PARAMS[model_name])
+    if model_name == 'MLP' and mlp_epochs is None:
+        params.update(max_iter=500)
+    elif model_name == 'MLP':
+        # Fixed epochs: no convergence test in either mode
+        params.update(max_iter=mlp_epochs, tol=0.0, n_iter_no_change=mlp_epochs)
+    start = time.perf_counter()
+    if mode == 'in-memory':
+        parts = list(source.chunks('train'))
+        X = np.concatenate([X for X, _ in parts])
+        y = np.concatenate([y for _, y in parts])
+        del parts
+        if model_name == 'MLP':
+            from sklearn.neural_network import MLPRegressor
+            from sklearn.preprocessing import StandardScaler
+            scaler = StandardScaler().fit(X)
+            model = MLPRegressor(**params).fit(scaler.transform(X), y)
+        elif model_name == 'XGBoost':
+            from xgboost import XGBRegressor
+            scaler, model = None, XGBRegressor(**params).fit(X, y)
+        else:
+            from lightgbm import LGBMRegressor
+            scaler, model = None, LGBMRegressor(**params).fit(X, y)
+        del X, y
+    else:
+        if model_name == 'MLP':
+            scaler = it.fit_scaler(source)
+            model = it.train_mlp(source, scaler, params)
+        elif model_name == 'XGBoost':
+            scaler, model = None, it.train_xgboost(source, params)
+        else:
+            scaler, model = None, it.train_lightgbm(source, params)
+    seconds = time.perf_counter() - start
+
+    y_true, y_pred = [], []
+    for X, y in source.chunks('test'):
+        if len(X):
+            y_pred.append(model.predict(it.scale(scaler, X)))
+            y_true.append(y)
+    r2 = r2_score(np.concatenate(y_true), np.concatenate(y_pred))
+    return {'r2': r2, 'seconds': seconds, 'peak_mb': it.peak_rss_mb()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=2_000_000, help="Generated beams in Parquet shards (0 to skip)")
+    parser.add_argument('--shard-size', type=int, default=500_000)
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--mlp-epochs', type=int, default=3)
+    parser.add_argument('--models', nargs='+', default=list(PARAMS), choices=list(PARAMS))
+    args = parser.parse_args()
+
+    # (label, path, features (None: all but the target), target, MLP epochs (None: to convergence))
+    datasets = [
+        ('synthetic_beam_dataset.csv', os.path.join(ROOT, 'Streamlit_ML_App', 'synthetic_beam_dataset.csv'),
+         BEAM_FEATURES, BEAM_TARGET, None),
+        ('cleaned_data.csv', os.path.join(ROOT, 'cleaned_data.csv'), None, 'VU(FEA)', None),
+    ]
+    tmp_dir = None
+    if args.rows:
+        from dataset_generator import generate_sharded
+        tmp_dir = tempfile.mkdtemp(prefix='beam-shards-')
+        generate_sharded(args.rows, tmp_dir, shard_size=args.shard_size, chunk_rows=min(args.chunk_rows, args.shard_size))
+        datasets.append((f'{args.rows} rows (Parquet shards)', tmp_dir, BEAM_FEATURES, BEAM_TARGET, args.mlp_epochs))
+
+    ctx = mp.get_context('spawn')
+    try:
+        print(f"\nchunk rows {args.chunk_rows}, MLP {args.mlp_epochs} epochs on the generated shards")
+        print(f"{'dataset':<30}{'model':<10}{'mode':<13}{'test R2':>9}{'seconds':>9}{'peak MB':>9}")
+        for label, path, features, target, mlp_epochs in datasets:
+            if features is None:
+                import incremental_training
+                features = [c for c in incremental_training.shard_columns(path) if c != target]
+            for model_name in args.models:
+                for mode in ('in-memory', 'incremental'):
+                    # A fresh process per run: ru_maxrss only ever grows
+                    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                        result = pool.submit(run, path, features, target, model_name, mode,
+                                             args.chunk_rows, mlp_epochs).result()
+                    print(f"{label:<30}{model_name:<10}{mode:<13}{result['r2']:>9.4f}"
+                          f"{result['seconds']:>9.2f}{result['peak_mb']:>9.0f}")
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Overhead of the /metrics instrumentation (REQUEST_METRICS=1 vs 0).
+
+One process drives the ASGI app in-process (httpx over ASGITransport, no
+sockets) and alternates blocks of --block requests with app.metrics.enabled
+off and on, so both settings see the same process, heap and CPU state and
+the difference is the middleware plus the stage timers. Reported per
+request: median and mean of each setting over all its blocks.
+
+Usage (from the repo root):
+    python benchmarks/bench_metrics_overhead.py --blocks 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+
+SCRIPT = """
+import asyncio, json, statistics, time
+import httpx
+import app
+app.startup()
+SAMPLE = {'dwh_d1': 100.0, 'd1': 200.0, 'tw': 2.0, 'flange_width': 80.0,
+          'total_depth': 210.0, 'fyw': 349.106627, 'E': 210000.0, 'a_d': 1.0}
+
+async def main():
+    transport = httpx.ASGITransport(app=app.app)
+    times = {'off': [], 'on': []}
+    async with httpx.AsyncClient(transport=transport, base_url='http://bench') as client:
+        for _ in range(%(warmup)d):
+            await client.post('/predict', json=SAMPLE)
+        for block in range(2 * %(blocks)d):
+            setting = 'on' if block %% 2 else 'off'
+            app.metrics.enabled = setting == 'on'
+            for _ in range(%(block)d):
+                start = time.perf_counter()
+                response = await client.post('/predict', json=SAMPLE)
+                times[setting].append(time.perf_counter() - start)
+                response.raise_for_status()
+    print(json.dumps({setting: {'median': statistics.median(t), 'mean': statistics.fmean(t)}
+                      for setting, t in times.items()}))
+
+asyncio.run(main())
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--block', type=int, default=500)
+    parser.add_argument('--blocks', type=int, default=10, help="Blocks per setting")
+    parser.add_argument('--warmup', type=int, default=500)
+    args = parser.parse_args()
+
+    result = subprocess.run([sys.executable, '-c', SCRIPT % vars(args)],
+                            cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print(f"/predict, {args.blocks} x {args.block} requests per setting")
+    print(f"{'metrics':<10}{'median us':>12}{'mean us':>12}")
+    for setting in ('off', 'on'):
+        print(f"{setting:<10}{stats[setting]['median'] * 1e6:>12.1f}{stats[setting]['mean'] * 1e6:>12.1f}")
+    overhead = stats['on']['median'] - stats['off']['median']
+    print(f"overhead: {overhead * 1e6:+.1f} us per request ({overhead / stats['off']['median']:+.1%})")
+
+
+if __name__ == '__main__':
+    main()
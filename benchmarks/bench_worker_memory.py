@@ -0,0 +1,180 @@
+"""
+Resident memory per uvicorn-style worker: pickled models vs. memory-mapped
+artifacts (MODEL_MMAP=1 with PREDICTOR=compiled).
+
+Each mode starts --workers processes that, like `uvicorn --workers N`, each
+build their own ModelRegistry, preload every model and predict once. All
+workers stay alive until every one has read /proc/self/smaps_rollup, so
+shared pages are split between them:
+
+- RSS: pages resident in the worker, shared ones counted in full.
+- PSS: shared pages divided by the number of processes mapping them; the sum
+  over workers is the real footprint.
+- USS: pages private to the worker (what one more worker would add).
+
+A 'baseline' mode imports the same libraries without loading any model.
+
+The committed models are small, so --inflate-rows retrains RandomForest on
+that many jittered bootstrap rows of cleaned_data.csv in a temporary models
+directory (40000 rows give a forest of a few hundred MB), which is closer to a
+production forest.
+
+Linux only (reads /proc). Usage (from the repo root):
+    python benchmarks/bench_worker_memory.py --workers 8 --inflate-rows 40000
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BACKEND_DIR = os.path.join(ROOT, 'backend')
+DATA_PATH = os.path.join(ROOT, 'cleaned_data.csv')
+FEATURE_COLUMNS = [
+    'Depth of Web opening(dwh/d1)', 'd1', 'tw',
+    'flange width(mm)', 'total depth D (mm)', 'fyw', 'E', 'a/d'
+]
+MODES = {
+    'baseline': None,
+    'pickle': {'use_compiled': False, 'mmap': False},
+    'mmap': {'use_compiled': True, 'mmap': True},
+}
+
+
+def memory_kb():
+    """Rss, Pss and USS (private clean + dirty) in kB from smaps_rollup."""
+    fields = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'uss': fields['Private_Clean'] + fields['Private_Dirty'],
+    }
+
+
+def worker(models_dir, options, ready, release, results):
+    # Keep the registry's load messages out of the results table
+    sys.stdout = open(os.devnull, 'w')
+    sys.path.insert(0, BACKEND_DIR)
+    from registry import ModelRegistry
+
+    loaded = []
+    if options is not None:
+        registry = ModelRegistry(models_dir, FEATURE_COLUMNS, **options)
+        registry.preload()
+        X = np.full((1, len(FEATURE_COLUMNS)), 1.0)
+        for bundle in registry.bundles.values():
+            bundle.predict(X)
+        loaded = sorted(registry.bundles)
+
+    ready.wait()
+    results.put((os.getpid(), memory_kb(), loaded))
+    release.wait()
+
+
+def measure(models_dir, options, n_workers):
+    ctx = mp.get_context('spawn')
+    ready = ctx.Barrier(n_workers)
+    release = ctx.Event()
+    results = ctx.Queue()
+    procs = [ctx.Process(target=worker, args=(models_dir, options, ready, release, results)) for _ in range(n_workers)]
+    for proc in procs:
+        proc.start()
+    samples = [results.get() for _ in procs]
+    release.set()
+    for proc in procs:
+        proc.join()
+    return samples
+
+
+def copy_models(models_dir):
+    """Copy the model files to a temporary directory, so the real one is never written to."""
+    out_dir = tempfile.mkdtemp(prefix='bench_models_')
+    for name in os.listdir(models_dir):
+        if name.endswith(('.pkl', '.json', '.npz')):
+            shutil.copy(os.path.join(models_dir, name), out_dir)
+    return out_dir
+
+
+def inflate_models(out_dir, n_rows):
+    """Replace RandomForest in out_dir with one trained on n_rows jittered bootstrap rows."""
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
+
+    df = pd.read_csv(DATA_PATH)
+    X = df[FEATURE_COLUMNS].to_numpy()
+    y = df['VU(FEA)'].to_numpy()
+    rng = np.random.default_rng(0)
+    idx = rng.integers(0, len(X), n_rows)
+    X_big = X[idx] * rng.normal(1.0, 0.01, X[idx].shape)
+    y_big = y[idx] * rng.normal(1.0, 0.01, n_rows)
+
+    scaler = joblib.load(os.path.join(out_dir, 'scaler.pkl'))
+    forest = RandomForestRegressor(n_estimators=100, n_jobs=-1, random_state=42)
+    forest.fit(scaler.transform(pd.DataFrame(X_big, columns=FEATURE_COLUMNS)), y_big)
+    forest.n_jobs = None
+    joblib.dump(forest, os.path.join(out_dir, 'RandomForest_best.pkl'))
+
+
+def export_compiled(models_dir):
+    """Write a memory-mappable compiled .joblib for every model that compiles."""
+    import joblib
+    sys.path.insert(0, BACKEND_DIR)
+    from compiled import compile_predictor, file_digest, save_compiled
+
+    scaler = joblib.load(os.path.join(models_dir, 'scaler.pkl'))
+    for name in sorted(os.listdir(models_dir)):
+        if not name.endswith('_best.pkl'):
+            continue
+        try:
+            model = joblib.load(os.path.join(models_dir, name))
+            predictor = compile_predictor(scaler, model)
+        except Exception as e:
+            print(f"  {name}: not compiled ({e})")
+            continue
+        save_compiled(predictor, os.path.join(models_dir, name.replace('_best.pkl', '_compiled.joblib')),
+                      feature_names=getattr(scaler, 'feature_names_in_', None),
+                      source_digest=file_digest(os.path.join(models_dir, 'scaler.pkl'), os.path.join(models_dir, name)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--models-dir', default=os.path.join(ROOT, 'models'))
+    parser.add_argument('--inflate-rows', type=int, default=0,
+                        help="Retrain RandomForest on this many rows in a temporary models directory")
+    args = parser.parse_args()
+
+    models_dir = copy_models(args.models_dir)
+    if args.inflate_rows:
+        print(f"Training an inflated RandomForest on {args.inflate_rows} rows...")
+        inflate_models(models_dir, args.inflate_rows)
+    export_compiled(models_dir)
+
+    sizes = {f: os.path.getsize(os.path.join(models_dir, f)) for f in os.listdir(models_dir)}
+    print(f"Model files: {sum(sizes.values()) / 2**20:.1f} MB in {models_dir}")
+
+    print(f"\n{args.workers} workers per mode, MB per worker (mean)")
+    print(f"{'mode':<10}{'RSS':>10}{'PSS':>10}{'USS':>10}{'total PSS':>12}  models")
+    try:
+        for mode, options in MODES.items():
+            samples = measure(models_dir, options, args.workers)
+            mem = {key: np.mean([s[1][key] for s in samples]) / 1024 for key in ('rss', 'pss', 'uss')}
+            total_pss = sum(s[1]['pss'] for s in samples) / 1024
+            print(f"{mode:<10}{mem['rss']:>10.1f}{mem['pss']:>10.1f}{mem['uss']:>10.1f}{total_pss:>12.1f}  "
+                  f"{','.join(samples[0][2]) or '-'}")
+    finally:
+        shutil.rmtree(models_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
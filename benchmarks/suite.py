@@ -0,0 +1,332 @@
+"""
+Speed benchmark suite: inference latency and throughput, batch file I/O and
+training time, saved as JSON so runs can be compared.
+
+Groups (select with --only):
+- latency: single-row predict per model in models/, as /predict calls it
+  (a one-row list through scaler + model), plus the compiled predictor
+  where one has been exported.
+- throughput: rows/s of the best model vs. batch size.
+- batch_io: POST /predict_batch end to end (upload, parse, predict,
+  serialize) for CSV and Excel through the in-process ASGI app. Inputs are
+  jittered copies of cleaned_data.csv.
+- train: train_models.train_family wall time per model family (search, CV
+  and hold-out, no cache).
+
+Every benchmark records all its repeat values and their median; compare
+uses the medians. For times lower is better, for rows/s higher is better.
+
+Usage (from the repo root):
+    python benchmarks/suite.py run                          # -> results/benchmarks/<time>-<commit>.json
+    python benchmarks/suite.py run --only latency,throughput --out new.json
+    python benchmarks/suite.py compare old.json new.json --threshold 0.15
+
+compare flags a benchmark as a regression when its median got worse by more
+than the threshold and the two runs' value ranges do not overlap (so one
+noisy repeat is not enough), and then exits with status 1, so it can gate CI.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+
+import numpy as np
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+BACKEND_DIR = os.path.join(ROOT, 'backend')
+DATA_PATH = os.path.join(ROOT, 'cleaned_data.csv')
+TARGET_COL = 'VU(FEA)'
+GROUPS = ('latency', 'throughput', 'batch_io', 'train')
+
+
+def measure(fn, repeat=5, number=1, warmup=1):
+    """Seconds per call of fn() for each of `repeat` rounds of `number` calls."""
+    for _ in range(warmup):
+        fn()
+    values = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        values.append((time.perf_counter() - start) / number)
+    return values
+
+
+def record(results, name, values, unit, better='lower', **params):
+    results[name] = {
+        'unit': unit,
+        'better': better,
+        'median': statistics.median(values),
+        'min': min(values),
+        'max': max(values),
+        'values': values,
+        'params': params,
+    }
+    print(f"  {name:<48}{results[name]['median']:>14.6g} {unit}")
+
+
+def load_features():
+    import pandas as pd
+    return pd.read_csv(DATA_PATH).drop(columns=[TARGET_COL])
+
+
+def make_rows(df, n, seed=0):
+    """n rows resampled from df with 1% multiplicative jitter."""
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, len(df), n)
+    out = df.iloc[idx].reset_index(drop=True)
+    return out * rng.normal(1.0, 0.01, out.shape)
+
+
+def registries():
+    sys.path.insert(0, BACKEND_DIR)
+    from registry import ModelRegistry
+    feature_order = list(load_features().columns)
+    models_dir = os.path.join(ROOT, 'models')
+    return {
+        'sklearn': ModelRegistry(models_dir, feature_order),
+        'compiled': ModelRegistry(models_dir, feature_order, use_compiled=True),
+    }
+
+
+def bench_latency(results, args):
+    print("latency: single-row predict")
+    row = load_features().iloc[0].tolist()
+    regs = registries()
+    for name in regs['sklearn'].available():
+        for kind, registry in regs.items():
+            if kind == 'compiled' and not any(
+                    os.path.exists(os.path.join(registry.models_dir, f'{name}_compiled.{ext}')) for ext in ('joblib', 'npz')):
+                continue
+            try:
+                bundle = registry.load(name)
+            except Exception as e:
+                print(f"  {name} ({kind}): skipped, {e}")
+                continue
+            values = measure(lambda: bundle.predict([row]), repeat=args.repeat, number=args.latency_calls)
+            record(results, f'latency.predict_one[{name},{kind}]', values, 's', model=name, predictor=kind,
+                   version=bundle.version)
+
+
+def bench_throughput(results, args):
+    print("throughput: rows/s vs. batch size (best model)")
+    df = load_features()
+    regs = registries()
+    name = regs['sklearn'].best_model_name()
+    for kind, registry in regs.items():
+        try:
+            bundle = registry.load(name)
+        except Exception as e:
+            print(f"  {name} ({kind}): skipped, {e}")
+            continue
+        if kind == 'compiled' and bundle.compiled is None:
+            continue
+        for size in args.batch_sizes:
+            X = make_rows(df, size).to_numpy()
+            # Enough calls per round to take ~0.1s, at least one
+            per_call = measure(lambda: bundle.predict(X), repeat=1, number=1)[0]
+            number = max(1, int(0.1 / max(per_call, 1e-9)))
+            values = measure(lambda: bundle.predict(X), repeat=args.repeat, number=number, warmup=0)
+            record(results, f'throughput.rows_per_s[{name},{kind},batch={size}]', [size / v for v in values],
+                   'rows/s', better='higher', model=name, predictor=kind, batch_size=size, version=bundle.version)
+
+
+def bench_batch_io(results, args):
+    print("batch_io: POST /predict_batch end to end")
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ.setdefault('REQUEST_METRICS', '0')
+    cwd = os.getcwd()
+    # The app resolves ../models and ../results against the working directory
+    os.chdir(BACKEND_DIR)
+    try:
+        import app as backend
+        from fastapi.testclient import TestClient
+        backend.startup()
+        client = TestClient(backend.app)
+        df = load_features()
+        for fmt in ('csv', 'xlsx'):
+            for rows in args.rows:
+                if fmt == 'xlsx' and rows > args.excel_max_rows:
+                    print(f"  predict_batch.{fmt}[rows={rows}]: skipped (--excel-max-rows {args.excel_max_rows})")
+                    continue
+                data = make_rows(df, rows)
+                buffer = io.BytesIO()
+                if fmt == 'csv':
+                    data.to_csv(buffer, index=False)
+                else:
+                    data.to_excel(buffer, index=False, engine='openpyxl')
+                body = buffer.getvalue()
+
+                def post():
+                    response = client.post('/predict_batch', files={'file': (f'bench.{fmt}', body)})
+                    response.raise_for_status()
+                # Large files take seconds to minutes per call: fewer repeats
+                repeat = args.repeat if rows <= 100000 else 1
+                values = measure(post, repeat=repeat, number=1, warmup=0 if rows > 100000 else 1)
+                record(results, f'predict_batch.{fmt}[rows={rows}]', values, 's', format=fmt, rows=rows,
+                       upload_bytes=len(body))
+    finally:
+        os.chdir(cwd)
+
+
+def bench_train(results, args):
+    print("train: train_models.train_family per model family")
+    sys.path.insert(0, ROOT)
+    import pandas as pd
+    from sklearn.preprocessing import StandardScaler
+    import train_models
+
+    df = pd.read_csv(DATA_PATH)
+    X = StandardScaler().fit_transform(df.drop(columns=[TARGET_COL]))
+    y = df[TARGET_COL].to_numpy()
+    models = train_models.build_models()
+    for name, model in models.items():
+        if args.families and name not in args.families:
+            continue
+        values = []
+        stages = []
+        for _ in range(args.train_repeat):
+            start = time.perf_counter()
+            _, _, timings = train_models.train_family(name, model, train_models.param_grids[name], X, y,
+                                                      cache_dir=None, n_jobs=1, search=args.search)
+            values.append(time.perf_counter() - start)
+            stages.append(timings)
+        record(results, f'train.family[{name},{args.search}]', values, 's', family=name, search=args.search,
+               rows=len(df), stages=stages)
+
+
+BENCHMARKS = {
+    'latency': bench_latency,
+    'throughput': bench_throughput,
+    'batch_io': bench_batch_io,
+    'train': bench_train,
+}
+
+
+def environment():
+    def version(module):
+        try:
+            return __import__(module).__version__
+        except Exception:
+            return None
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip() or None
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=ROOT,
+                                    capture_output=True, text=True).stdout.strip())
+    except OSError:
+        commit, dirty = None, None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'dirty': dirty,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'versions': {m: version(m) for m in ('numpy', 'pandas', 'sklearn', 'xgboost', 'fastapi', 'openpyxl')},
+    }
+
+
+def run(args):
+    env = environment()
+    results = {}
+    for group in args.only:
+        start = time.perf_counter()
+        BENCHMARKS[group](results, args)
+        print(f"  [{group} done in {time.perf_counter() - start:.1f}s]")
+
+    out = args.out or os.path.join(ROOT, 'results', 'benchmarks', f"{time.strftime('%Y%m%d-%H%M%S')}-{env['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    config = {key: value for key, value in vars(args).items() if key not in ('func', 'out')}
+    with open(out, 'w') as f:
+        json.dump({'environment': env, 'config': config, 'results': results}, f, indent=2)
+    print(f"Saved {len(results)} results to {out}")
+
+
+def compare(args):
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    for label, run_data in (('baseline', baseline), ('current', current)):
+        env = run_data['environment']
+        print(f"{label}: {env['timestamp']} commit {env['commit']}{' (dirty)' if env['dirty'] else ''} "
+              f"on {env['machine']} x{env['cpu_count']}")
+    if baseline['environment']['platform'] != current['environment']['platform']:
+        print("warning: the runs come from different platforms")
+
+    regressions = []
+    print(f"\n{'benchmark':<52}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name in sorted(set(baseline['results']) & set(current['results'])):
+        old, new = baseline['results'][name], current['results'][name]
+        change = (new['median'] - old['median']) / old['median']
+        if old['better'] == 'lower':
+            worse = change > args.threshold and new['min'] > old['max']
+            better = change < -args.threshold and new['max'] < old['min']
+        else:
+            worse = change < -args.threshold and new['max'] < old['min']
+            better = change > args.threshold and new['min'] > old['max']
+        flag = '  REGRESSION' if worse else ('  improved' if better else '')
+        print(f"{name:<52}{old['median']:>12.4g}{new['median']:>12.4g}{change:>+9.1%}{flag}")
+        if worse:
+            regressions.append(name)
+    for name in sorted(set(baseline['results']) - set(current['results'])):
+        print(f"{name:<52}  missing from current run")
+    for name in sorted(set(current['results']) - set(baseline['results'])):
+        print(f"{name:<52}  new")
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+
+
+def int_list(text):
+    return [int(x) for x in text.split(',') if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = sub.add_parser('run', help="Run benchmarks and save a JSON result file")
+    run_parser.add_argument('--only', type=lambda s: [g for g in s.split(',') if g], default=list(GROUPS),
+                            help=f"Comma-separated groups: {','.join(GROUPS)}")
+    run_parser.add_argument('--out', default=None, help="Result file (default: results/benchmarks/<time>-<commit>.json)")
+    run_parser.add_argument('--repeat', type=int, default=5)
+    run_parser.add_argument('--latency-calls', type=int, default=200, help="Calls per latency round")
+    run_parser.add_argument('--batch-sizes', type=int_list, default=[1, 16, 256, 4096, 65536])
+    run_parser.add_argument('--rows', type=int_list, default=[1000, 100000, 1000000], help="/predict_batch file sizes")
+    run_parser.add_argument('--excel-max-rows', type=int, default=100000,
+                            help="Largest Excel file (openpyxl needs minutes for 1M rows)")
+    run_parser.add_argument('--families', type=lambda s: [f for f in s.split(',') if f], default=None,
+                            help="Model families for the train group (default: all)")
+    run_parser.add_argument('--search', choices=['random', 'halving'], default='random')
+    run_parser.add_argument('--train-repeat', type=int, default=1)
+    run_parser.set_defaults(func=run)
+
+    compare_parser = sub.add_parser('compare', help="Compare two result files and flag regressions")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help="Relative change of the median that counts as a regression")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        unknown = set(args.only) - set(GROUPS)
+        if unknown:
+            parser.error(f"Unknown groups {sorted(unknown)}; choose from {GROUPS}")
+    warnings.filterwarnings('ignore')
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
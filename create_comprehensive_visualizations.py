@@ -5,6 +5,7 @@ import seaborn as sns
 import joblib
 import json
 import os
+import data_access
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
 
 # Set style
@@ -25,9 +26,9 @@ def generate_all_visualizations():
     print("Generating comprehensive visualizations...")
     
     # Load data
-    df = pd.read_csv('e:/Input Day 2/cleaned_data.csv')
-    X = df.drop(columns=['VU(FEA)'])
-    y = df['VU(FEA)']
+    df = data_access.load_data()
+    X = df[data_access.FEATURES]
+    y = df[data_access.TARGET_COL]
     
     scaler = joblib.load('models/scaler.pkl')
     X_scaled = scaler.transform(X)
@@ -0,0 +1,164 @@
+"""
+Loading and cleaning of the raw sheet (Input csv.csv), shared by
+data_analysis.py, train_models.py, visualize_results.py,
+generate_predictions.py and create_comprehensive_visualizations.py.
+
+The sheet is parsed and cleaned once; the typed result is cached in a binary
+store next to the data and rebuilt only when the sheet's content changes:
+
+- every row whose feature columns are all numeric is kept (the target may be
+  missing, as generate_predictions.py predicts those rows too);
+- features, target and the design-method comparison columns are coerced to
+  float64 (non-numeric cells become NaN);
+- every row keeps its row id, its position in the sheet (0 = first row under
+  the header), so results of different scripts are joined on row ids
+  instead of relying on every script dropping the same rows.
+
+Layout of the cache directory:
+    manifest.json   source path and SHA-256, column groups, row counts
+    row_id.npy      int64 (rows,) sheet row ids
+    values.npy      float64 (rows, columns) features, target, comparison
+                    columns, in the manifest's column order
+
+Paths are configured with environment variables (defaults in brackets):
+    DATA_DIR        directory of the data files [this file's directory]
+    RAW_DATA        the raw sheet [DATA_DIR/Input csv.csv]
+    DATA_CACHE_DIR  the binary cache [DATA_DIR/.cache/data]
+
+Usage (rebuilds the cache and prints a summary):
+    python data_access.py --refresh
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.environ.get('DATA_DIR', os.path.dirname(os.path.abspath(__file__)))
+RAW_DATA_PATH = os.environ.get('RAW_DATA', os.path.join(DATA_DIR, 'Input csv.csv'))
+CACHE_DIR = os.environ.get('DATA_CACHE_DIR', os.path.join(DATA_DIR, '.cache', 'data'))
+# Outputs of the scripts, next to the data
+CLEAN_DATA_PATH = os.path.join(DATA_DIR, 'cleaned_data.csv')
+PREDICTIONS_PATH = os.path.join(DATA_DIR, 'final_predictions.csv')
+EDA_DIR = os.path.join(DATA_DIR, 'eda_output')
+
+# The sheet has two rows of column groups above the header
+HEADER_ROW = 2
+TARGET_COL = 'VU(FEA)'
+FEATURES = ['Depth of Web opening(dwh/d1)', 'd1', 'tw', 'flange width(mm)', 'total depth D (mm)',
+            'fyw', 'E', 'a/d']
+# Capacities by the design methods, compared against FEA and the ML models
+COMPARISON_COLS = ['Vnl(AS)FEA', 'VN PRO', 'Vnl with tension field', 'VnlWITHOUT TENSION FIELD',
+                   'Design Shear Resistance (VRd)']
+MANIFEST = 'manifest.json'
+# Bump when the cleaning changes, so existing caches are rebuilt
+CACHE_VERSION = 1
+
+
+def file_hash(path):
+    """SHA-256 of the file's content."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_sheet(raw_path=None):
+    """The raw sheet as read by pandas (untyped), indexed by row id."""
+    df = pd.read_csv(raw_path or RAW_DATA_PATH, header=HEADER_ROW)
+    df.index.name = 'row_id'
+    return df
+
+
+def clean_sheet(sheet):
+    """Typed features, target and comparison columns of the rows with numeric features, indexed by row id."""
+    missing = [col for col in FEATURES + [TARGET_COL] if col not in sheet.columns]
+    if missing:
+        raise ValueError(f"Missing columns in the sheet: {missing}")
+    columns = FEATURES + [TARGET_COL] + [col for col in COMPARISON_COLS if col in sheet.columns]
+    df = sheet[columns].apply(pd.to_numeric, errors='coerce').astype(np.float64)
+    return df[df[FEATURES].notna().all(axis=1)]
+
+
+def _write_cache(df, cache_dir, manifest):
+    os.makedirs(cache_dir, exist_ok=True)
+    arrays = {'row_id.npy': df.index.to_numpy(dtype=np.int64), 'values.npy': df.to_numpy(dtype=np.float64)}
+    for file_name, array in arrays.items():
+        tmp_path = os.path.join(cache_dir, f'.{file_name}.{os.getpid()}.tmp')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, os.path.join(cache_dir, file_name))
+    # The manifest goes last: a cache is only valid once it is in place
+    tmp_path = os.path.join(cache_dir, f'.{MANIFEST}.{os.getpid()}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, os.path.join(cache_dir, MANIFEST))
+
+
+def _read_cache(cache_dir, source_hash):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != CACHE_VERSION or manifest.get('source_hash') != source_hash:
+        return None
+    try:
+        row_id = np.load(os.path.join(cache_dir, 'row_id.npy'))
+        values = np.load(os.path.join(cache_dir, 'values.npy'))
+    except (OSError, ValueError):
+        return None
+    return pd.DataFrame(values, columns=manifest['columns'], index=pd.Index(row_id, name='row_id'))
+
+
+def load_data(require_target=True, raw_path=None, cache_dir=None, refresh=False):
+    """
+    Cleaned rows of the sheet (DataFrame indexed by row id with FEATURES,
+    TARGET_COL and the comparison columns present in the sheet), from the
+    binary cache when it matches the sheet's content. With
+    `require_target=False` rows without a numeric target are kept too.
+    """
+    raw_path = raw_path or RAW_DATA_PATH
+    cache_dir = cache_dir or CACHE_DIR
+    source_hash = file_hash(raw_path)
+    df = None if refresh else _read_cache(cache_dir, source_hash)
+    if df is None:
+        start = time.perf_counter()
+        sheet = read_sheet(raw_path)
+        df = clean_sheet(sheet)
+        _write_cache(df, cache_dir, {
+            'version': CACHE_VERSION,
+            'source': os.path.abspath(raw_path),
+            'source_hash': source_hash,
+            'columns': list(df.columns),
+            'sheet_rows': len(sheet),
+            'rows': len(df),
+            'rows_with_target': int(df[TARGET_COL].notna().sum()),
+            'created_at': time.time(),
+        })
+        print(f"Cleaned {len(sheet)} sheet rows into {len(df)} rows in {time.perf_counter() - start:.2f}s "
+              f"(cached in {cache_dir})")
+    if require_target:
+        df = df[df[TARGET_COL].notna()]
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the cleaned-data cache of the raw sheet.")
+    parser.add_argument('--data', default=RAW_DATA_PATH)
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--refresh', action='store_true', help="Rebuild even if the cache matches the sheet")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    df = load_data(require_target=False, raw_path=args.data, cache_dir=args.cache_dir, refresh=args.refresh)
+    print(f"{len(df)} rows ({df[TARGET_COL].notna().sum()} with {TARGET_COL}), columns: {list(df.columns)}")
+    print(f"Loaded in {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Successive-halving hyperparameter search shared by train_models.py and
+Streamlit_ML_App/train_models.py.
+
+Candidates start on a small budget and only the best third survive to the
+next round on three times the budget. The budget is n_estimators /
+iterations for forests and boosters, max_iter for the MLP and the number
+of training samples for everything else. XGBoost, LightGBM and CatBoost
+additionally stop adding trees once a held-out 10% of the training fold
+stops improving (their native early stopping).
+
+The estimator returned by halving_search is always the plain library model,
+so saved pickles do not depend on this module.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, RegressorMixin, clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import HalvingRandomSearchCV, train_test_split
+
+# Parameter used as the halving budget, by estimator class
+RESOURCE_PARAMS = {
+    'RandomForestRegressor': 'n_estimators',
+    'GradientBoostingRegressor': 'n_estimators',
+    'XGBRegressor': 'n_estimators',
+    'LGBMRegressor': 'n_estimators',
+    'CatBoostRegressor': 'iterations',
+    'MLPRegressor': 'max_iter',
+}
+
+EARLY_STOPPING_MODELS = {'XGBRegressor', 'LGBMRegressor', 'CatBoostRegressor'}
+
+
+class EarlyStoppingRegressor(RegressorMixin, BaseEstimator):
+    """Fit a gradient booster with its native early stopping on an internal validation split."""
+
+    def __init__(self, estimator, validation_fraction=0.1, early_stopping_rounds=20, random_state=42):
+        self.estimator = estimator
+        self.validation_fraction = validation_fraction
+        self.early_stopping_rounds = early_stopping_rounds
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X_train, X_val, y_train, y_val = train_test_split(
+            X, y, test_size=self.validation_fraction, random_state=self.random_state
+        )
+        model = clone(self.estimator)
+        kind = type(model).__name__
+        if kind == 'XGBRegressor':
+            model.set_params(early_stopping_rounds=self.early_stopping_rounds)
+            model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+            # Keep the fitted best_iteration but let clones refit without an eval_set
+            model.set_params(early_stopping_rounds=None)
+        elif kind == 'LGBMRegressor':
+            import lightgbm
+            model.fit(X_train, y_train, eval_set=[(X_val, y_val)],
+                      callbacks=[lightgbm.early_stopping(self.early_stopping_rounds, verbose=False)])
+        elif kind == 'CatBoostRegressor':
+            # No catboost_info/ training logs in the working directory
+            model.set_params(allow_writing_files=False)
+            model.fit(X_train, y_train, eval_set=(X_val, y_val),
+                      early_stopping_rounds=self.early_stopping_rounds, verbose=False)
+        else:
+            raise ValueError(f"No native early stopping for {kind}")
+        self.estimator_ = model
+        return self
+
+    def predict(self, X):
+        return self.estimator_.predict(X)
+
+
+def halving_search(model, param_grid, X, y, cv, scoring='r2', n_jobs=None, factor=3, random_state=42):
+    """
+    Successive-halving random search over `param_grid`.
+
+    Returns (best_params, best_estimator), with best_estimator refit on all of
+    X, y. If the grid lists values for the budget parameter, the largest one
+    is used as the maximum budget.
+    """
+    kind = type(model).__name__
+    grid = dict(param_grid)
+    resource = RESOURCE_PARAMS.get(kind)
+
+    if resource is not None:
+        budget = grid.pop(resource, None)
+        # CatBoost only reports parameters that were set explicitly, and 1000 is its default
+        max_resources = int(max(budget)) if budget else int(model.get_params().get(resource) or 1000)
+        # Start low enough that the last round (one candidate left) runs on the full budget
+        n_candidates = int(np.prod([len(values) for values in grid.values()])) if grid else 1
+        rounds = 1 + int(np.floor(np.log(max(n_candidates, 1)) / np.log(factor) + 1e-9))
+        min_resources = max(1, max_resources // factor ** (rounds - 1))
+        model = clone(model).set_params(**{resource: max_resources})
+    else:
+        resource, max_resources, min_resources = 'n_samples', 'auto', 'smallest'
+
+    prefix = ''
+    if kind in EARLY_STOPPING_MODELS:
+        model = EarlyStoppingRegressor(model, random_state=random_state)
+        prefix = 'estimator__'
+        grid = {prefix + key: values for key, values in grid.items()}
+        if resource != 'n_samples':
+            resource = prefix + resource
+
+    search = HalvingRandomSearchCV(
+        model, grid, resource=resource, max_resources=max_resources, min_resources=min_resources,
+        factor=factor, cv=cv, scoring=scoring, n_jobs=n_jobs, random_state=random_state
+    )
+    search.fit(X, y)
+
+    best_params = {key[len(prefix):] if key.startswith(prefix) else key: value
+                   for key, value in search.best_params_.items()}
+    best_model = search.best_estimator_
+    if prefix:
+        best_model = best_model.estimator_
+    return best_params, best_model
@@ -0,0 +1,319 @@
+"""
+Incremental (out-of-core) training from Parquet / Feather / CSV shards,
+shared by train_models.py and Streamlit_ML_App/train_models.py.
+
+At most one chunk of rows (`chunk_rows`) is read into memory at a time:
+
+- ShardSource streams (features, target) chunks from a directory of shards
+  (as written by Streamlit_ML_App/dataset_generator.py --out-dir), a glob or a
+  single file. Every chunk's rows are split into train and test by a
+  generator seeded with (seed, chunk index), so each pass sees the same split
+  without storing it.
+- fit_scaler fits a StandardScaler exactly in two passes (means, then squared
+  deviations from them), or in one pass with StandardScaler.partial_fit.
+- train_mlp runs MLPRegressor.partial_fit over the chunks once per epoch and
+  stops like MLPRegressor.fit does: after n_iter_no_change epochs without
+  the training loss improving by tol, or after max_iter epochs.
+- train_xgboost feeds the chunks through an xgboost.DataIter into an
+  ExtMemQuantileDMatrix, whose quantized pages are cached on disk.
+- train_lightgbm hands LightGBM a Sequence reading the chunks in order: it
+  samples rows for the bin boundaries and then pushes rows batch by batch,
+  keeping only the binned dataset (one byte per value) and the labels.
+- evaluate computes R2, MSE, MAE and MAPE over the test rows in one pass.
+
+XGBoost comes back as a plain XGBRegressor and LightGBM as a lightgbm.Booster
+(its predict takes the same inputs), so saved pickles do not depend on this
+module.
+"""
+import os
+import glob
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.neural_network import MLPRegressor
+from sklearn.preprocessing import StandardScaler
+
+SHARD_EXTENSIONS = ('.parquet', '.feather', '.arrow', '.csv')
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, or None where `resource` is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 1024 ** 2 if os.uname().sysname == 'Darwin' else peak / 1024
+
+
+def shard_paths(path):
+    """Shard files of a directory (skipping _manifest.json and other non-data files), a glob or one file."""
+    if os.path.isdir(path):
+        names = sorted(name for name in os.listdir(path)
+                       if name.endswith(SHARD_EXTENSIONS) and not name.startswith(('_', '.')))
+        paths = [os.path.join(path, name) for name in names]
+    else:
+        paths = sorted(glob.glob(path))
+    if not paths:
+        raise FileNotFoundError(f"No Parquet/Feather/CSV shards found at {path}")
+    return paths
+
+
+def shard_columns(path):
+    """Column names of the first shard at `path`, read from its schema or header."""
+    first = shard_paths(path)[0]
+    if first.endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(first).names)
+    if first.endswith(('.feather', '.arrow')):
+        import pyarrow as pa
+        with pa.memory_map(first) as source:
+            return list(pa.ipc.open_file(source).schema.names)
+    return list(pd.read_csv(first, nrows=0).columns)
+
+
+class ShardSource:
+    def __init__(self, path, features, target, chunk_rows=100_000, test_size=0.2, seed=42):
+        self.paths = shard_paths(path)
+        self.features = list(features)
+        self.target = target
+        self.chunk_rows = chunk_rows
+        self.test_size = test_size
+        self.seed = seed
+
+    def _frames(self, columns):
+        """DataFrames of `columns`, at most chunk_rows rows each, over all shards in order."""
+        for path in self.paths:
+            if path.endswith('.parquet'):
+                import pyarrow.parquet as pq
+                for batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunk_rows, columns=columns):
+                    yield batch.to_pandas()
+            elif path.endswith(('.feather', '.arrow')):
+                import pyarrow as pa
+                with pa.memory_map(path) as source:
+                    reader = pa.ipc.open_file(source)
+                    for i in range(reader.num_record_batches):
+                        batch = reader.get_batch(i).select(columns)
+                        for start in range(0, batch.num_rows, self.chunk_rows):
+                            yield batch.slice(start, self.chunk_rows).to_pandas()
+            else:
+                yield from pd.read_csv(path, usecols=columns, chunksize=self.chunk_rows)
+
+    def _test_mask(self, index, n):
+        return np.random.default_rng([self.seed, index]).random(n) < self.test_size
+
+    def chunks(self, part='train'):
+        """(X, y) float64 arrays per chunk: its 'train' or 'test' rows, or all of them (part=None)."""
+        for index, frame in enumerate(self._frames(self.features + [self.target])):
+            X = frame[self.features].to_numpy(dtype=np.float64)
+            y = frame[self.target].to_numpy(dtype=np.float64)
+            if part is not None:
+                keep = self._test_mask(index, len(frame))
+                if part == 'train':
+                    keep = ~keep
+                X, y = X[keep], y[keep]
+            yield X, y
+
+    def labels(self, part='train'):
+        """Target values of one part, reading only the target column."""
+        parts = []
+        for index, frame in enumerate(self._frames([self.target])):
+            keep = self._test_mask(index, len(frame))
+            if part == 'train':
+                keep = ~keep
+            parts.append(frame[self.target].to_numpy(dtype=np.float64)[keep])
+        return np.concatenate(parts) if parts else np.empty(0)
+
+
+def scale(scaler, X):
+    """StandardScaler.transform without the DataFrame / feature-name checks."""
+    return (X - scaler.mean_) / scaler.scale_ if scaler is not None else X
+
+
+def fit_scaler(source, method='two-pass'):
+    """StandardScaler fitted on the training rows; `method` is 'two-pass' (exact) or 'partial-fit' (one pass)."""
+    scaler = StandardScaler()
+    if method == 'partial-fit':
+        for X, _ in source.chunks('train'):
+            if len(X):
+                scaler.partial_fit(X)
+        if not hasattr(scaler, 'mean_'):
+            raise ValueError(f"No training rows in {source.paths}")
+    else:
+        n = 0
+        total = np.zeros(len(source.features))
+        for X, _ in source.chunks('train'):
+            n += len(X)
+            total += X.sum(axis=0)
+        if n == 0:
+            raise ValueError(f"No training rows in {source.paths}")
+        mean = total / n
+        squares = np.zeros(len(source.features))
+        for X, _ in source.chunks('train'):
+            squares += ((X - mean) ** 2).sum(axis=0)
+        var = squares / n
+        scaler.mean_ = mean
+        scaler.var_ = var
+        scale_ = np.sqrt(var)
+        # Constant features are left unscaled, as StandardScaler.fit does
+        scale_[scale_ == 0.0] = 1.0
+        scaler.scale_ = scale_
+        scaler.n_samples_seen_ = n
+        scaler.n_features_in_ = len(source.features)
+    # Same feature names a fit on the DataFrame would record
+    scaler.feature_names_in_ = np.asarray(source.features, dtype=object)
+    return scaler
+
+
+def train_mlp(source, scaler, params):
+    model = MLPRegressor(**params)
+    if model.max_iter < 1:
+        raise ValueError(f"max_iter must be at least 1, got {model.max_iter}")
+    best_loss = np.inf
+    no_improvement = 0
+    for epoch in range(model.max_iter):
+        loss_sum = 0.0
+        rows = 0
+        for X, y in source.chunks('train'):
+            if len(X) == 0:
+                continue
+            # partial_fit shuffles within the chunk when model.shuffle is set
+            model.partial_fit(scale(scaler, X), y)
+            loss_sum += model.loss_ * len(X)
+            rows += len(X)
+        if rows == 0:
+            raise ValueError(f"No training rows in {source.paths}")
+        epoch_loss = loss_sum / rows
+        if epoch_loss > best_loss - model.tol:
+            no_improvement += 1
+        else:
+            no_improvement = 0
+        best_loss = min(best_loss, epoch_loss)
+        if no_improvement > model.n_iter_no_change:
+            break
+    model.n_iter_ = epoch + 1
+    return model
+
+
+def train_xgboost(source, params, scaler=None, feature_names=None):
+    import xgboost as xgb
+
+    class ChunkIter(xgb.DataIter):
+        def __init__(self, cache_prefix):
+            self._chunks = None
+            super().__init__(cache_prefix=cache_prefix, on_host=False)
+
+        def next(self, input_data):
+            if self._chunks is None:
+                self._chunks = source.chunks('train')
+            for X, y in self._chunks:
+                if len(X):
+                    input_data(data=scale(scaler, X), label=y, feature_names=feature_names)
+                    return True
+            return False
+
+        def reset(self):
+            self._chunks = None
+
+    model = xgb.XGBRegressor(**params)
+    booster_params = {key: value for key, value in model.get_xgb_params().items() if value is not None}
+    cache_dir = tempfile.mkdtemp(prefix='xgb-extmem-')
+    try:
+        data = xgb.ExtMemQuantileDMatrix(ChunkIter(os.path.join(cache_dir, 'cache')),
+                                         max_bin=booster_params.get('max_bin', 256))
+        booster = xgb.train(booster_params, data, num_boost_round=model.n_estimators or 100)
+        del data
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    model.load_model(bytearray(booster.save_raw('json')))
+    return model
+
+
+def train_lightgbm(source, params, scaler=None, feature_names=None):
+    import lightgbm as lgb
+
+    class ChunkSequence(lgb.Sequence):
+        """Training rows as a forward-only cursor over the chunks (restarts when asked for an earlier row)."""
+        batch_size = source.chunk_rows
+
+        def __init__(self, rows):
+            self.rows = rows
+            self._chunks = None
+            self._start = self._end = 0
+            self._X = None
+
+        def __len__(self):
+            return self.rows
+
+        def _seek(self, row):
+            if self._chunks is None or row < self._start:
+                self._chunks = source.chunks('train')
+                self._start = self._end = 0
+            while row >= self._end:
+                X, _ = next(self._chunks)
+                self._X = scale(scaler, X)
+                self._start, self._end = self._end, self._end + len(X)
+
+        def __getitem__(self, idx):
+            if isinstance(idx, slice):
+                start, stop = idx.start or 0, min(idx.stop, self.rows)
+                parts = []
+                while start < stop:
+                    self._seek(start)
+                    part = self._X[start - self._start:min(stop, self._end) - self._start]
+                    parts.append(part)
+                    start += len(part)
+                return np.concatenate(parts) if len(parts) > 1 else parts[0]
+            self._seek(idx)
+            return self._X[idx - self._start]
+
+    y = source.labels('train')
+    model = lgb.LGBMRegressor(**params)
+    # lgb.train takes the sklearn parameter names as aliases
+    booster_params = {key: value for key, value in model.get_params().items()
+                      if value is not None and key not in ('importance_type', 'class_weight')}
+    booster_params['objective'] = booster_params.get('objective') or 'regression'
+    rounds = booster_params.pop('n_estimators')
+    data = lgb.Dataset(ChunkSequence(len(y)), label=y, feature_name=feature_names or 'auto',
+                       params={'verbose': booster_params.get('verbose', -1)})
+    return lgb.train(booster_params, data, num_boost_round=rounds)
+
+
+def evaluate(model, source, scaler=None, part='test'):
+    """R2, MSE, MAE and MAPE of `model.predict` on one part's rows, in one streaming pass."""
+    n = 0
+    mean = 0.0
+    m2 = 0.0  # sum of squared deviations of y from its mean
+    sse = sae = sape = 0.0
+    for X, y in source.chunks(part):
+        if len(X) == 0:
+            continue
+        pred = np.asarray(model.predict(scale(scaler, X)), dtype=np.float64).ravel()
+        err = y - pred
+        sse += err @ err
+        sae += np.abs(err).sum()
+        # Zero targets are divided by machine epsilon, as sklearn's mean_absolute_percentage_error does
+        sape += np.abs(err / np.maximum(np.abs(y), np.finfo(np.float64).eps)).sum()
+        # Merge the chunk's mean and squared deviations (Chan et al.)
+        chunk_mean = y.mean()
+        delta = chunk_mean - mean
+        total = n + len(y)
+        m2 += ((y - chunk_mean) ** 2).sum() + delta ** 2 * n * len(y) / total
+        mean += delta * len(y) / total
+        n = total
+    if n == 0:
+        raise ValueError(f"No {part} rows in {source.paths}")
+    if m2 == 0.0:
+        # Constant target: a perfect fit scores 1 and anything else 0, as with sklearn's r2_score
+        r2 = 1.0 if sse == 0.0 else 0.0
+    else:
+        r2 = 1 - sse / m2
+    return {
+        'r2': r2,
+        'mse': sse / n,
+        'mae': sae / n,
+        'mape': sape / n * 100,
+    }
@@ -0,0 +1,202 @@
+"""
+Offline SHAP values for the tree models, shared by train_models.py,
+Streamlit_ML_App/train_models.py, visualize_results.py and the Streamlit app.
+
+Training computes exact TreeSHAP values for every row of the dataset and
+every tree model once, one model per worker process, and the readers only
+memory-map the result instead of building an explainer on each run.
+
+- XGBoost, LightGBM and CatBoost use their native exact TreeSHAP
+  (pred_contribs / pred_contrib / ShapValues), so they need no shap install.
+- sklearn trees (DecisionTree, RandomForest, GradientBoosting) go through
+  shap.TreeExplainer and are skipped when shap is not installed.
+
+Layout of a store directory:
+    manifest.json   feature names, row count, data hash and, per model, its
+                    file, base value (expected prediction) and compute time
+    <model>.npy     float32 (rows, features) SHAP values in column-major
+                    order, so one feature's column is a contiguous read
+
+Rows are in dataset order, so row i of every file explains row i of the data.
+
+Usage (from the repo root, recomputes the store of the saved models):
+    python shap_store.py --data cleaned_data.csv
+"""
+import os
+import json
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+MANIFEST = 'manifest.json'
+NATIVE_SHAP_MODELS = ('XGBRegressor', 'LGBMRegressor', 'CatBoostRegressor')
+SKLEARN_TREE_MODELS = ('DecisionTreeRegressor', 'RandomForestRegressor', 'ExtraTreesRegressor',
+                       'GradientBoostingRegressor')
+
+
+def _model_kind(model):
+    kind = type(model).__name__
+    # Models trained from shards (incremental_training.py) are plain LightGBM Boosters
+    return 'LGBMBooster' if kind == 'Booster' and type(model).__module__.startswith('lightgbm') else kind
+
+
+def is_tree_model(model):
+    return _model_kind(model) in NATIVE_SHAP_MODELS + ('LGBMBooster',) + SKLEARN_TREE_MODELS
+
+
+def tree_shap(model, X):
+    """(values of shape (rows, features), base value) of a fitted tree model on `X`."""
+    kind = _model_kind(model)
+    if hasattr(model, 'feature_names_in_'):
+        # Fitted on a DataFrame: the boosters check the feature names
+        import pandas as pd
+        X = pd.DataFrame(np.asarray(X), columns=model.feature_names_in_)
+    if kind == 'XGBRegressor':
+        import xgboost as xgb
+        contribs = model.get_booster().predict(xgb.DMatrix(X), pred_contribs=True)
+    elif kind in ('LGBMRegressor', 'LGBMBooster'):
+        contribs = model.predict(X, pred_contrib=True)
+    elif kind == 'CatBoostRegressor':
+        from catboost import Pool
+        contribs = model.get_feature_importance(Pool(X), type='ShapValues')
+    elif kind in SKLEARN_TREE_MODELS:
+        import shap
+        explainer = shap.TreeExplainer(model)
+        values = np.asarray(explainer.shap_values(X), dtype=np.float64)
+        return values, float(np.ravel(explainer.expected_value)[0])
+    else:
+        raise TypeError(f"No TreeSHAP for {kind}")
+    # Native contributions carry the base value as their last column
+    contribs = np.asarray(contribs, dtype=np.float64)
+    return contribs[:, :-1], float(contribs[0, -1])
+
+
+def data_hash(X):
+    """Hash of a feature table's column names and values, which the store is keyed on.
+
+    Unlike joblib.hash of the DataFrame it does not depend on how pandas laid
+    out its blocks, so the same data read from cleaned_data.csv or from the
+    data_access.py cache hashes the same.
+    """
+    return data_hash_chunks(list(X.columns) if hasattr(X, 'columns') else None, [X])
+
+
+def data_hash_chunks(columns, chunks):
+    """data_hash of the rows of `chunks` stacked in order, holding one chunk in memory at a time."""
+    digest = hashlib.md5(json.dumps(columns).encode())
+    for chunk in chunks:
+        digest.update(np.ascontiguousarray(np.asarray(chunk, dtype=np.float64)))
+    return digest.hexdigest()
+
+
+def _explain(name, model, X, out_dir):
+    start = time.perf_counter()
+    values, base_value = tree_shap(model, X)
+    file_name = f'{name.replace(" ", "_")}.npy'
+    tmp_path = os.path.join(out_dir, f'.{file_name}.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.asfortranarray(values, dtype=np.float32))
+    os.replace(tmp_path, os.path.join(out_dir, file_name))
+    return {'file': file_name, 'base_value': base_value, 'seconds': time.perf_counter() - start}
+
+
+def compute_shap_store(models, X, out_dir, feature_names, data_hash=None, workers=None):
+    """
+    Compute and save SHAP values of every tree model in `models` ({name: fitted
+    model}) on all rows of `X` (the inputs the models were trained on), in
+    parallel across models. Returns the manifest.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    X = np.asarray(X, dtype=np.float64)
+    tree_models = {name: model for name, model in models.items() if is_tree_model(model)}
+    try:
+        import shap  # noqa: F401
+    except ImportError:
+        skipped = [name for name, model in tree_models.items() if type(model).__name__ in SKLEARN_TREE_MODELS]
+        if skipped:
+            print(f"SHAP not installed, skipping TreeSHAP for {', '.join(skipped)}.")
+        tree_models = {name: model for name, model in tree_models.items() if name not in skipped}
+
+    entries = {}
+    workers = workers or min(len(tree_models), os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_explain, name, model, X, out_dir): name for name, model in tree_models.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                entries[name] = future.result()
+            except Exception as e:
+                print(f"  SHAP {name}: failed ({e})")
+                continue
+            print(f"  SHAP {name}: {len(X)} rows in {entries[name]['seconds']:.2f}s")
+
+    manifest = {
+        'features': list(feature_names),
+        'rows': len(X),
+        'data_hash': data_hash,
+        'created_at': time.time(),
+        # Keep the caller's model order
+        'models': {name: entries[name] for name in models if name in entries},
+    }
+    tmp_path = os.path.join(out_dir, f'.{MANIFEST}.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+def load_manifest(out_dir):
+    """The store's manifest, or None when nothing has been computed yet."""
+    try:
+        with open(os.path.join(out_dir, MANIFEST), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_shap(out_dir, model_name, manifest=None):
+    """(memory-mapped values, base value, feature names) of one stored model; KeyError if absent."""
+    manifest = manifest or load_manifest(out_dir)
+    if manifest is None or model_name not in manifest['models']:
+        raise KeyError(model_name)
+    entry = manifest['models'][model_name]
+    values = np.load(os.path.join(out_dir, entry['file']), mmap_mode='r')
+    return values, entry['base_value'], manifest['features']
+
+
+def main():
+    import joblib
+    import pandas as pd
+    from train_models import TARGET_COL
+
+    parser = argparse.ArgumentParser(description="Recompute the SHAP store of the saved tree models.")
+    parser.add_argument('--data', default='cleaned_data.csv')
+    parser.add_argument('--models-dir', default='models')
+    parser.add_argument('--out', default=os.path.join('models', 'shap'))
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    X = df.drop(columns=[TARGET_COL])
+    # The models were trained on scaled features
+    X_scaled = joblib.load(os.path.join(args.models_dir, 'scaler.pkl')).transform(X)
+    models = {}
+    for file_name in sorted(os.listdir(args.models_dir)):
+        if not file_name.endswith('_best.pkl'):
+            continue
+        try:
+            model = joblib.load(os.path.join(args.models_dir, file_name))
+        except Exception as e:
+            print(f"Skipping {file_name}: {e}")
+            continue
+        if is_tree_model(model):
+            models[file_name[:-len('_best.pkl')]] = model
+    manifest = compute_shap_store(models, X_scaled, args.out, X.columns, data_hash(X), args.workers)
+    print(f"Saved SHAP values of {', '.join(manifest['models']) or 'no models'} to {args.out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Shared fixtures: a small models directory (scaler + SVR + MLP fitted on
+cleaned_data.csv) and the backend app configured to serve it.
+
+The backend modules import each other as top-level modules (they run from
+backend/), so backend/ goes on sys.path; spawned job workers inherit it. The
+root modules and the Streamlit app's helpers go after it (both directories
+have an app.py and a train_models.py; the backend's and the root's win).
+"""
+import os
+import sys
+import json
+import importlib
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+sys.path.insert(0, BACKEND)
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, 'Streamlit_ML_App'))
+
+TARGET_COL = 'VU(FEA)'
+# One section as a BeamInput body, and as a feature row
+BEAM = {'dwh_d1': 96.4, 'd1': 241.0, 'tw': 2.25, 'flange_width': 78.0, 'total_depth': 250.0,
+        'fyw': 349.106627, 'E': 210000.0, 'a_d': 1.0}
+BEAM_ROW = [list(BEAM.values())]
+
+
+@pytest.fixture(scope='session')
+def training_data():
+    """(X, y) of cleaned_data.csv, X as a DataFrame in FEATURE_COLUMNS order."""
+    df = pd.read_csv(os.path.join(ROOT, 'cleaned_data.csv'))
+    return df.drop(columns=[TARGET_COL]), df[TARGET_COL]
+
+
+@pytest.fixture(scope='session')
+def models_dir(tmp_path_factory, training_data):
+    """A models directory laid out like models/: scaler.pkl, {name}_best.pkl, best_model_info.json."""
+    from sklearn.preprocessing import StandardScaler
+    from sklearn.svm import SVR
+    from sklearn.neural_network import MLPRegressor
+
+    X, y = training_data
+    path = tmp_path_factory.mktemp('models')
+    scaler = StandardScaler().fit(X)
+    X_scaled = scaler.transform(X)
+    models = {
+        'SVR': SVR(C=100, epsilon=0.1),
+        'MLP': MLPRegressor(hidden_layer_sizes=(16, 8), learning_rate_init=0.01, max_iter=1000, random_state=0),
+    }
+    joblib.dump(scaler, path / 'scaler.pkl')
+    rows = []
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # MLP convergence on a tiny budget
+        for name, model in models.items():
+            model.fit(X_scaled, y)
+            joblib.dump(model, path / f'{name}_best.pkl')
+            rows.append({'Model': name, 'Best Params': '{}', 'Test R2': model.score(X_scaled, y)})
+    pd.DataFrame(rows).to_csv(path / 'model_comparison_metrics.csv', index=False)
+    with open(path / 'best_model_info.json', 'w') as f:
+        json.dump({'best_model_name': 'SVR'}, f)
+    return str(path)
+
+
+@pytest.fixture(scope='session')
+def app_module(models_dir, tmp_path_factory):
+    """backend/app.py configured (through its environment variables) to serve `models_dir`."""
+    env = {
+        'MODELS_DIR': models_dir,
+        'METRICS_PATH': os.path.join(models_dir, 'model_comparison_metrics.csv'),
+        'JOB_DIR': str(tmp_path_factory.mktemp('jobs')),
+        'JOB_CHUNK_ROWS': '40',
+        'JOB_NICE': '0',
+        'PREDICTOR': 'sklearn',
+    }
+    saved = {key: os.environ.get(key) for key in list(env) + ['ADMIN_TOKEN', 'LOOKUP_TABLE']}
+    os.environ.update(env)
+    os.environ.pop('ADMIN_TOKEN', None)
+    os.environ.pop('LOOKUP_TABLE', None)
+    try:
+        yield importlib.import_module('app')
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+
+
+@pytest.fixture(scope='session')
+def client(app_module):
+    """TestClient running the app's lifespan (startup loads and warms the best model)."""
+    from fastapi.testclient import TestClient
+    with TestClient(app_module.app) as client:
+        yield client
+
+
+@pytest.fixture(scope='session')
+def sklearn_predict(models_dir):
+    """name -> predict(X) of the scaler + sklearn model pipeline."""
+    scaler = joblib.load(os.path.join(models_dir, 'scaler.pkl'))
+
+    def predict(name, X):
+        model = joblib.load(os.path.join(models_dir, f'{name}_best.pkl'))
+        return model.predict(scaler.transform(np.asarray(X, dtype=np.float64)))
+    return predict
@@ -0,0 +1,86 @@
+"""Request coalescing for /predict (backend/batching.py)."""
+import asyncio
+
+import pytest
+
+from batching import PredictionBatcher
+
+from conftest import BEAM, BEAM_ROW
+
+
+class RecordingPredict:
+    """Sums each row; records the size of every batch it is called with."""
+
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def __call__(self, rows):
+        self.batches.append(len(rows))
+        if self.fail:
+            raise RuntimeError("model exploded")
+        return rows.sum(axis=1)
+
+
+def submit_all(batcher, rows):
+    async def run():
+        return await asyncio.gather(*(batcher.submit(row) for row in rows), return_exceptions=True)
+    return asyncio.run(run())
+
+
+def test_concurrent_requests_share_one_call():
+    predict = RecordingPredict()
+    rows = [[i, 2 * i] for i in range(10)]
+    results = submit_all(PredictionBatcher(predict, window_ms=50), rows)
+    assert predict.batches == [10]
+    # Every handler gets the prediction of its own row
+    assert results == [3.0 * i for i in range(10)]
+
+
+def test_batches_are_capped_at_max_rows():
+    predict = RecordingPredict()
+    results = submit_all(PredictionBatcher(predict, window_ms=50, max_rows=4), [[i] for i in range(10)])
+    assert predict.batches == [4, 4, 2]
+    assert results == [float(i) for i in range(10)]
+
+
+def test_error_reaches_every_waiting_request():
+    predict = RecordingPredict(fail=True)
+    batcher = PredictionBatcher(predict, window_ms=50)
+
+    async def run():
+        results = await asyncio.gather(*(batcher.submit([i]) for i in range(5)), return_exceptions=True)
+        # The worker survives the failure and serves the next batch
+        predict.fail = False
+        return results, await batcher.submit([7])
+
+    results, after = asyncio.run(run())
+    assert predict.batches == [5, 1]
+    assert all(isinstance(result, RuntimeError) and str(result) == "model exploded" for result in results)
+    assert after == 7.0
+
+
+def test_zero_window_still_answers():
+    predict = RecordingPredict()
+    assert submit_all(PredictionBatcher(predict, window_ms=0), [[1, 2]]) == [3.0]
+
+
+def test_batcher_restarts_on_a_new_event_loop():
+    batcher = PredictionBatcher(RecordingPredict(), window_ms=1)
+    assert submit_all(batcher, [[1]]) == [1.0]
+    # asyncio.run closed the first loop (and cancelled its worker)
+    assert submit_all(batcher, [[2]]) == [2.0]
+
+
+def test_endpoint_answers_through_the_batcher(client, app_module, monkeypatch, sklearn_predict):
+    batches = []
+
+    def predict_rows(rows):
+        batches.append(len(rows))
+        return app_module.predict_rows(rows)
+    monkeypatch.setattr(app_module, 'batcher', PredictionBatcher(predict_rows, window_ms=1))
+    monkeypatch.setattr(app_module, 'prediction_cache', None)
+    response = client.post('/predict', json=BEAM)
+    assert response.status_code == 200
+    assert batches == [1]
+    assert response.json()['shear_capacity_kN'] == pytest.approx(sklearn_predict('SVR', BEAM_ROW)[0], rel=1e-9)
@@ -0,0 +1,98 @@
+"""LRU/TTL prediction cache for /predict (backend/cache.py)."""
+import pytest
+
+import cache as cache_module
+from cache import PredictionCache
+
+from conftest import BEAM, BEAM_ROW
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module, 'time', clock)
+    return clock
+
+
+def test_inputs_within_the_tolerance_share_an_entry():
+    cache = PredictionCache(tolerance=1e-3)
+    key = cache.key('v1', BEAM_ROW[0])
+    assert cache.key('v1', [x + 1e-5 for x in BEAM_ROW[0]]) == key
+    assert cache.key('v1', [BEAM_ROW[0][0] + 1e-2] + BEAM_ROW[0][1:]) != key
+    # Other model versions never share entries
+    assert cache.key('v2', BEAM_ROW[0]) != key
+
+    cache.put(key, 123.0)
+    assert cache.get(cache.key('v1', [x - 1e-5 for x in BEAM_ROW[0]])) == 123.0
+    assert cache.get(cache.key('v2', BEAM_ROW[0])) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = PredictionCache(ttl=10)
+    cache.put('a', 1.0)
+    clock.now += 10
+    assert cache.get('a') == 1.0
+    clock.now += 0.5
+    assert cache.get('a') is None
+    assert cache.stats()['size'] == 0 and cache.expirations == 1 and cache.misses == 1
+    # Writing again restarts the entry's clock
+    cache.put('a', 2.0)
+    clock.now += 5
+    assert cache.get('a') == 2.0
+
+
+@pytest.mark.parametrize('ttl', [None, 0, -1])
+def test_no_ttl_keeps_entries(clock, ttl):
+    cache = PredictionCache(ttl=ttl)
+    cache.put('a', 1.0)
+    clock.now += 1e9
+    assert cache.get('a') == 1.0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = PredictionCache(maxsize=2)
+    cache.put('a', 1.0)
+    cache.put('b', 2.0)
+    assert cache.get('a') == 1.0  # 'b' is now the least recently used
+    cache.put('c', 3.0)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1.0 and cache.get('c') == 3.0
+    assert cache.evictions == 1 and cache.stats()['size'] == 2
+
+
+def test_clear_and_stats():
+    cache = PredictionCache(maxsize=8, ttl=60, tolerance=0.5)
+    cache.put('a', 1.0)
+    cache.get('a')
+    cache.get('b')
+    cache.clear()
+    assert cache.get('a') is None
+    assert cache.stats() == {
+        'size': 0, 'maxsize': 8, 'ttl_seconds': 60, 'tolerance': 0.5,
+        'hits': 1, 'misses': 2, 'hit_rate': 1 / 3, 'evictions': 0, 'expirations': 0, 'clears': 1,
+    }
+
+
+def test_predict_answers_from_the_cache(client, app_module, monkeypatch, sklearn_predict):
+    cache = PredictionCache()
+    monkeypatch.setattr(app_module, 'prediction_cache', cache)
+    monkeypatch.setattr(app_module, 'batcher', None)
+    first = client.post('/predict', json=BEAM).json()['shear_capacity_kN']
+    assert first == pytest.approx(sklearn_predict('SVR', BEAM_ROW)[0], rel=1e-9)
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # A second request within the tolerance is a hit on the stored value
+    cache.put(cache.key(app_module.registry.active.version, BEAM_ROW[0]), -1.0)
+    near = {key: value + 1e-9 for key, value in BEAM.items()}
+    assert client.post('/predict', json=near).json()['shear_capacity_kN'] == -1.0
+    assert cache.hits == 1
+    assert client.get('/cache/stats').json()['hits'] == 1
@@ -0,0 +1,70 @@
+"""Compiled (scaler-fused) predictors against the scaler + sklearn pipeline (backend/compiled.py)."""
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.preprocessing import StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from compiled import compile_predictor, load_compiled, save_compiled
+
+
+@pytest.fixture(scope='module')
+def X_eval(training_data):
+    """The training rows plus jittered copies, so points between the training rows are covered too."""
+    X = training_data[0].to_numpy(dtype=np.float64)
+    rng = np.random.default_rng(0)
+    return np.vstack([X, X * rng.uniform(0.9, 1.1, size=X.shape)])
+
+
+def pipeline(models_dir, name):
+    return joblib.load(os.path.join(models_dir, 'scaler.pkl')), joblib.load(os.path.join(models_dir, f'{name}_best.pkl'))
+
+
+@pytest.mark.parametrize('name', ['SVR', 'MLP'])
+def test_compiled_matches_sklearn(models_dir, X_eval, name):
+    scaler, model = pipeline(models_dir, name)
+    expected = model.predict(scaler.transform(X_eval))
+    np.testing.assert_allclose(compile_predictor(scaler, model).predict(X_eval), expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('model', [
+    DecisionTreeRegressor(max_depth=6, random_state=0),
+    RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0),
+    GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0),
+], ids=lambda model: type(model).__name__)
+def test_compiled_trees_match_sklearn(training_data, X_eval, model):
+    X, y = training_data
+    scaler = StandardScaler().fit(X.to_numpy())
+    model.fit(scaler.transform(X.to_numpy()), y)
+    expected = model.predict(scaler.transform(X_eval))
+    np.testing.assert_allclose(compile_predictor(scaler, model).predict(X_eval), expected, rtol=1e-9, atol=1e-9)
+
+
+@pytest.mark.parametrize('name', ['SVR', 'MLP'])
+@pytest.mark.parametrize('ext, mmap_mode', [('npz', None), ('joblib', None), ('joblib', 'r')])
+def test_saved_predictor_round_trips(tmp_path, models_dir, X_eval, name, ext, mmap_mode):
+    scaler, model = pipeline(models_dir, name)
+    predictor = compile_predictor(scaler, model)
+    path = str(tmp_path / f'{name}_compiled.{ext}')
+    save_compiled(predictor, path, feature_names=scaler.feature_names_in_)
+    loaded = load_compiled(path, mmap_mode=mmap_mode)
+    assert loaded.feature_names == list(scaler.feature_names_in_)
+    np.testing.assert_array_equal(loaded.predict(X_eval), predictor.predict(X_eval))
+
+
+def test_memory_mapped_export_is_read_only(tmp_path, models_dir):
+    scaler, model = pipeline(models_dir, 'SVR')
+    path = str(tmp_path / 'SVR_compiled.joblib')
+    save_compiled(compile_predictor(scaler, model), path)
+    support = load_compiled(path, mmap_mode='r').support
+    assert isinstance(support, np.memmap) and not support.flags.writeable
+
+
+def test_unsupported_model_is_refused(models_dir):
+    from sklearn.neighbors import KNeighborsRegressor
+    scaler, _ = pipeline(models_dir, 'SVR')
+    with pytest.raises(ValueError, match='Cannot compile'):
+        compile_predictor(scaler, KNeighborsRegressor())
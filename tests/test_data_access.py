@@ -0,0 +1,55 @@
+"""Cached loading and cleaning of the raw sheet (data_access.py)."""
+import os
+import shutil
+
+import pandas as pd
+import pytest
+
+import data_access
+
+from conftest import ROOT
+
+
+@pytest.fixture
+def raw_path(tmp_path):
+    path = tmp_path / 'Input csv.csv'
+    shutil.copy(os.path.join(ROOT, 'Input csv.csv'), path)
+    return str(path)
+
+
+def load(raw_path, tmp_path, **kwargs):
+    return data_access.load_data(raw_path=raw_path, cache_dir=str(tmp_path / 'cache'), **kwargs)
+
+
+def test_matches_cleaned_data(raw_path, tmp_path):
+    expected = pd.read_csv(os.path.join(ROOT, 'cleaned_data.csv'))
+    df = load(raw_path, tmp_path)
+    pd.testing.assert_frame_equal(df[data_access.FEATURES + [data_access.TARGET_COL]].reset_index(drop=True),
+                                  expected)
+    # Row ids point back at the sheet rows
+    sheet = data_access.read_sheet(raw_path)
+    assert df.index.isin(sheet.index).all()
+    assert (pd.to_numeric(sheet.loc[df.index, 'd1']) == df['d1']).all()
+
+
+def test_rows_without_target_are_kept_on_request(raw_path, tmp_path):
+    df = load(raw_path, tmp_path, require_target=False)
+    assert df[data_access.FEATURES].notna().all().all()
+    with_target = load(raw_path, tmp_path)
+    pd.testing.assert_frame_equal(df[df[data_access.TARGET_COL].notna()], with_target)
+
+
+def test_cache_is_reused_until_the_sheet_changes(raw_path, tmp_path, monkeypatch):
+    first = load(raw_path, tmp_path)
+    reads = []
+    read_sheet = data_access.read_sheet
+    monkeypatch.setattr(data_access, 'read_sheet', lambda path=None: reads.append(path) or read_sheet(path))
+    pd.testing.assert_frame_equal(load(raw_path, tmp_path), first)
+    assert reads == []
+
+    with open(raw_path, 'a') as f:
+        f.write('\n')
+    load(raw_path, tmp_path)
+    assert reads == [raw_path]
+    load(raw_path, tmp_path, refresh=True)
+    assert len(reads) == 2
@@ -0,0 +1,82 @@
+"""Plot data reduction of the Streamlit app (Streamlit_ML_App/data_reduction.py)."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_reduction import BinnedMeans, StreamingLTTB, lttb, read_csv_rows
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'data.csv'
+    pd.DataFrame({'a': np.arange(1000), 'b': np.arange(1000) * 2.0, 'c': 'x'}).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 7, 100, 5000])
+def test_read_csv_rows_picks_the_sampled_rows(csv_path, chunk_rows):
+    rows = np.sort(np.random.default_rng(0).choice(1000, 50, replace=False))
+    df = read_csv_rows(csv_path, rows, ['b', 'a'], chunk_rows)
+    assert list(df.index) == list(range(50))
+    np.testing.assert_array_equal(df['a'], rows)
+    np.testing.assert_array_equal(df['b'], rows * 2.0)
+
+
+def test_read_csv_rows_edges(csv_path):
+    np.testing.assert_array_equal(read_csv_rows(csv_path, [0, 999], ['a'], 10)['a'], [0, 999])
+    assert read_csv_rows(csv_path, [], ['a'], 10).empty
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(10_000, dtype=np.float64)
+    y = np.sin(x / 500)
+    y[1234] = 50.0
+    keep = lttb(x, y, 200)
+    assert len(keep) == 200
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+    # A spike far from its neighbours always wins its bucket
+    assert 1234 in keep
+    np.testing.assert_array_equal(lttb(x[:50], y[:50], 200), np.arange(50))
+
+
+def test_streaming_lttb_matches_shape_over_chunks():
+    rng = np.random.default_rng(0)
+    x = np.arange(50_000, dtype=np.float64)
+    y = np.cumsum(rng.normal(size=len(x)))
+    trace = StreamingLTTB(300)
+    for start in range(0, len(x), 7000):
+        trace.update(x[start:start + 7000], y[start:start + 7000])
+    px, py = trace.points()
+    assert len(px) == 300
+    assert px[0] == 0 and px[-1] == x[-1]
+    # The kept points span (nearly) the whole range of the trace
+    span = y.max() - y.min()
+    assert py.max() >= y.max() - 0.02 * span and py.min() <= y.min() + 0.02 * span
+    np.testing.assert_array_equal(py, y[px.astype(np.int64)])
+
+
+def test_binned_means_match_pandas():
+    rng = np.random.default_rng(0)
+    x, y = rng.uniform(0, 1, 20_000), rng.uniform(10, 20, 20_000)
+    z = x * 3 + y
+    z[::97] = np.nan
+    grid = BinnedMeans((0, 1), (10, 20), x_bins=8, y_bins=5)
+    for start in range(0, len(x), 3000):
+        grid.update(x[start:start + 3000], y[start:start + 3000], z[start:start + 3000])
+    x_centers, y_centers, means = grid.grid()
+    assert means.shape == (5, 8)
+    np.testing.assert_allclose(x_centers, (np.arange(8) + 0.5) / 8)
+
+    df = pd.DataFrame({'ix': np.minimum((x * 8).astype(int), 7), 'iy': np.minimum(((y - 10) / 2).astype(int), 4), 'z': z})
+    expected = df.dropna().groupby(['iy', 'ix'])['z'].mean().unstack().to_numpy()
+    np.testing.assert_allclose(means, expected)
+
+
+def test_binned_means_ignore_points_outside_the_range():
+    grid = BinnedMeans((0, 1), (0, 1), x_bins=2, y_bins=2)
+    grid.update([0.25, 1.0, 1.5, -0.1], [0.25, 1.0, 0.5, 0.5], [1.0, 2.0, 100.0, 100.0])
+    means = grid.grid()[2]
+    # The upper edge belongs to the last bin; empty cells are NaN
+    assert means[0, 0] == 1.0 and means[1, 1] == 2.0
+    assert np.isnan(means[0, 1]) and np.isnan(means[1, 0])
@@ -0,0 +1,62 @@
+"""Sharded synthetic dataset generation (Streamlit_ML_App/dataset_generator.py)."""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from dataset_generator import CAPACITY_COLUMNS, MIN_CAPACITY_KN, NUM_DRAWS, generate_sharded, sample_beams
+
+
+def read_shards(out_dir):
+    paths = sorted(os.path.join(out_dir, name) for name in os.listdir(out_dir) if name.startswith('shard-'))
+    frames = [pd.read_parquet(path) if path.endswith('.parquet') else pd.read_feather(path) for path in paths]
+    return [os.path.basename(path) for path in paths], frames
+
+
+def test_split_draws_match_one_draw():
+    def streams():
+        return [np.random.default_rng(seed) for seed in range(NUM_DRAWS)]
+    whole = pd.DataFrame(sample_beams(streams(), 100))
+    rngs = streams()
+    parts = pd.concat([pd.DataFrame(sample_beams(rngs, n)) for n in (30, 1, 69)], ignore_index=True)
+    pd.testing.assert_frame_equal(parts, whole)
+    assert (whole[CAPACITY_COLUMNS] >= MIN_CAPACITY_KN).all().all()
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'feather'])
+def test_shards_do_not_depend_on_chunk_rows_or_workers(tmp_path, file_format):
+    runs = {}
+    for chunk_rows, workers in [(1000, 1), (7, 2), (64, 3)]:
+        out_dir = str(tmp_path / f'{chunk_rows}-{workers}')
+        generate_sharded(250, out_dir, shard_size=100, chunk_rows=chunk_rows, workers=workers, seed=5,
+                         file_format=file_format, compression='zstd')
+        runs[chunk_rows, workers] = read_shards(out_dir)
+
+    names, frames = runs[1000, 1]
+    extension = 'parquet' if file_format == 'parquet' else 'feather'
+    assert names == [f'shard-0000{i}.{extension}' for i in range(3)]
+    assert [len(frame) for frame in frames] == [100, 100, 50]
+    for other_names, other_frames in runs.values():
+        assert other_names == names
+        for frame, other in zip(frames, other_frames):
+            pd.testing.assert_frame_equal(other, frame)
+    # Shards are independent streams, not copies of each other
+    assert not np.allclose(frames[0].iloc[:50].to_numpy(), frames[2].to_numpy())
+
+
+def test_seed_changes_the_data_and_is_recorded(tmp_path):
+    generate_sharded(50, str(tmp_path / 'a'), shard_size=50, chunk_rows=20, workers=1, seed=1)
+    generate_sharded(50, str(tmp_path / 'b'), shard_size=50, chunk_rows=20, workers=1, seed=2)
+    a, b = read_shards(str(tmp_path / 'a'))[1][0], read_shards(str(tmp_path / 'b'))[1][0]
+    assert not a.equals(b)
+
+    with open(tmp_path / 'a' / '_manifest.json') as f:
+        manifest = json.load(f)
+    assert manifest['seed'] == 1 and manifest['num_shards'] == 1 and manifest['num_samples'] == 50
+    assert manifest['columns'] == list(a.columns)
+    # No partial files are left behind
+    assert sorted(os.listdir(tmp_path / 'a')) == ['_manifest.json', 'shard-00000.parquet']
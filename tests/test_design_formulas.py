@@ -0,0 +1,47 @@
+"""Vectorized design formulas against the spreadsheet's columns (backend/design_formulas.py, /design_check)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from design_formulas import DESIGN_COLUMNS, design_capacities
+
+from conftest import ROOT
+
+# Spreadsheet column -> computed column, as checked by `python design_formulas.py`
+SHEET_COLUMNS = {
+    'Kss': 'Kss', 'Ksf': 'Ksf', 'Kv': 'Kv', 'Vcr': 'Vcr', 'vy': 'Vy',
+    'λv.1': 'lambda_v', 'Vv.1': 'Vv', 'Vv.3': 'Vv_tf', 'c.1': 'c',
+    'c/tw.1': 'c_tw', 'qsAS/NS': 'qs', 'Vnl DSM': 'Vnl_without_tf',
+    'Vnl with tension field': 'Vnl_with_tf', 'Design Shear Resistance (VRd)': 'VRd',
+}
+
+
+@pytest.fixture(scope='module')
+def sheet():
+    return pd.read_csv(os.path.join(ROOT, 'final_predictions.csv'))
+
+
+@pytest.mark.parametrize('sheet_col, col', SHEET_COLUMNS.items())
+def test_matches_spreadsheet(sheet, sheet_col, col):
+    results = design_capacities(dwh=sheet['Depth of Web opening(dwh/d1)'], d1=sheet['d1'], tw=sheet['tw'],
+                                fyw=sheet['fyw'], E=sheet['E'], a_d=sheet['a/d'], nu=sheet['m'])
+    expected = pd.to_numeric(sheet[sheet_col], errors='coerce').to_numpy()
+    mask = ~np.isnan(expected)
+    assert mask.any()
+    # Two-decimal rounding in the sheet, and its ~0.1% Vcr offset
+    np.testing.assert_allclose(results[col][mask], expected[mask], rtol=2e-3, atol=0.006)
+
+
+def test_batch_endpoint_matches_single(client, training_data):
+    X, _ = training_data
+    fields = ['dwh_d1', 'd1', 'tw', 'flange_width', 'total_depth', 'fyw', 'E', 'a_d']
+    beams = [dict(zip(fields, row)) for row in X.head(10).to_numpy().tolist()]
+    batch = client.post('/design_check_batch', json=beams).json()
+    assert list(batch) == DESIGN_COLUMNS
+    for i, beam in enumerate(beams):
+        single = client.post('/design_check', json=beam).json()
+        for col in DESIGN_COLUMNS:
+            assert single[col] == pytest.approx(batch[col][i], rel=1e-12, nan_ok=True)
+    assert client.post('/design_check_batch', json=[]).status_code == 400
@@ -0,0 +1,87 @@
+"""Design-of-experiments sampling (backend/doe.py) and /predict_doe."""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from doe import DEFAULT_BOUNDS, DOE_FEATURES, MAX_OPENING_RATIO, design_chunks, resolve_bounds
+
+BOUNDS = {'dwh_d1': (0.0, 200.0), 'd1': (150.0, 300.0), 'tw': (1.5, 3.0)}
+
+
+def design(method, n=None, **kwargs):
+    return np.concatenate(list(design_chunks(method, n, **kwargs)))
+
+
+def assert_feasible(X, bounds):
+    lower, upper = resolve_bounds(bounds)
+    assert X.shape[1] == len(DOE_FEATURES)
+    assert np.all(X >= lower) and np.all(X <= upper)
+    assert np.all(X[:, 1] < X[:, 4])
+    assert np.all(X[:, 0] <= MAX_OPENING_RATIO * X[:, 1])
+
+
+@pytest.mark.parametrize('method', ['lhs', 'sobol'])
+@pytest.mark.parametrize('chunk_rows', [64, 1000])
+def test_sampled_designs_are_feasible(method, chunk_rows):
+    X = design(method, 700, bounds=BOUNDS, chunk_rows=chunk_rows, seed=1)
+    assert len(X) == 700
+    assert_feasible(X, BOUNDS)
+    # Constant features stay at their value
+    np.testing.assert_array_equal(X[:, 7], DEFAULT_BOUNDS['a_d'][0])
+
+
+def test_sampled_designs_are_reproducible():
+    np.testing.assert_array_equal(design('lhs', 300, seed=3), design('lhs', 300, seed=3))
+    assert not np.array_equal(design('lhs', 300, seed=3), design('lhs', 300, seed=4))
+
+
+def test_factorial_design_enumerates_the_feasible_grid():
+    X = design('factorial', bounds=BOUNDS, levels=4, chunk_rows=7, constraints=[])
+    assert len(X) == 4 ** 5
+    assert len(np.unique(X, axis=0)) == len(X)
+    feasible = design('factorial', bounds=BOUNDS, levels=4, chunk_rows=7)
+    assert_feasible(feasible, BOUNDS)
+    assert len(feasible) < len(X)
+    assert len(design('factorial', 10, levels=4)) == 10
+
+
+@pytest.mark.parametrize('bounds', [
+    {'t': [1.0, 2.0]},
+    {'tw': [1.0]},
+    {'tw': [3.0, 1.0]},
+    {'tw': [[1.0, 2.0]]},
+])
+def test_bad_bounds_are_refused(bounds):
+    with pytest.raises(ValueError):
+        design('lhs', 10, bounds=bounds)
+
+
+def test_infeasible_bounds_are_refused():
+    # d1 always above the total depth
+    with pytest.raises(ValueError, match='constraints rejected'):
+        design('lhs', 10, bounds={'d1': (300.0, 344.0), 'total_depth': (150.0, 200.0)})
+
+
+def test_predict_doe_streams_predictions(client, sklearn_predict, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'STREAM_CHUNK_ROWS', 100)
+    response = client.post('/predict_doe', json={'method': 'lhs', 'n': 250, 'seed': 7, 'bounds': BOUNDS})
+    assert response.status_code == 200
+    df = pd.read_csv(io.BytesIO(response.content))
+    assert len(df) == 250
+    X = df[app_module.FEATURE_COLUMNS].to_numpy()
+    assert_feasible(X, BOUNDS)
+    np.testing.assert_allclose(df['Predicted_Shear_Capacity_kN'], sklearn_predict('SVR', X), rtol=1e-9)
+
+
+@pytest.mark.parametrize('body, status', [
+    ({'method': 'lhs', 'n': 10, 'bounds': {'t': [1.0, 2.0]}}, 422),
+    ({'method': 'lhs', 'n': 10, 'bounds': {'tw': [1.0]}}, 422),
+    ({'method': 'lhs', 'n': 10, 'bounds': {'tw': [3.0, 1.0]}}, 422),
+    ({'method': 'grid', 'n': 10}, 400),
+    ({'method': 'lhs'}, 400),
+    ({'method': 'lhs', 'n': 10, 'bounds': {'d1': [300.0, 344.0], 'total_depth': [150.0, 200.0]}}, 400),
+])
+def test_predict_doe_rejects_bad_requests(client, body, status):
+    assert client.post('/predict_doe', json=body).status_code == status
@@ -0,0 +1,83 @@
+"""Multi-model ensemble (backend/ensemble.py, /predict_ensemble)."""
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+from ensemble import EnsemblePredictor, EnsembleUnavailable
+from registry import ModelRegistry
+
+from conftest import BEAM, BEAM_ROW
+
+
+@pytest.fixture
+def registry(tmp_path, models_dir, app_module):
+    shutil.copytree(models_dir, tmp_path, dirs_exist_ok=True)
+    return ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS,
+                         metrics_path=str(tmp_path / 'model_comparison_metrics.csv'))
+
+
+def test_weighted_mean_of_every_model(registry, training_data, sklearn_predict):
+    X = training_data[0].to_numpy()
+    predictions, weighted_mean, weights, versions, errors = EnsemblePredictor(registry).predict(X)
+    assert sorted(predictions) == ['MLP', 'SVR'] and errors == {}
+    r2 = {name: max(registry.bundles[name].metrics['Test R2'], 0.0) for name in predictions}
+    assert weights == pytest.approx({name: value / sum(r2.values()) for name, value in r2.items()})
+    for name in predictions:
+        np.testing.assert_allclose(predictions[name], sklearn_predict(name, X), rtol=1e-9)
+        assert versions[name] == registry.bundles[name].version
+    np.testing.assert_allclose(weighted_mean, sum(weights[n] * predictions[n] for n in predictions))
+
+
+def test_concurrent_first_requests_load_once(registry, monkeypatch):
+    loads = []
+    load = registry.load
+    monkeypatch.setattr(registry, 'load', lambda name, force=False: loads.append(name) or load(name, force))
+    ensemble = EnsemblePredictor(registry)
+    threads = [threading.Thread(target=ensemble.ensure_loaded) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(loads) == ['MLP', 'SVR']
+
+
+def test_failing_model_is_reported(registry, monkeypatch, sklearn_predict):
+    ensemble = EnsemblePredictor(registry)
+    ensemble.ensure_loaded()
+
+    def fail(X):
+        raise MemoryError("out of memory")
+    monkeypatch.setattr(registry.bundles['MLP'].model, 'predict', fail)
+    predictions, weighted_mean, weights, versions, errors = ensemble.predict(BEAM_ROW)
+    assert list(predictions) == ['SVR'] and list(versions) == ['SVR']
+    assert errors == {'MLP': 'MemoryError: out of memory'}
+    # The weights are renormalized over the models that predicted
+    assert weights == {'SVR': 1.0}
+    np.testing.assert_allclose(weighted_mean, sklearn_predict('SVR', BEAM_ROW), rtol=1e-9)
+
+    monkeypatch.setattr(registry.bundles['SVR'].model, 'predict', fail)
+    with pytest.raises(EnsembleUnavailable, match='Every model failed'):
+        ensemble.predict(BEAM_ROW)
+
+
+def test_model_that_fails_to_load_is_reported(registry):
+    with open(f'{registry.models_dir}/Broken_best.pkl', 'wb') as f:
+        f.write(b'not a pickle')
+    predictions, _, _, _, errors = EnsemblePredictor(registry).predict(BEAM_ROW)
+    assert sorted(predictions) == ['MLP', 'SVR']
+    assert errors['Broken'].startswith('Could not load')
+
+
+def test_endpoint_reports_errors_and_503(client, app_module, monkeypatch, tmp_path):
+    body = client.post('/predict_ensemble', json=BEAM).json()
+    assert sorted(body['models_kN']) == ['MLP', 'SVR'] and body['errors'] == {}
+    batch = client.post('/predict_ensemble_batch', json=[BEAM, BEAM]).json()
+    assert batch['weighted_mean_kN'] == pytest.approx([body['weighted_mean_kN']] * 2)
+
+    empty = ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS)
+    monkeypatch.setattr(app_module, 'ensemble', EnsemblePredictor(empty))
+    response = client.post('/predict_ensemble', json=BEAM)
+    assert response.status_code == 503
+    assert 'No models loaded' in response.json()['detail']
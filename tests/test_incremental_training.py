@@ -0,0 +1,105 @@
+"""Out-of-core scaler fitting, MLP training and evaluation over shards (incremental_training.py)."""
+import os
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import (mean_absolute_error, mean_absolute_percentage_error, mean_squared_error,
+                             r2_score)
+from sklearn.preprocessing import StandardScaler
+
+from incremental_training import ShardSource, evaluate, fit_scaler, scale, train_mlp
+
+from conftest import ROOT, TARGET_COL
+
+
+def shard_source(training_data, **kwargs):
+    """cleaned_data.csv as a single CSV shard, read in small chunks."""
+    kwargs.setdefault('chunk_rows', 30)
+    return ShardSource(os.path.join(ROOT, 'cleaned_data.csv'), training_data[0].columns, TARGET_COL, **kwargs)
+
+
+def part_rows(source, part):
+    chunks = list(source.chunks(part))
+    return np.vstack([X for X, _ in chunks]), np.concatenate([y for _, y in chunks])
+
+
+@pytest.mark.parametrize('method', ['two-pass', 'partial-fit'])
+def test_fit_scaler_matches_standard_scaler(training_data, method):
+    source = shard_source(training_data)
+    X_train, _ = part_rows(source, 'train')
+    expected = StandardScaler().fit(X_train)
+    scaler = fit_scaler(source, method)
+    np.testing.assert_allclose(scaler.mean_, expected.mean_, rtol=1e-12)
+    np.testing.assert_allclose(scaler.var_, expected.var_, rtol=1e-9)
+    np.testing.assert_allclose(scaler.scale_, expected.scale_, rtol=1e-9)
+    assert scaler.n_samples_seen_ == len(X_train)
+    assert list(scaler.feature_names_in_) == list(source.features)
+
+
+def test_split_does_not_depend_on_the_pass(training_data):
+    source = shard_source(training_data)
+    X_train, _ = part_rows(source, 'train')
+    X_test, _ = part_rows(source, 'test')
+    np.testing.assert_array_equal(part_rows(source, 'train')[0], X_train)
+    assert len(X_train) + len(X_test) == len(training_data[0])
+
+
+@pytest.mark.parametrize('part', ['train', 'test'])
+def test_evaluate_matches_sklearn_metrics(training_data, part):
+    source = shard_source(training_data)
+    scaler = fit_scaler(source)
+    X_train, y_train = part_rows(source, 'train')
+    model = LinearRegression().fit(scale(scaler, X_train), y_train)
+    X, y = part_rows(source, part)
+    pred = model.predict(scale(scaler, X))
+    scores = evaluate(model, source, scaler, part=part)
+    assert scores['r2'] == pytest.approx(r2_score(y, pred), rel=1e-9)
+    assert scores['mse'] == pytest.approx(mean_squared_error(y, pred), rel=1e-9)
+    assert scores['mae'] == pytest.approx(mean_absolute_error(y, pred), rel=1e-9)
+    assert scores['mape'] == pytest.approx(mean_absolute_percentage_error(y, pred) * 100, rel=1e-9)
+
+
+def test_evaluate_zero_and_constant_targets(tmp_path, training_data):
+    X, _ = training_data
+    df = X.head(20).assign(**{TARGET_COL: 0.0})
+    df.to_csv(tmp_path / 'zeros.csv', index=False)
+    source = ShardSource(str(tmp_path / 'zeros.csv'), X.columns, TARGET_COL, test_size=1.0)
+
+    class Constant:
+        def __init__(self, value):
+            self.value = value
+
+        def predict(self, X):
+            return np.full(len(X), self.value)
+
+    assert evaluate(Constant(0.0), source) == {'r2': 1.0, 'mse': 0.0, 'mae': 0.0, 'mape': 0.0}
+    scores = evaluate(Constant(1.0), source)
+    assert scores['r2'] == 0.0 and np.isfinite(scores['mape'])
+    y = np.zeros(20)
+    assert scores['mape'] == pytest.approx(mean_absolute_percentage_error(y, np.ones(20)) * 100)
+
+
+def test_train_mlp_learns(training_data):
+    source = shard_source(training_data)
+    scaler = fit_scaler(source)
+    model = train_mlp(source, scaler, {'hidden_layer_sizes': (16,), 'learning_rate_init': 0.05,
+                                       'max_iter': 30, 'random_state': 0})
+    assert 1 <= model.n_iter_ <= 30
+    # One partial_fit per training chunk per epoch
+    chunks = sum(1 for _ in source.chunks('train'))
+    assert len(model.loss_curve_) == model.n_iter_ * chunks
+    assert evaluate(model, source, scaler, part='train')['r2'] > 0.8
+
+
+def test_empty_parts_are_refused(training_data):
+    no_train = shard_source(training_data, test_size=1.0)
+    for method in ('two-pass', 'partial-fit'):
+        with pytest.raises(ValueError, match='No training rows'):
+            fit_scaler(no_train, method)
+    with pytest.raises(ValueError, match='No training rows'):
+        train_mlp(no_train, None, {'max_iter': 5})
+    with pytest.raises(ValueError, match='No test rows'):
+        evaluate(LinearRegression(), shard_source(training_data, test_size=0.0))
+    with pytest.raises(ValueError, match='max_iter'):
+        train_mlp(shard_source(training_data), None, {'max_iter': 0})
@@ -0,0 +1,119 @@
+"""Background batch-prediction jobs through /jobs (backend/jobs.py)."""
+import io
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import jobs as jobs_module
+
+
+def wait_for(client, job_id, timeout=120):
+    """Poll /jobs/{id} until the job has finished."""
+    deadline = time.monotonic() + timeout
+    while True:
+        job = client.get(f'/jobs/{job_id}').json()
+        if job['status'] in jobs_module.FINISHED:
+            return job
+        assert time.monotonic() < deadline, f"job {job_id} still {job['status']}"
+        time.sleep(0.1)
+
+
+def submit_csv(client, df, filename='beams.csv'):
+    return client.post('/jobs', files={'file': (filename, df.to_csv(index=False).encode(), 'text/csv')})
+
+
+def test_job_predicts_every_row(client, training_data, sklearn_predict):
+    X, _ = training_data
+    response = submit_csv(client, X)
+    assert response.status_code == 202
+    job = response.json()
+    assert job['status'] == 'queued'
+    assert job['status_url'] == f"/jobs/{job['id']}"
+
+    job = wait_for(client, job['id'])
+    assert job['status'] == 'done', job['error']
+    # JOB_CHUNK_ROWS=40: the 100 rows are written in three chunks
+    assert job['rows_done'] == job['rows_total'] == len(X)
+    assert job['progress'] == 1.0
+
+    response = client.get(f"/jobs/{job['id']}/result")
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    result = pd.read_csv(io.BytesIO(response.content))
+    assert list(result.columns) == list(X.columns) + ['Predicted_Shear_Capacity_kN']
+    np.testing.assert_allclose(result['Predicted_Shear_Capacity_kN'], sklearn_predict('SVR', X), rtol=1e-9)
+
+    assert job['id'] in [listed['id'] for listed in client.get('/jobs').json()['jobs']]
+    assert client.delete(f"/jobs/{job['id']}").json() == {'id': job['id'], 'status': 'deleted'}
+    assert client.get(f"/jobs/{job['id']}").status_code == 404
+
+
+def test_job_with_missing_columns_fails(client, training_data):
+    X, _ = training_data
+    job = submit_csv(client, X.drop(columns=['tw'])).json()
+    job = wait_for(client, job['id'])
+    assert job['status'] == 'failed'
+    assert 'Missing required columns' in job['error']
+    # A failed job has no result to download
+    response = client.get(f"/jobs/{job['id']}/result")
+    assert response.status_code == 409
+    assert 'failed' in response.json()['detail']
+
+
+def test_unknown_job_is_404(client):
+    for job_id in ('0' * 32, 'not-a-job-id'):
+        assert client.get(f'/jobs/{job_id}').status_code == 404
+        assert client.get(f'/jobs/{job_id}/result').status_code == 404
+        assert client.delete(f'/jobs/{job_id}').status_code == 404
+
+
+def test_unsupported_file_type_is_400(client):
+    response = client.post('/jobs', files={'file': ('beams.txt', b'1,2,3\n', 'text/plain')})
+    assert response.status_code == 400
+    assert 'Excel or CSV' in response.json()['detail']
+
+
+def test_full_queue_is_429(client, app_module, training_data, monkeypatch):
+    X, _ = training_data
+    # One slot, already held by an upload in progress
+    monkeypatch.setattr(app_module.jobs, 'max_pending', 1)
+    monkeypatch.setitem(app_module.jobs._futures, 'f' * 32, jobs_module._Reserved())
+    response = submit_csv(client, X)
+    assert response.status_code == 429
+    assert app_module.jobs.pending() == 1
+
+
+def test_dead_worker_pool_is_replaced(client, app_module, training_data):
+    X, _ = training_data
+    # Make sure a pool with a live worker exists, then kill the worker
+    job = wait_for(client, submit_csv(client, X.head(5)).json()['id'])
+    assert job['status'] == 'done'
+    executor = app_module.jobs._executor
+    for process in list(executor._processes.values()):
+        process.kill()
+    deadline = time.monotonic() + 30
+    while not executor._broken:
+        assert time.monotonic() < deadline, "the pool never noticed its worker died"
+        time.sleep(0.05)
+
+    # The next submission starts a new pool instead of failing for good
+    response = submit_csv(client, X.head(5))
+    assert response.status_code == 202
+    job = wait_for(client, response.json()['id'])
+    assert job['status'] == 'done', job['error']
+    assert app_module.jobs._executor is not executor
+
+
+def test_excel_job_writes_excel(client, training_data, sklearn_predict):
+    pytest.importorskip('openpyxl')
+    X, _ = training_data
+    buffer = io.BytesIO()
+    X.head(50).to_excel(buffer, index=False)
+    response = client.post('/jobs', files={'file': ('beams.xlsx', buffer.getvalue())})
+    assert response.status_code == 202
+    job = wait_for(client, response.json()['id'])
+    assert job['status'] == 'done', job['error']
+    result = pd.read_excel(io.BytesIO(client.get(f"/jobs/{job['id']}/result").content))
+    np.testing.assert_allclose(result['Predicted_Shear_Capacity_kN'], sklearn_predict('SVR', X.head(50)), rtol=1e-9)
@@ -0,0 +1,97 @@
+"""Lookup-table interpolation against the sklearn pipeline it was built from (backend/lookup_table.py)."""
+import itertools
+
+import numpy as np
+import pytest
+
+from lookup_table import LookupTable, build_lookup_table
+
+LEVELS = 5
+
+
+@pytest.fixture(scope='module')
+def svr_predict(sklearn_predict):
+    return lambda X: sklearn_predict('SVR', X)
+
+
+@pytest.fixture(scope='module')
+def meta_path(tmp_path_factory, svr_predict):
+    out_dir = tmp_path_factory.mktemp('lookup')
+    return build_lookup_table(svr_predict, str(out_dir), 'SVR', 'SVR-test', levels=LEVELS, validation_points=500)
+
+
+@pytest.fixture
+def table(meta_path):
+    return LookupTable.load(meta_path)
+
+
+def grid_points(table, axes):
+    """Rows of full feature vectors at every combination of `axes` (one per varying feature)."""
+    points = np.array(list(itertools.product(*axes)))
+    X = np.empty((len(points), len(table.meta['features'])))
+    X[:, table.varying] = points
+    X[:, table.constant] = table.constant_values
+    return X
+
+
+def test_grid_nodes_are_the_model(table, svr_predict):
+    X = grid_points(table, table.axes)
+    assert table.grid.shape == (LEVELS,) * len(table.axes)
+    expected = svr_predict(X)
+    values, inside, within_bound = table.interpolate(X)
+    assert inside.all() and within_bound.all()
+    np.testing.assert_allclose(values, expected, rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose([table.lookup(row.tolist()) for row in X[::37]], expected[::37], rtol=1e-9, atol=1e-9)
+
+
+def test_cell_error_is_the_error_at_cell_centres(table, svr_predict):
+    centres = [(axis[:-1] + axis[1:]) / 2 for axis in table.axes]
+    X = grid_points(table, centres)
+    values = table.interpolate(X)[0]
+    np.testing.assert_allclose(np.abs(svr_predict(X) - values), np.asarray(table.cell_error).ravel(), atol=1e-9)
+
+
+def test_single_row_lookup_matches_vectorized(table):
+    rng = np.random.default_rng(0)
+    lower, upper = np.array(table.meta['lower']), np.array(table.meta['upper'])
+    X = lower + rng.random((200, len(lower))) * (upper - lower)
+    values = table.interpolate(X)[0]
+    np.testing.assert_allclose([table.lookup(row.tolist()) for row in X], values, rtol=1e-12)
+    assert table.stats()['hits'] == len(X)
+
+
+def test_points_off_the_grid_fall_back(table):
+    row = grid_points(table, [axis[1:2] for axis in table.axes])[0]
+    above = row.copy()
+    above[table.varying[0]] = table.axes[0][-1] + 1
+    assert table.lookup(above.tolist()) is None
+    other_constant = row.copy()
+    other_constant[table.constant[0]] *= 1.01
+    assert table.lookup(other_constant.tolist()) is None
+    assert not table.interpolate(np.array([above, other_constant]))[1].any()
+    assert table.stats()['fallback_outside_grid'] == 2
+
+
+def test_error_bound_falls_back(meta_path, table):
+    row = grid_points(table, [(axis[0] + axis[1]) / 2 * np.ones(1) for axis in table.axes])[0]
+    cell_error = float(np.asarray(table.cell_error)[(0,) * len(table.axes)])
+    assert LookupTable.load(meta_path, max_error=cell_error * 2).lookup(row.tolist()) is not None
+    strict = LookupTable.load(meta_path, max_error=cell_error / 2)
+    assert strict.lookup(row.tolist()) is None
+    assert strict.stats()['fallback_error_bound'] == 1
+
+
+def test_predict_uses_table_only_for_its_model_version(client, app_module, meta_path, monkeypatch, svr_predict):
+    table = LookupTable.load(meta_path)
+    monkeypatch.setattr(app_module, 'lookup_table', table)
+    x = grid_points(table, [axis[1:2] for axis in table.axes])[0]
+    beam = dict(zip(table.meta['features'], x.tolist()))
+
+    # Built for another version than the active bundle: answered by the model
+    assert client.post('/predict', json=beam).json()['shear_capacity_kN'] == pytest.approx(svr_predict([x])[0])
+    assert table.stats()['hits'] == 0
+
+    table.version = app_module.registry.active.version
+    assert client.post('/predict', json=beam).json()['shear_capacity_kN'] == pytest.approx(svr_predict([x])[0])
+    assert table.stats()['hits'] == 1
+    assert client.get('/lookup/stats').json()['active'] is True
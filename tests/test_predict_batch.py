@@ -0,0 +1,85 @@
+"""File and binary batch prediction (/predict_batch, its streaming CSV mode, /predict_batch_npy)."""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def upload(df, filename='beams.csv'):
+    return {'file': (filename, df.to_csv(index=False).encode(), 'text/csv')}
+
+
+@pytest.mark.parametrize('chunk_rows', [30, 100, 1000])
+def test_streamed_csv_matches_whole_file(client, app_module, training_data, sklearn_predict, monkeypatch, chunk_rows):
+    X, _ = training_data
+    df = X.assign(note=[f'beam {i}' for i in range(len(X))])
+    whole = client.post('/predict_batch', files=upload(df))
+    assert whole.status_code == 200
+
+    monkeypatch.setattr(app_module, 'STREAM_CHUNK_ROWS', chunk_rows)
+    response = client.post('/predict_batch?stream=true', files=upload(df))
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    assert 'predictions_beams.csv' in response.headers['content-disposition']
+    # One header, every row once, in order, with the extra columns kept
+    assert response.content.count(b'Predicted_Shear_Capacity_kN') == 1
+    result = pd.read_csv(io.BytesIO(response.content))
+    pd.testing.assert_frame_equal(result, pd.read_csv(io.BytesIO(whole.content)))
+    assert list(result['note']) == list(df['note'])
+    np.testing.assert_allclose(result['Predicted_Shear_Capacity_kN'], sklearn_predict('SVR', X), rtol=1e-9)
+
+
+def test_streamed_csv_fills_missing_values(client, training_data, sklearn_predict):
+    X = training_data[0].head(5).copy()
+    X.loc[2, 'tw'] = np.nan
+    result = pd.read_csv(io.BytesIO(client.post('/predict_batch?stream=true', files=upload(X)).content))
+    np.testing.assert_allclose(result['Predicted_Shear_Capacity_kN'], sklearn_predict('SVR', X.fillna(0)), rtol=1e-9)
+
+
+@pytest.mark.parametrize('files, detail', [
+    ({'file': ('beams.csv', b'', 'text/csv')}, 'no header row'),
+    ({'file': ('beams.xlsx', b'PK', 'application/octet-stream')}, 'only supports CSV'),
+])
+def test_streamed_upload_errors(client, files, detail):
+    response = client.post('/predict_batch?stream=true', files=files)
+    assert response.status_code == 400
+    assert detail in response.json()['detail']
+
+
+def test_streamed_csv_with_missing_columns_is_400(client, training_data):
+    response = client.post('/predict_batch?stream=true', files=upload(training_data[0].drop(columns=['tw'])))
+    assert response.status_code == 400
+    assert "Missing required columns" in response.json()['detail'] and "'tw'" in response.json()['detail']
+
+
+def npy_bytes(X):
+    buffer = io.BytesIO()
+    np.save(buffer, X)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize('order', ['C', 'F'])
+def test_npy_round_trip(client, training_data, sklearn_predict, order):
+    X = np.asarray(training_data[0].to_numpy(dtype='<f8'), order=order)
+    response = client.post('/predict_batch_npy', content=npy_bytes(X),
+                           headers={'Content-Type': 'application/octet-stream'})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/octet-stream'
+    predictions = np.load(io.BytesIO(response.content), allow_pickle=False)
+    assert predictions.dtype == np.dtype('<f8') and predictions.shape == (len(X),)
+    np.testing.assert_allclose(predictions, sklearn_predict('SVR', X), rtol=1e-9)
+
+
+@pytest.mark.parametrize('body, detail', [
+    (b'not an array', 'not a valid .npy'),
+    (npy_bytes(np.ones((3, 8), dtype=np.float32)), "got '<f4'"),
+    (npy_bytes(np.ones((3, 8), dtype='>f8')), "got '>f8'"),
+    (npy_bytes(np.ones((3, 7))), 'Expected shape (n, 8)'),
+    (npy_bytes(np.ones(8)), 'Expected shape (n, 8)'),
+    (npy_bytes(np.ones((3, 8)))[:-8], 'does not match'),
+])
+def test_npy_errors_are_400(client, body, detail):
+    response = client.post('/predict_batch_npy', content=body)
+    assert response.status_code == 400
+    assert detail in response.json()['detail']
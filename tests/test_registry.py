@@ -0,0 +1,185 @@
+"""Model registry hot-swap and rollback (backend/registry.py, /admin/models)."""
+import os
+import json
+import time
+import shutil
+
+import joblib
+import numpy as np
+import pytest
+
+from compiled import compile_predictor, file_digest, save_compiled
+from registry import ModelRegistry
+
+from conftest import BEAM, BEAM_ROW
+
+
+@pytest.fixture
+def registry(models_dir, app_module):
+    return ModelRegistry(models_dir, app_module.FEATURE_COLUMNS)
+
+
+def test_activate_swaps_and_rolls_back(registry):
+    swaps = []
+    registry.add_listener(lambda old, new: swaps.append((old and old.name, new.name)))
+    svr = registry.activate('SVR')
+    mlp = registry.activate('MLP')
+    assert registry.active is mlp
+    # Rolling back reuses the loaded bundle, no reload
+    assert registry.activate('SVR') is svr
+    assert registry.active is svr
+    assert swaps == [(None, 'SVR'), ('SVR', 'MLP'), ('MLP', 'SVR')]
+
+
+def test_failed_load_keeps_the_active_model(tmp_path, models_dir, app_module):
+    shutil.copytree(models_dir, tmp_path, dirs_exist_ok=True)
+    (tmp_path / 'Broken_best.pkl').write_bytes(b'not a pickle')
+    registry = ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS)
+    active = registry.activate('SVR')
+    with pytest.raises(Exception):
+        registry.activate('Broken')
+    assert registry.active is active
+    registry.preload()
+    assert 'Broken' in registry.errors and 'Broken' not in registry.bundles
+
+
+def test_reload_picks_up_a_retrained_model(tmp_path, models_dir, app_module, training_data):
+    shutil.copytree(models_dir, tmp_path, dirs_exist_ok=True)
+    registry = ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS)
+    old = registry.activate('SVR')
+    model = joblib.load(tmp_path / 'SVR_best.pkl')
+    scaler = joblib.load(tmp_path / 'scaler.pkl')
+    X, y = training_data
+    joblib.dump(model.set_params(C=10).fit(scaler.transform(X), y), tmp_path / 'SVR_best.pkl')
+
+    new = registry.load('SVR', force=True)
+    assert new.version != old.version
+    # Reloading the active model activates the new version at once
+    assert registry.active is new
+    assert new.predict(BEAM_ROW)[0] != pytest.approx(old.predict(BEAM_ROW)[0])
+
+
+def wait_for_version(registry, old_version, timeout=10):
+    deadline = time.monotonic() + timeout
+    while registry.active.version == old_version:
+        assert time.monotonic() < deadline, f"still serving {old_version}"
+        time.sleep(0.02)
+    return registry.active
+
+
+def test_watcher_reloads_retrained_best_model(tmp_path, models_dir, app_module, training_data):
+    shutil.copytree(models_dir, tmp_path, dirs_exist_ok=True)
+    registry = ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS)
+    registry.preload(['SVR', 'MLP'])
+    old = registry.activate('MLP')
+    registry.watch(0.02)
+    try:
+        # A retrain rewrites the best model's pickle, then best_model_info.json
+        X, y = training_data
+        scaler = joblib.load(tmp_path / 'scaler.pkl')
+        model = joblib.load(tmp_path / 'SVR_best.pkl').set_params(C=10).fit(scaler.transform(X), y)
+        joblib.dump(model, tmp_path / 'SVR_best.pkl')
+        (tmp_path / 'best_model_info.json').write_text(json.dumps({'best_model_name': 'SVR'}))
+
+        new = wait_for_version(registry, old.version)
+        assert new.name == 'SVR'
+        assert new.version == f"SVR-{registry.source_digest('SVR')}"
+        np.testing.assert_allclose(new.predict(BEAM_ROW), model.predict(scaler.transform(BEAM_ROW)))
+    finally:
+        registry.stop_watching()
+
+
+def test_watcher_reloads_on_new_scaler(tmp_path, models_dir, app_module, training_data):
+    from sklearn.preprocessing import StandardScaler
+    shutil.copytree(models_dir, tmp_path, dirs_exist_ok=True)
+    registry = ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS)
+    old = registry.activate('SVR')
+    registry.watch(0.02)
+    try:
+        X, _ = training_data
+        scaler = StandardScaler(with_mean=False).fit(X)
+        joblib.dump(scaler, tmp_path / 'scaler.pkl')
+        new = wait_for_version(registry, old.version)
+        assert new.name == 'SVR'
+        np.testing.assert_allclose(new.scaler.scale_, scaler.scale_)
+    finally:
+        registry.stop_watching()
+
+
+def test_feature_order_mismatch_is_refused(models_dir, app_module):
+    registry = ModelRegistry(models_dir, list(reversed(app_module.FEATURE_COLUMNS)))
+    with pytest.raises(ValueError, match='feature order'):
+        registry.activate('SVR')
+
+
+def test_admin_activate_swaps_served_model(client, sklearn_predict):
+    assert client.get('/ready').json()['model'].startswith('SVR-')
+    svr_prediction = client.post('/predict', json=BEAM).json()['shear_capacity_kN']
+    assert svr_prediction == pytest.approx(sklearn_predict('SVR', BEAM_ROW)[0], rel=1e-9)
+    try:
+        response = client.post('/admin/models/MLP/activate')
+        assert response.status_code == 200
+        assert response.json()['active'].startswith('MLP-')
+        assert client.get('/models').json()['active'] == response.json()['active']
+        mlp_prediction = client.post('/predict', json=BEAM).json()['shear_capacity_kN']
+        assert mlp_prediction == pytest.approx(sklearn_predict('MLP', BEAM_ROW)[0], rel=1e-9)
+    finally:
+        assert client.post('/admin/models/SVR/activate').status_code == 200
+    assert client.post('/predict', json=BEAM).json()['shear_capacity_kN'] == svr_prediction
+
+
+def test_admin_activate_failures_keep_the_served_model(client, models_dir):
+    active = client.get('/models').json()['active']
+    assert client.post('/admin/models/Nope/activate').status_code == 404
+
+    broken_path = os.path.join(models_dir, 'Broken_best.pkl')
+    with open(broken_path, 'wb') as f:
+        f.write(b'not a pickle')
+    try:
+        response = client.post('/admin/models/Broken/activate')
+        assert response.status_code == 500
+        assert 'Could not load Broken' in response.json()['detail']
+    finally:
+        os.remove(broken_path)
+    assert client.get('/models').json()['active'] == active
+
+
+def test_admin_token_is_required_when_set(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'ADMIN_TOKEN', 'secret')
+    assert client.post('/admin/models/SVR/activate').status_code == 403
+    response = client.post('/admin/models/SVR/activate', headers={'X-Admin-Token': 'secret'})
+    assert response.status_code == 200
+    assert np.isfinite(client.post('/predict', json=BEAM).json()['shear_capacity_kN'])
+
+
+def export(models_dir, name):
+    scaler = joblib.load(os.path.join(models_dir, 'scaler.pkl'))
+    model = joblib.load(os.path.join(models_dir, f'{name}_best.pkl'))
+    save_compiled(compile_predictor(scaler, model), os.path.join(models_dir, f'{name}_compiled.npz'),
+                  feature_names=scaler.feature_names_in_,
+                  source_digest=file_digest(os.path.join(models_dir, 'scaler.pkl'),
+                                            os.path.join(models_dir, f'{name}_best.pkl')))
+
+
+def test_registry_serves_compiled_predictor(tmp_path, models_dir, app_module, training_data, sklearn_predict):
+    shutil.copytree(models_dir, tmp_path, dirs_exist_ok=True)
+    export(str(tmp_path), 'SVR')
+    registry = ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS, use_compiled=True)
+    bundle = registry.activate('SVR')
+    assert bundle.compiled is not None
+    X = training_data[0].to_numpy()
+    np.testing.assert_allclose(bundle.predict(X), sklearn_predict('SVR', X), rtol=1e-9, atol=1e-9)
+
+
+def test_registry_ignores_stale_export(tmp_path, models_dir, app_module, training_data):
+    shutil.copytree(models_dir, tmp_path, dirs_exist_ok=True)
+    export(str(tmp_path), 'SVR')
+    # Retrained after the export: the export's source digest no longer matches
+    X, y = training_data
+    scaler = joblib.load(tmp_path / 'scaler.pkl')
+    model = joblib.load(tmp_path / 'SVR_best.pkl').set_params(C=10).fit(scaler.transform(X), y)
+    joblib.dump(model, tmp_path / 'SVR_best.pkl')
+    registry = ModelRegistry(str(tmp_path), app_module.FEATURE_COLUMNS, use_compiled=True)
+    bundle = registry.activate('SVR')
+    assert bundle.compiled is None
+    np.testing.assert_allclose(bundle.predict(X), model.predict(scaler.transform(X)))
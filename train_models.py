@@ -3,8 +3,12 @@ import numpy as np
 import joblib
 import os
 import json
-import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split, KFold, cross_val_score, RandomizedSearchCV
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from joblib import Memory
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, KFold, cross_validate, RandomizedSearchCV
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import r2_score, mean_squared_error, mean_absolute_error
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
@@ -12,54 +16,21 @@ from sklearn.tree import DecisionTreeRegressor
 from sklearn.neighbors import KNeighborsRegressor
 from sklearn.svm import SVR
 from sklearn.neural_network import MLPRegressor
+from halving_search import halving_search
+from shap_store import compute_shap_store, data_hash
+import incremental_training
+import data_access
 
-# Ensure output directories exist
-os.makedirs('models', exist_ok=True)
-os.makedirs('results', exist_ok=True)
-
-# Load Data
-print("Loading data...")
-df = pd.read_csv('e:/Input Day 2/cleaned_data.csv')
-target_col = 'VU(FEA)'
-X = df.drop(columns=[target_col])
-y = df[target_col]
-
-# Preprocessing
-scaler = StandardScaler()
-X_scaled = scaler.fit_transform(X)
-X_scaled_df = pd.DataFrame(X_scaled, columns=X.columns)
-
-# Save scaler
-joblib.dump(scaler, 'models/scaler.pkl')
-
-# Define Models dictionary dynamically
-models = {
-    'RandomForest': RandomForestRegressor(random_state=42),
-    'DecisionTree': DecisionTreeRegressor(random_state=42),
-    'KNN': KNeighborsRegressor(),
-    'GBM': GradientBoostingRegressor(random_state=42),
-    'SVR': SVR(),
-    'MLP': MLPRegressor(random_state=42, max_iter=2000)
-}
-
-# Optional Models
-try:
-    from xgboost import XGBRegressor
-    models['XGBoost'] = XGBRegressor(random_state=42, verbosity=0)
-except ImportError:
-    print("XGBoost not installed, skipping.")
-
-try:
-    from lightgbm import LGBMRegressor
-    models['LightGBM'] = LGBMRegressor(random_state=42, verbose=-1)
-except ImportError:
-    print("LightGBM not installed, skipping.")
-
-try:
-    from catboost import CatBoostRegressor
-    models['CatBoost'] = CatBoostRegressor(random_state=42, verbose=0)
-except ImportError:
-    print("CatBoost not installed, skipping.")
+# The raw sheet, loaded and cleaned through data_access.py's cache
+DATA_PATH = data_access.RAW_DATA_PATH
+TARGET_COL = data_access.TARGET_COL
+# Fitted searches and fold results are cached here, keyed on data + params
+CACHE_DIR = '.cache/train_models'
+# SHAP values of every tree model on the full dataset (see shap_store.py)
+SHAP_DIR = 'models/shap'
+# Scaler, models, metrics and selection trained from shards (--shards), kept
+# apart from models/: its models were fitted with the previous scaler
+SHARD_MODELS_DIR = 'models/shards'
 
 # Hyperparameter Grids (Simplified for demo/speed, can be expanded)
 param_grids = {
@@ -74,74 +45,415 @@ param_grids = {
     'MLP': {'hidden_layer_sizes': [(50,), (100,), (50, 50)], 'alpha': [0.0001, 0.001]}
 }
 
-results = []
-
-# Training Loop
-print("Starting training and tuning...")
-best_catboost_model = None
-
-for name, model in models.items():
-    print(f"Training {name}...")
-    
-    # Grid Search / Random Search
-    grid = RandomizedSearchCV(model, param_grids[name], cv=5, n_iter=10, scoring='r2', n_jobs=-1, random_state=42)
-    grid.fit(X_scaled, y)
-    
-    best_model = grid.best_estimator_
-    
-    # Save Best Model
-    joblib.dump(best_model, f'models/{name}_best.pkl')
-    if name == 'CatBoost':
-        best_catboost_model = best_model
-    
-    # 10-Fold CV on Best Model
+def build_models():
+    """Define Models dictionary dynamically"""
+    models = {
+        'RandomForest': RandomForestRegressor(random_state=42),
+        'DecisionTree': DecisionTreeRegressor(random_state=42),
+        'KNN': KNeighborsRegressor(),
+        'GBM': GradientBoostingRegressor(random_state=42),
+        'SVR': SVR(),
+        'MLP': MLPRegressor(random_state=42, max_iter=2000)
+    }
+
+    # Optional Models
+    try:
+        from xgboost import XGBRegressor
+        models['XGBoost'] = XGBRegressor(random_state=42, verbosity=0)
+    except ImportError:
+        print("XGBoost not installed, skipping.")
+
+    try:
+        from lightgbm import LGBMRegressor
+        models['LightGBM'] = LGBMRegressor(random_state=42, verbose=-1)
+    except ImportError:
+        print("LightGBM not installed, skipping.")
+
+    try:
+        from catboost import CatBoostRegressor
+        models['CatBoost'] = CatBoostRegressor(random_state=42, verbose=0, allow_writing_files=False)
+    except ImportError:
+        print("CatBoost not installed, skipping.")
+
+    return models
+
+# --- Cached stages ---
+# Each stage is a pure function of its arguments, so joblib.Memory can key it
+# on a hash of the data and the estimator/grid. Changing one grid or adding a
+# model only recomputes that family; n_jobs does not affect the result.
+
+def search_family(model, param_grid, X, y, n_jobs, search='random'):
+    if search == 'halving':
+        return halving_search(model, param_grid, X, y, cv=5, scoring='r2', n_jobs=n_jobs, random_state=42)
+    grid = RandomizedSearchCV(model, param_grid, cv=5, n_iter=10, scoring='r2', n_jobs=n_jobs, random_state=42)
+    grid.fit(X, y)
+    return grid.best_params_, grid.best_estimator_
+
+def cross_validate_family(model, X, y, n_jobs):
+    # 10-Fold CV on Best Model, all metrics from one pass
     cv = KFold(n_splits=10, shuffle=True, random_state=42)
-    cv_scores_r2 = cross_val_score(best_model, X_scaled, y, cv=cv, scoring='r2')
-    cv_scores_neg_mse = cross_val_score(best_model, X_scaled, y, cv=cv, scoring='neg_mean_squared_error')
-    cv_scores_neg_mae = cross_val_score(best_model, X_scaled, y, cv=cv, scoring='neg_mean_absolute_error')
-    
-    # Calculate aggregate metrics
-    mean_r2 = np.mean(cv_scores_r2)
-    mean_mse = -np.mean(cv_scores_neg_mse)
-    mean_mae = -np.mean(cv_scores_neg_mae)
-    rmse = np.sqrt(mean_mse)
-    
-    # Calculate MAPE manually generally, but sklearn has it too now: 'neg_mean_absolute_percentage_error'
-    # We can just do a predictable train/test split for a final robust metric set or stick to CV mean
-    # Let's do a hold-out test set evaluation for final detailed metrics
-    X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2, random_state=42)
-    best_model.fit(X_train, y_train)
-    y_pred = best_model.predict(X_test)
-    
-    test_r2 = r2_score(y_test, y_pred)
-    test_mse = mean_squared_error(y_test, y_pred)
-    test_mae = mean_absolute_error(y_test, y_pred)
-    test_mape = np.mean(np.abs((y_test - y_pred) / y_test)) * 100
-    
+    scores = cross_validate(
+        model, X, y, cv=cv, n_jobs=n_jobs,
+        scoring={'r2': 'r2', 'mse': 'neg_mean_squared_error', 'mae': 'neg_mean_absolute_error'}
+    )
+    return {
+        'r2': np.mean(scores['test_r2']),
+        'mse': -np.mean(scores['test_mse']),
+        'mae': -np.mean(scores['test_mae']),
+    }
+
+def holdout_family(model, X, y):
+    # Hold-out test set evaluation for final detailed metrics
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    holdout_model = clone(model).fit(X_train, y_train)
+    y_pred = holdout_model.predict(X_test)
+    return {
+        'r2': r2_score(y_test, y_pred),
+        'mse': mean_squared_error(y_test, y_pred),
+        'mae': mean_absolute_error(y_test, y_pred),
+        'mape': np.mean(np.abs((y_test - y_pred) / y_test)) * 100,
+    }
+
+def train_family(name, model, param_grid, X, y, cache_dir, n_jobs, search='random'):
+    """Search, cross-validate and hold-out evaluate one model family (runs in a worker process)."""
+    memory = Memory(cache_dir, verbose=0) if cache_dir else Memory(None)
+    timings = {}
+
+    start = time.perf_counter()
+    best_params, best_model = memory.cache(search_family, ignore=['n_jobs'])(model, param_grid, X, y, n_jobs, search)
+    timings['search'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cv_scores = memory.cache(cross_validate_family, ignore=['n_jobs'])(best_model, X, y, n_jobs)
+    timings['cv'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    test_scores = memory.cache(holdout_family)(best_model, X, y)
+    timings['holdout'] = time.perf_counter() - start
+
     result_entry = {
         'Model': name,
-        'Best Params': grid.best_params_,
-        'CV Mean R2': mean_r2,
-        'CV Mean MSE': mean_mse,
-        'Test R2': test_r2,
-        'Test MSE': test_mse,
-        'Test MAE': test_mae,
-        'Test MAPE': test_mape
+        'Best Params': best_params,
+        'CV Mean R2': cv_scores['r2'],
+        'CV Mean MSE': cv_scores['mse'],
+        'Test R2': test_scores['r2'],
+        'Test MSE': test_scores['mse'],
+        'Test MAE': test_scores['mae'],
+        'Test MAPE': test_scores['mape']
+    }
+    return result_entry, best_model, timings
+
+def compare_family(name, model, param_grid, X, y, n_jobs):
+    """Time the random and halving searches for one family and compare their hold-out R2 (never cached)."""
+    entry = {'Model': name}
+    for search in ('random', 'halving'):
+        start = time.perf_counter()
+        best_params, best_model = search_family(model, param_grid, X, y, n_jobs, search)
+        entry[f'{search} seconds'] = time.perf_counter() - start
+        entry[f'{search} Test R2'] = holdout_family(best_model, X, y)['r2']
+        entry[f'{search} Best Params'] = best_params
+    entry['Time Saved %'] = 100 * (1 - entry['halving seconds'] / entry['random seconds'])
+    entry['Test R2 Diff'] = entry['halving Test R2'] - entry['random Test R2']
+    return entry
+
+def run_comparison(models, X, y, workers, n_jobs):
+    print(f"Comparing random and halving search ({len(models)} families on {workers} workers)...")
+    entries = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(compare_family, name, model, param_grids[name], X, y, n_jobs): name
+            for name, model in models.items()
+        }
+        for future in as_completed(futures):
+            entry = future.result()
+            entries[entry['Model']] = entry
+            print(f"  {entry['Model']}: random {entry['random seconds']:.2f}s R2 {entry['random Test R2']:.4f} | "
+                  f"halving {entry['halving seconds']:.2f}s R2 {entry['halving Test R2']:.4f} | "
+                  f"saved {entry['Time Saved %']:.1f}%, R2 diff {entry['Test R2 Diff']:+.4f}")
+
+    comparison_df = pd.DataFrame([entries[name] for name in models if name in entries])
+    comparison_df.to_csv('results/search_comparison.csv', index=False)
+    total_random = comparison_df['random seconds'].sum()
+    total_halving = comparison_df['halving seconds'].sum()
+    print(f"\nSearch time: random {total_random:.2f}s, halving {total_halving:.2f}s "
+          f"({100 * (1 - total_halving / total_random):.1f}% saved); "
+          f"mean Test R2 diff {comparison_df['Test R2 Diff'].mean():+.4f}")
+    print("Comparison saved to results/search_comparison.csv")
+
+# --- Inference cost and model selection ---
+# Costs are measured in the main process once training is done, one model at
+# a time, so parallel training jobs do not skew them. Timings cover
+# model.predict on already-scaled rows: scaling costs the same for every
+# candidate.
+
+SELECTION_POLICIES = {
+    # policy: (cost column, True if higher is better); None = highest Test R2
+    'best-r2': None,
+    'fastest': ('Latency ms', False),
+    'highest-throughput': ('Throughput rows/s', True),
+    'smallest': ('Model Size KB', False),
+}
+
+def measure_cost(model, X, model_path, calls=200, batch_rows=10000):
+    """Median single-row latency, batch throughput and pickle size of one fitted model."""
+    row = X[:1]
+    for _ in range(10):
+        model.predict(row)
+    latencies = []
+    for i in range(calls):
+        row = X[i % len(X)][None, :]
+        start = time.perf_counter()
+        model.predict(row)
+        latencies.append(time.perf_counter() - start)
+
+    batch = X[np.arange(batch_rows) % len(X)]
+    model.predict(batch)
+    batch_seconds = []
+    for _ in range(3):
+        start = time.perf_counter()
+        model.predict(batch)
+        batch_seconds.append(time.perf_counter() - start)
+
+    return {
+        'Latency ms': float(np.median(latencies) * 1000),
+        'Throughput rows/s': batch_rows / min(batch_seconds),
+        'Model Size KB': os.path.getsize(model_path) / 1024,
     }
-    results.append(result_entry)
-    print(f"  > Test R2: {test_r2:.4f}, Test MAPE: {test_mape:.2f}%")
 
-# Save Results
-results_df = pd.DataFrame(results)
-results_df.to_csv('results/model_comparison_metrics.csv', index=False)
-print("\nResults saved to results/model_comparison_metrics.csv")
+def select_model(results_df, policy='best-r2', r2_tolerance=0.002):
+    """
+    Pick the served model: the highest Test R2, or under a cost policy the
+    cheapest model whose Test R2 is within `r2_tolerance` of the best.
+    Returns (name, candidate names).
+    """
+    best_r2_name = results_df.loc[results_df['Test R2'].idxmax(), 'Model']
+    if SELECTION_POLICIES[policy] is None:
+        return best_r2_name, [best_r2_name]
+    best_r2 = results_df['Test R2'].max()
+    column, higher_is_better = SELECTION_POLICIES[policy]
+    candidates = results_df[(results_df['Test R2'] >= best_r2 - r2_tolerance) & results_df[column].notna()]
+    if candidates.empty:
+        raise ValueError(f"No model within {r2_tolerance} R2 of the best has a '{column}' measurement")
+    pick = candidates[column].idxmax() if higher_is_better else candidates[column].idxmin()
+    return results_df.loc[pick, 'Model'], candidates['Model'].tolist()
+
+def save_selection(results_df, policy, r2_tolerance, models_dir='models',
+                   metrics_path='results/model_comparison_metrics.csv'):
+    """Write the metrics CSV (metrics_path) and models_dir/best_model_info.json."""
+    results_df.to_csv(metrics_path, index=False)
+    print(f"\nResults saved to {metrics_path}")
+
+    best_model_name, candidates = select_model(results_df, policy, r2_tolerance)
+    best_r2_name = results_df.loc[results_df['Test R2'].idxmax(), 'Model']
+    print(f"Best Model Overall: {best_model_name} (policy {policy})")
+    if policy != 'best-r2':
+        print(f"  Within {r2_tolerance} Test R2 of {best_r2_name}: {', '.join(candidates)}")
+
+    cost_columns = [c for c in ('Latency ms', 'Throughput rows/s', 'Model Size KB') if c in results_df]
+    if cost_columns:
+        print(results_df[['Model', 'Test R2'] + cost_columns].to_string(index=False, float_format=lambda v: f'{v:.4g}'))
+
+    # Save the name of the best model for usage in visualizer/app
+    info = {
+        'best_model_name': best_model_name,
+        'selection_policy': policy,
+        'r2_tolerance': r2_tolerance,
+        'best_r2_model': best_r2_name,
+        'candidates': candidates,
+        'costs': {
+            row['Model']: {column: (None if pd.isna(row[column]) else float(row[column])) for column in cost_columns}
+            for _, row in results_df.iterrows()
+        },
+    }
+    with open(os.path.join(models_dir, 'best_model_info.json'), 'w') as f:
+        json.dump(info, f, indent=2)
+
+def reselect(X_scaled, policy, r2_tolerance):
+    """Re-measure costs of the saved models and re-run the selection, without retraining."""
+    results_df = pd.read_csv('results/model_comparison_metrics.csv')
+    costs = []
+    for name in results_df['Model']:
+        model_path = f'models/{name}_best.pkl'
+        try:
+            costs.append(measure_cost(joblib.load(model_path), X_scaled, model_path))
+        except Exception as e:
+            print(f"  {name}: cost not measured ({e})")
+            costs.append({})
+    for column in ('Latency ms', 'Throughput rows/s', 'Model Size KB'):
+        results_df[column] = [cost.get(column, np.nan) for cost in costs]
+    save_selection(results_df, policy, r2_tolerance)
+
+# --- Incremental training from shards ---
+# Families that can learn one chunk at a time, trained (on scaled features,
+# like the in-memory path) with fixed parameters from their grids: there is
+# no search or cross-validation over data that does not fit in memory.
+STREAM_PARAMS = {
+    'MLP': {'hidden_layer_sizes': (100,), 'alpha': 0.0001, 'random_state': 42, 'max_iter': 2000},
+    'XGBoost': {'n_estimators': 200, 'learning_rate': 0.1, 'max_depth': 5, 'random_state': 42, 'verbosity': 0},
+    'LightGBM': {'n_estimators': 200, 'learning_rate': 0.1, 'num_leaves': 31, 'random_state': 42, 'verbose': -1},
+}
+
+def train_from_shards(args):
+    """
+    Train the STREAM_PARAMS families from Parquet/Feather/CSV shards without
+    loading them whole, into their own models directory (args.out_dir) with
+    their own scaler, metrics and best_model_info.json.
+    """
+    os.makedirs(args.out_dir, exist_ok=True)
+    features = [c for c in incremental_training.shard_columns(args.shards) if c != TARGET_COL]
+    source = incremental_training.ShardSource(args.shards, features, TARGET_COL, chunk_rows=args.chunk_rows)
+    print(f"Streaming {len(source.paths)} shard(s) from {args.shards} in chunks of {args.chunk_rows} rows...")
+
+    start = time.perf_counter()
+    scaler = incremental_training.fit_scaler(source, args.scaler_fit)
+    joblib.dump(scaler, os.path.join(args.out_dir, 'scaler.pkl'))
+    print(f"  [{time.perf_counter() - start:7.2f}s] fit ({args.scaler_fit}) and save scaler ({scaler.n_samples_seen_} training rows)")
+
+    trainers = {
+        'MLP': lambda params: incremental_training.train_mlp(source, scaler, params),
+        'XGBoost': lambda params: incremental_training.train_xgboost(source, params, scaler),
+        'LightGBM': lambda params: incremental_training.train_lightgbm(source, params, scaler),
+    }
+    # A sample of scaled test rows for the inference cost measurements
+    X_sample = next((X for X, _ in source.chunks('test') if len(X)), None)
+    X_sample = incremental_training.scale(scaler, X_sample)
+    results = []
+    for name, params in STREAM_PARAMS.items():
+        start = time.perf_counter()
+        try:
+            model = trainers[name](params)
+        except ImportError:
+            print(f"{name} not installed, skipping.")
+            continue
+        test_scores = incremental_training.evaluate(model, source, scaler)
+        model_path = os.path.join(args.out_dir, f'{name}_best.pkl')
+        joblib.dump(model, model_path)
+        result_entry = {
+            'Model': name,
+            'Best Params': params,
+            'Test R2': test_scores['r2'],
+            'Test MSE': test_scores['mse'],
+            'Test MAE': test_scores['mae'],
+            'Test MAPE': test_scores['mape'],
+        }
+        result_entry.update(measure_cost(model, X_sample, model_path))
+        results.append(result_entry)
+        print(f"  {name}: Test R2: {test_scores['r2']:.4f}, Test MAPE: {test_scores['mape']:.2f}% "
+              f"({time.perf_counter() - start:.2f}s, peak RSS {incremental_training.peak_rss_mb():.0f} MB)")
+
+    metrics_path = os.path.join(args.out_dir, 'model_comparison_metrics.csv')
+    save_selection(pd.DataFrame(results), args.selection_policy, args.r2_tolerance, args.out_dir, metrics_path)
+    print(f"Serve them with MODELS_DIR={os.path.abspath(args.out_dir)} METRICS_PATH={os.path.abspath(metrics_path)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune, cross-validate and save every model family.")
+    parser.add_argument('--data', default=DATA_PATH, help="Raw sheet, loaded and cleaned through data_access.py")
+    parser.add_argument('--workers', type=int, default=None, help="Model families trained in parallel (default: one per family, capped at CPU count)")
+    parser.add_argument('--n-jobs', type=int, default=1, help="Parallel jobs inside each family's search / CV")
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true', help="Recompute every stage")
+    parser.add_argument('--search', choices=['random', 'halving'], default='random',
+                        help="Hyperparameter search: randomized search, or successive halving with early stopping")
+    parser.add_argument('--compare-search', action='store_true',
+                        help="Run both searches per family, report time saved and Test R2 difference, and exit")
+    parser.add_argument('--selection-policy', choices=list(SELECTION_POLICIES), default='best-r2',
+                        help="best-r2, or the fastest / highest-throughput / smallest model within --r2-tolerance of the best Test R2")
+    parser.add_argument('--r2-tolerance', type=float, default=0.002)
+    parser.add_argument('--select-only', action='store_true',
+                        help="Re-measure the saved models' costs and re-select the served model without retraining")
+    parser.add_argument('--no-shap', action='store_true', help="Skip precomputing SHAP values of the tree models")
+    parser.add_argument('--shards', default=None,
+                        help="Train MLP / XGBoost / LightGBM incrementally from a directory or glob of Parquet/Feather/CSV shards")
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help="Rows read into memory at a time with --shards")
+    parser.add_argument('--scaler-fit', choices=['two-pass', 'partial-fit'], default='two-pass',
+                        help="Exact two-pass scaler fit, or one pass of StandardScaler.partial_fit (with --shards)")
+    parser.add_argument('--out-dir', default=SHARD_MODELS_DIR,
+                        help="Models directory of --shards (scaler, models, metrics and selection)")
+    args = parser.parse_args()
+    if args.shards and os.path.abspath(args.out_dir) == os.path.abspath('models'):
+        parser.error(f"--out-dir must not be models/: --shards retrains only {', '.join(STREAM_PARAMS)}, "
+                     "and its scaler would break the other models served from there")
+
+    total_start = time.perf_counter()
+
+    # Ensure output directories exist
+    os.makedirs('models', exist_ok=True)
+    os.makedirs('results', exist_ok=True)
+
+    if args.shards:
+        train_from_shards(args)
+        print(f"Training Complete in {time.perf_counter() - total_start:.2f}s.")
+        return
+
+    # Load Data
+    print("Loading data...")
+    start = time.perf_counter()
+    df = data_access.load_data(raw_path=args.data)[data_access.FEATURES + [TARGET_COL]].reset_index(drop=True)
+    X = df.drop(columns=[TARGET_COL])
+    y = df[TARGET_COL]
+    print(f"  [{time.perf_counter() - start:7.2f}s] load data ({len(df)} rows, hash {joblib.hash(df)[:10]})")
+
+    # Preprocessing
+    start = time.perf_counter()
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    y_values = y.to_numpy()
+
+    if args.select_only:
+        # Same scaling as the saved models were trained with
+        X_scaled = joblib.load('models/scaler.pkl').transform(X)
+        reselect(X_scaled, args.selection_policy, args.r2_tolerance)
+        return
+
+    # Save scaler
+    joblib.dump(scaler, 'models/scaler.pkl')
+    print(f"  [{time.perf_counter() - start:7.2f}s] fit and save scaler")
+
+    models = build_models()
+    cache_dir = None if args.no_cache else args.cache_dir
+    workers = args.workers or min(len(models), os.cpu_count() or 1)
+
+    if args.compare_search:
+        run_comparison(models, X_scaled, y_values, workers, args.n_jobs)
+        return
+
+    # Training Loop: one job per model family
+    print(f"Starting training and tuning ({len(models)} families on {workers} workers, {args.search} search)...")
+    trained = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(train_family, name, model, param_grids[name], X_scaled, y_values, cache_dir, args.n_jobs, args.search): name
+            for name, model in models.items()
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            result_entry, best_model, timings = future.result()
+            trained[name] = (result_entry, best_model)
+
+            # Save Best Model
+            joblib.dump(best_model, f'models/{name}_best.pkl')
+            stages = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+            print(f"  {name}: Test R2: {result_entry['Test R2']:.4f}, Test MAPE: {result_entry['Test MAPE']:.2f}% ({stages})")
+
+    # Inference cost of every candidate, measured one at a time
+    print("Measuring inference cost...")
+    for name, (result_entry, best_model) in trained.items():
+        result_entry.update(measure_cost(best_model, X_scaled, f'models/{name}_best.pkl'))
+
+    # Keep the results in model definition order
+    results = [trained[name][0] for name in models if name in trained]
+
+    # Save Results and the selected model
+    save_selection(pd.DataFrame(results), args.selection_policy, args.r2_tolerance)
 
-# Identify Best Model based on Test R2
-best_model_name = results_df.loc[results_df['Test R2'].idxmax()]['Model']
-print(f"Best Model Overall: {best_model_name}")
+    if not args.no_shap:
+        print("Computing SHAP values of the tree models...")
+        start = time.perf_counter()
+        models_by_name = {name: trained[name][1] for name in models if name in trained}
+        compute_shap_store(models_by_name, X_scaled, SHAP_DIR, X.columns, data_hash(X), workers)
+        print(f"  [{time.perf_counter() - start:7.2f}s] SHAP store saved to {SHAP_DIR}")
 
-# Save the name of the best model for usage in visualizer/app
-with open('models/best_model_info.json', 'w') as f:
-    json.dump({'best_model_name': best_model_name}, f)
+    print(f"Training Complete in {time.perf_counter() - total_start:.2f}s.")
 
-print("Training Complete.")
+if __name__ == "__main__":
+    main()
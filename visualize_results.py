@@ -7,6 +7,8 @@ import json
 import os
 from sklearn.inspection import permutation_importance
 from sklearn.metrics import r2_score
+from shap_store import data_hash, load_manifest, load_shap, tree_shap
+import data_access
 
 try:
     import shap
@@ -15,51 +17,24 @@ except ImportError:
     SHAP_AVAILABLE = False
     print("SHAP not installed, skipping SHAP analysis.")
 
+# Precomputed by train_models.py / shap_store.py
+SHAP_DIR = 'models/shap'
+
 # Set style
 sns.set(style="whitegrid")
 os.makedirs('output', exist_ok=True)
 
 def load_data():
     print("Loading data...")
-    # Cleaned data for prediction
-    df_clean = pd.read_csv('e:/Input Day 2/cleaned_data.csv')
-    X = df_clean.drop(columns=['VU(FEA)'])
-    y = df_clean['VU(FEA)']
-    
-    # Original data for comparison columns
-    # We need to ensure rows align. cleaned_data was dropped NaNs.
-    # We should re-process original to get the same rows or assume alignment if no drops happened (but drops happened).
-    # Ideally, we should have saved the index or the full dataframe in data_analysis.
-    # Let's clean the original csv again similarly to get the comparison columns.
-    df_full = pd.read_csv('e:/Input Day 2/Input csv.csv', header=2)
-    
-    # Same cleaning logic as data_analysis.py to ensure alignment
-    target_col = 'VU(FEA)'
-    feature_cols = [
-        'Depth of Web opening(dwh/d1)', 'd1', 'tw', 'flange width(mm)', 
-        'total depth D (mm)', 'fyw', 'E', 'a/d', target_col
-    ]
-    # Keep comparison columns
-    comparison_cols = [
-        'Vnl(AS)FEA', 'VN PRO', 'Vnl with tension field', 
-        'VnlWITHOUT TENSION FIELD', 'Design Shear Resistance (VRd)' # Potential mappings
-    ]
-    
-    # Add comparison cols to "feature_cols" just for selection, then handle NaNs
-    # Note: Column names must be exact. I'll use strict names from Step 5 view.
-    # 'Vnl(AS)FEA', 'VN PRO', 'Vnl with tension field', 'VnlWITHOUT TENSION FIELD', 'Design Shear Resistance (VRd)'
-    
-    # Allow some missing columns if they don't exist
-    existing_cols = [c for c in feature_cols + comparison_cols if c in df_full.columns]
-    df_full_clean = df_full[existing_cols].copy()
-    
-    df_full_clean = df_full_clean.dropna(subset=[target_col])
-    for col in df_full_clean.columns:
-        df_full_clean[col] = pd.to_numeric(df_full_clean[col], errors='coerce')
-    df_full_clean = df_full_clean.dropna() # This should match cleaned_data.csv rows
-    
-    print(f"Full Cleaned Data Shape: {df_full_clean.shape}")
-    return X, y, df_full_clean
+    # Cleaned rows from the data_access.py cache, indexed by sheet row id:
+    # features, target and the comparison columns come from the same rows,
+    # so they stay aligned whichever rows the cleaning drops.
+    df_full = data_access.load_data()
+    X = df_full[data_access.FEATURES]
+    y = df_full[data_access.TARGET_COL]
+    
+    print(f"Full Cleaned Data Shape: {df_full.shape}")
+    return X, y, df_full
 
 def plot_performance_graphs():
     print("Generating Performance Graphs...")
@@ -85,28 +60,35 @@ def plot_performance_graphs():
     plt.savefig('output/model_comparison_mape.png')
     plt.close()
 
-def shap_analysis(X, model, model_name='CatBoost'):
+def shap_analysis(X, model_name, scaler):
+    """Summary and dependence plots from the SHAP store; computed here only if the store is missing or stale."""
     print(f"Running SHAP analysis for {model_name}...")
     try:
-        explainer = shap.Explainer(model)
-        shap_values = explainer(X)
-        
+        manifest = load_manifest(SHAP_DIR)
+        if manifest and model_name in manifest['models'] and manifest['data_hash'] == data_hash(X):
+            values = np.asarray(load_shap(SHAP_DIR, model_name, manifest)[0])
+        else:
+            print(f"  No stored SHAP values of {model_name} for this data, computing them (run shap_store.py to store them).")
+            # The models were trained on scaled features
+            model = joblib.load(f'models/{model_name}_best.pkl')
+            values = tree_shap(model, scaler.transform(X))[0]
+
         # Summary Plot
         plt.figure()
-        shap.summary_plot(shap_values, X, show=False)
+        shap.summary_plot(values, X, show=False)
         plt.tight_layout()
         plt.savefig(f'output/shap_summary_{model_name}.png')
         plt.close()
         
         # Dependence Plots for top features
         # Get top features by mean abs shap value
-        mean_shap = np.abs(shap_values.values).mean(axis=0)
+        mean_shap = np.abs(values).mean(axis=0)
         top_features_inds = mean_shap.argsort()[-3:][::-1] # Top 3
         
         for i in top_features_inds:
             feature_name = X.columns[i]
             plt.figure()
-            shap.dependence_plot(feature_name, shap_values.values, X, show=False)
+            shap.dependence_plot(feature_name, values, X, show=False)
             plt.tight_layout()
             plt.savefig(f'output/shap_dependence_{feature_name}.png')
             plt.close()
@@ -131,6 +113,8 @@ def permutation_importance_analysis(model, X, y):
 
 def comparative_analysis(X, y_true, df_full, best_model, scaler):
     print("Running Comparative Analysis...")
+    # Comparison columns of the same rows, by row id
+    df_full = df_full.loc[X.index]
     # Predict
     X_scaled = scaler.transform(X)
     y_pred = best_model.predict(X_scaled)
@@ -217,22 +201,24 @@ if __name__ == "__main__":
     # Load Best Model
     best_model = joblib.load(f'models/{best_model_name}_best.pkl')
     
-    # Load CatBoost specifically for SHAP if available
-    try:
-        catboost_model = joblib.load('models/CatBoost_best.pkl')
-    except:
-        catboost_model = None
-        print("CatBoost model not found for SHAP.")
+    # SHAP for CatBoost if available, else the first tree model in the SHAP store
+    manifest = load_manifest(SHAP_DIR) or {'models': {}}
+    stored = list(manifest['models'])
+    if 'CatBoost' in stored or os.path.exists('models/CatBoost_best.pkl'):
+        shap_model_name = 'CatBoost'
+    elif stored:
+        shap_model_name = stored[0]
+    else:
+        shap_model_name = None
+        print("No tree model found for SHAP.")
         
     # Run Validations
     plot_performance_graphs()
     
-    if SHAP_AVAILABLE and catboost_model:
-        shap_analysis(X, catboost_model, 'CatBoost')
+    if SHAP_AVAILABLE and shap_model_name:
+        shap_analysis(X, shap_model_name, scaler)
     elif not SHAP_AVAILABLE:
         print("Skipping SHAP (Library missing).")
-    elif not catboost_model:
-        print("Skipping SHAP (CatBoost model missing).")
         
     permutation_importance_analysis(best_model, X, y)
     